@@ -1,24 +1,33 @@
 from datetime import timedelta
 import os
-# import redis
-# import secrets
 
 from flask import Flask
 from flask_smorest import Api
-from flask_migrate import Migrate
 from dotenv import load_dotenv
-# from rq import Queue
 from flask_cors import CORS
 
-from db import db
+from db import db, enforce_sqlite_foreign_keys
 import models
 
 from resources.item import blp as ItemBlueprint
 from resources.store import blp as StoreBlueprint
 from resources.tag import blp as TagBlueprint
 from resources.user import blp as UserBlueprint
+from resources.bulk import blp as BulkBlueprint
+from resources.batch import blp as BatchBlueprint
+from resources.changes import blp as ChangesBlueprint
 
 from security.jwt_setup import init_jwt
+from security.passwords import init_password_hasher
+from security.rate_limit import init_rate_limiter
+from utils.response_cache import init_response_cache
+from queues import init_queues
+from compaction import init_compaction
+from store_stats import init_store_stats
+from utils.replicas import configure_replicas, init_replicas
+from utils.metrics import init_metrics
+from utils.compression import init_compression
+from utils.tag_bitmaps import init_tag_bitmaps
 
 
 def create_app(db_url=None):
@@ -26,13 +35,6 @@ def create_app(db_url=None):
     load_dotenv()
 
     CORS(app)
-    
-########
-    # connection = redis.from_url(
-    #     os.getenv("REDIS_URL")
-    # )
-    # app.queue = Queue("emails", connection=connection)
-########
 
     app.config["PROPAGATE_EXCEPTIONS"] = True
     app.config["API_TITLE"] = "Stores REST API"
@@ -44,20 +46,51 @@ def create_app(db_url=None):
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url or os.getenv("DATABASE_URL")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY") 
+    app.config["PAGINATION_DEFAULT_LIMIT"] = int(os.getenv("PAGINATION_DEFAULT_LIMIT", "20"))
+    app.config["PAGINATION_MAX_LIMIT"] = int(os.getenv("PAGINATION_MAX_LIMIT", "100"))
+    app.config["STREAM_BATCH_SIZE"] = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    app.config["BULK_BATCH_SIZE"] = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+    app.config["BULK_MAX_ROWS"] = int(os.getenv("BULK_MAX_ROWS", "10000"))
+    app.config["BATCH_MAX_REQUESTS"] = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+    app.config["CHANGES_TOMBSTONE_DAYS"] = int(os.getenv("CHANGES_TOMBSTONE_DAYS", "30"))
+    app.config["CHANGES_ALLOCATION_TIMEOUT"] = int(os.getenv("CHANGES_ALLOCATION_TIMEOUT", "600"))
+    # Set to 0 where the schema comes from `flask db upgrade`: create_all inspects
+    # every table on each worker boot.
+    app.config["DB_CREATE_ALL"] = os.getenv("DB_CREATE_ALL", "1").lower() in ("1", "true", "yes")
     
+    configure_replicas(app)
     db.init_app(app)
-    migrate = Migrate(app, db)
+    enforce_sqlite_foreign_keys(app)
+    init_replicas(app, db)
+    init_metrics(app, db)
+    # After init_metrics: after_request hooks run in reverse, so Server-Timing covers compression.
+    init_compression(app)
+    if os.getenv("FLASK_RUN_FROM_CLI"):
+        # Only the `flask db ...` commands need Flask-Migrate, and it imports Alembic.
+        from flask_migrate import Migrate
+        Migrate(app, db)
     
     api = Api(app)
     
     init_jwt(app)
+    init_password_hasher(app)
+    init_rate_limiter(app)
+    init_response_cache(app)
+    init_queues(app)
+    init_compaction(app)
+    init_store_stats(app)
+    init_tag_bitmaps(app)
 
-    with app.app_context():
-        db.create_all()
+    if app.config["DB_CREATE_ALL"]:
+        with app.app_context():
+            db.create_all(bind_key=None)
 
     api.register_blueprint(ItemBlueprint)
     api.register_blueprint(StoreBlueprint)
     api.register_blueprint(TagBlueprint)
     api.register_blueprint(UserBlueprint)
+    api.register_blueprint(BulkBlueprint)
+    api.register_blueprint(BatchBlueprint)
+    api.register_blueprint(ChangesBlueprint)
 
     return app
@@ -0,0 +1,381 @@
+"""ASGI entry point with an async read path for the catalog.
+
+    uvicorn --factory asgi:create_asgi_app --workers 2
+
+Authenticated GETs of items, stores and tags (``/item``, ``/item/<id>``,
+``/store``, ``/store/<id>``, ``/store/<id>/tag``, ``/tag/<id>``) are served on
+the event loop with async SQLAlchemy (asyncpg / aiosqlite), so a worker can
+wait on many database round trips at once instead of one.
+
+Everything else is handed to the unchanged Flask app: writes, users, NDJSON
+streams, tag-filtered item lists, conditional (If-None-Match) and cross-origin requests, and any GET
+that would not be a plain 200 -- missing/expired/revoked tokens, bad query
+arguments, unknown ids. The Flask app therefore produces every error body and
+JWT response, and the async handlers reuse the blueprints' schemas, compiled
+dumpers, filters, keyset pagination, ETag data and response cache, so both
+paths return the same bytes.
+
+The async engine uses ``ASYNC_DATABASE_URL`` if set, else the primary
+``DATABASE_URL`` with its async driver. Replica routing (utils.replicas) only
+applies to the Flask path.
+"""
+import asyncio
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl
+
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from marshmallow import EXCLUDE, ValidationError
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from models import ItemModel, StoreModel, TagModel, TokenBlocklistModel
+from resources.item import ITEM_LOAD_OPTIONS, SORT_COLUMNS as ITEM_SORT_COLUMNS, dump_item, dump_item_page, item_filters
+from resources.store import STORE_LOAD_OPTIONS, SORT_COLUMNS as STORE_SORT_COLUMNS, store_filters
+from resources.tag import TAG_LOAD_OPTIONS, SORT_COLUMNS as TAG_SORT_COLUMNS, tag_filters
+from schemas import (
+    ItemListArgsSchema, StoreListArgsSchema, TagListArgsSchema,
+    StoreSchema, TagSchema, StorePageSchema, TagPageSchema)
+from security.jwt_setup import get_blocklist_cache
+from utils.compression import encoded_etag
+from utils.etag import etag_value, version_digest
+from utils.pagination import apply_keyset, build_page, resolve_limit
+from utils.projections import item_rows_select, item_tags_select, assemble_item_rows
+from utils.response_cache import RedisResponseCache, get_response_cache, render_body
+from utils.streaming import NDJSON_MIMETYPE
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Headers whose handling is left to the Flask app (flask-smorest, Flask-CORS).
+FALLBACK_HEADERS = ("if-none-match", "if-match", "origin")
+
+dump_store = StoreSchema().dump
+dump_tag = TagSchema().dump
+
+
+class Fallback(Exception):
+    """Hand the request to the Flask app."""
+
+
+def async_database_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for {url.get_backend_name()!r}; set ASYNC_DATABASE_URL.")
+    return url.set(drivername=driver)
+
+
+def wsgi_environ(scope, body):
+    """The WSGI environ for an ASGI HTTP ``scope`` with the request ``body`` file."""
+    script_name = scope.get("root_path", "").encode("utf-8").decode("latin-1")
+    path_info = scope["path"].encode("utf-8").decode("latin-1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class ThreadPoolWsgiToAsgi:
+    """Serves a WSGI app over ASGI, one request per thread of ``executor``.
+
+    asgiref's WsgiToAsgi runs WSGI apps thread_sensitive, i.e. one request at
+    a time per process. The Flask app is thread-safe, so this adapter runs
+    them side by side and sends each body chunk as the app yields it, which
+    keeps NDJSON streams streaming.
+    """
+
+    def __init__(self, wsgi_application, executor=None):
+        self.wsgi_application = wsgi_application
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError(f"Cannot serve a {scope['type']!r} scope with a WSGI app.")
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.run, wsgi_environ(scope, body), loop, send)
+
+    def run(self, environ, loop, send):
+        start = None
+        started = False
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def write(data):
+            nonlocal started
+            if not started:
+                started = True
+                send_sync(start)
+            if data:
+                send_sync({"type": "http.response.body", "body": data, "more_body": True})
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal start
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            start = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            }
+            return write
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in response:
+                write(chunk)
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        write(b"")
+        send_sync({"type": "http.response.body"})
+
+
+class CatalogReadApp:
+    def __init__(self, flask_app, engine, wsgi_threads=None):
+        self.flask_app = flask_app
+        self.wsgi = ThreadPoolWsgiToAsgi(flask_app, ThreadPoolExecutor(wsgi_threads, thread_name_prefix="wsgi"))
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.routes = [
+            (re.compile(r"/item"), self.item_list),
+            (re.compile(r"/item/(\d+)"), self.item_detail),
+            (re.compile(r"/store"), self.store_list),
+            (re.compile(r"/store/(\d+)"), self.store_detail),
+            (re.compile(r"/store/(\d+)/tag"), self.tags_in_store),
+            (re.compile(r"/tag/(\d+)"), self.tag_detail),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            response = await self.serve_read(scope)
+            if response is not None:
+                return await self.send_response(send, *response)
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def serve_read(self, scope):
+        """``(etag, body, content_encoding)`` for a read the async path can answer, else None."""
+        for pattern, handler in self.routes:
+            match = pattern.fullmatch(scope["path"])
+            if match:
+                break
+        else:
+            return None
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        if any(name in headers for name in FALLBACK_HEADERS) or NDJSON_MIMETYPE in headers.get("accept", ""):
+            return None
+
+        query = {}
+        for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+            query.setdefault(key, value)
+
+        with self.flask_app.app_context():
+            try:
+                async with self.sessions() as session:
+                    await self.authenticate(session, headers)
+                    etag_data, body = await handler(session, query, *(int(g) for g in match.groups()))
+            except (Fallback, HTTPException, ValidationError):
+                return None
+            if not isinstance(body, bytes):
+                body = self.flask_app.json.response(body).get_data()
+        etag = etag_value(etag_data)
+
+        # Same negotiation, threshold and cache as utils.compression on the Flask path.
+        compressor = self.flask_app.extensions["compression"]
+        encoding = None
+        if compressor is not None:
+            encoding = compressor.negotiate(headers.get("accept-encoding"))
+            if encoding is not None and len(body) >= compressor.min_size:
+                body = compressor.compress(body, encoding, cacheable=True)
+                etag = encoded_etag(etag, encoding)
+            else:
+                encoding = None
+        return f'"{etag}"', body, encoding
+
+    async def send_response(self, send, etag, body, encoding):
+        headers = [
+            (b"content-type", self.flask_app.json.mimetype.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"etag", etag.encode("latin-1")),
+        ]
+        if self.flask_app.extensions["compression"] is not None:
+            headers.append((b"vary", b"Accept-Encoding"))
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def authenticate(self, session, headers):
+        """What ``@jwt_required()`` checks; any failure is left to the Flask app to report."""
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme != "Bearer" or not token:
+            raise Fallback
+        try:
+            claims = decode_token(token)
+        except (PyJWTError, JWTExtendedException):
+            raise Fallback
+        if claims.get("type") != "access" or "exp" not in claims:
+            raise Fallback
+
+        jti, expires_at = claims.get("jti"), claims["exp"]
+        if not jti:
+            return
+        cache = get_blocklist_cache()
+        if cache.shared is not None:
+            revoked = await asyncio.to_thread(cache.lookup, jti, expires_at)
+        else:
+            revoked = cache.lookup(jti, expires_at)
+        if revoked is None:
+            row = await session.scalar(select(TokenBlocklistModel.id).where(TokenBlocklistModel.jti == jti).limit(1))
+            revoked = row is not None
+            cache.remember(jti, revoked, expires_at)
+        if revoked:
+            raise Fallback
+
+    def load_args(self, schema_cls, query):
+        args = schema_cls().load(query, unknown=EXCLUDE)
+        if args.get("stream"):
+            raise Fallback
+        return args
+
+    async def cached_detail(self, session, key, model, load_options, row_id, dump):
+        cache = get_response_cache()
+        blocking = isinstance(cache, RedisResponseCache)
+        entry = await asyncio.to_thread(cache.get, key) if blocking else cache.get(key)
+        if entry is not None:
+            return entry
+
+        generation = await asyncio.to_thread(cache.reserve, key) if blocking else cache.reserve(key)
+        obj = await session.get(model, row_id, options=load_options)
+        if obj is None:
+            raise Fallback
+        etag_data, body = [obj.id, obj.version], render_body(dump(obj))
+        if generation is not None and blocking:
+            await asyncio.to_thread(cache.set, key, etag_data, body, generation)
+        elif generation is not None:
+            cache.set(key, etag_data, body, generation)
+        return etag_data, body
+
+    async def model_page(self, session, model, load_options, filters, args, sort_columns, page_schema):
+        sort, limit = args.get("sort", "id"), resolve_limit(args)
+        stmt = apply_keyset(
+            select(model).options(*load_options).where(*filters),
+            sort, args.get("cursor"), limit, sort_columns, model.id,
+        )
+        rows = (await session.scalars(stmt)).all()
+        return version_digest((row.id, row.version) for row in rows), page_schema.dump(build_page(rows, sort, limit))
+
+    async def item_list(self, session, query):
+        if any(key in query for key in ("tags_all", "tags_any", "tags_none")):
+            # Repeated query parameters, and the tag bitmaps are synchronous.
+            raise Fallback
+        args = self.load_args(ItemListArgsSchema, query)
+        sort, limit = args.get("sort", "id"), resolve_limit(args)
+        stmt = apply_keyset(
+            item_rows_select(ItemModel.version).where(*item_filters(args)),
+            sort, args.get("cursor"), limit, ITEM_SORT_COLUMNS, ItemModel.id,
+        )
+        rows = (await session.execute(stmt)).all()
+        etag_data = version_digest((row.id, row.version) for row in rows)
+
+        page = build_page(rows, sort, limit)
+        tag_rows = []
+        if page["data"]:
+            tag_rows = (await session.execute(item_tags_select(row.id for row in page["data"]))).all()
+        page["data"] = assemble_item_rows(page["data"], tag_rows)
+        return etag_data, dump_item_page(page)
+
+    async def item_detail(self, session, query, item_id):
+        return await self.cached_detail(session, f"item:{item_id}", ItemModel, ITEM_LOAD_OPTIONS, item_id, dump_item)
+
+    async def store_list(self, session, query):
+        args = self.load_args(StoreListArgsSchema, query)
+        return await self.model_page(
+            session, StoreModel, STORE_LOAD_OPTIONS, store_filters(args), args, STORE_SORT_COLUMNS, StorePageSchema()
+        )
+
+    async def store_detail(self, session, query, store_id):
+        return await self.cached_detail(session, f"store:{store_id}", StoreModel, STORE_LOAD_OPTIONS, store_id, dump_store)
+
+    async def tags_in_store(self, session, query, store_id):
+        args = self.load_args(TagListArgsSchema, query)
+        if await session.get(StoreModel, store_id) is None:
+            raise Fallback
+        return await self.model_page(
+            session, TagModel, TAG_LOAD_OPTIONS, tag_filters(args, store_id), args, TAG_SORT_COLUMNS, TagPageSchema()
+        )
+
+    async def tag_detail(self, session, query, tag_id):
+        return await self.cached_detail(session, f"tag:{tag_id}", TagModel, TAG_LOAD_OPTIONS, tag_id, dump_tag)
+
+
+def create_asgi_app(db_url=None):
+    flask_app = create_app(db_url)
+    url = os.getenv("ASYNC_DATABASE_URL") or async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+    engine = create_async_engine(url, **flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    wsgi_threads = int(os.getenv("ASGI_WSGI_THREADS", "0")) or None
+    return CatalogReadApp(flask_app, engine, wsgi_threads=wsgi_threads)
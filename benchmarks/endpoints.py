@@ -0,0 +1,370 @@
+"""End-to-end load benchmark for every endpoint in ``resources/``.
+
+    python -m benchmarks.endpoints --items 20000 --concurrency 16 --duration 10
+    python -m benchmarks.endpoints --db-url postgresql://... --only "item|login"
+    python -m benchmarks.endpoints --output results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.endpoints --update-baseline
+
+Builds the app with ``create_app(db_url)`` (a temporary SQLite file by
+default; a ``--db-url`` database must be empty) and seeds ``--stores``,
+``--items``, ``--tags-per-store``, ``--links-per-item`` and ``--users``. Then,
+one endpoint at a time, ``--concurrency`` threads call it through their own
+test client for ``--duration`` seconds. For each endpoint it records
+throughput, p50/p95/p99 latency, errors, SQL statements per request and the
+process's peak RSS.
+
+Requests that consume a row (DELETE, logout, refresh, reset-password) get it
+from an untimed prepare step, whose queries are not counted either. Emails
+are not sent: the email queue is replaced by one that only counts jobs.
+
+``--baseline`` compares the results with an earlier ``--output`` file and
+exits non-zero when an endpoint got slower or less efficient by more than
+``--tolerance``, or issues more queries per request. Timings are only
+comparable between runs on the same machine and database.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+os.environ.setdefault("QUEUE_BACKEND", "local")
+# Measure the auth endpoints themselves, not the admission limits in front of them.
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.load import RssSampler, run_load
+from db import db
+from models import ItemModel, StoreModel, TagModel, UserModel, PasswordResetTokenModel, ChangeCounterModel
+from resources.changes import CURSOR_SORT, END_RANK
+from security.passwords import get_password_hasher
+from seed import seed
+from utils.pagination import encode_cursor
+
+PASSWORD = "benchmark-password"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class CountingQueue:
+    """Stands in for the email queue so the benchmark sends no email."""
+
+    def __init__(self):
+        self.enqueued = 0
+
+    def enqueue(self, func_path, *args, **kwargs):
+        self.enqueued += 1
+
+
+class QueryCounter:
+    """Counts statements per thread, only while ``counting`` is set on that thread."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def listen(self, engine):
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self.local, "counting", False):
+            self.local.queries += 1
+
+    def measure(self, fn):
+        """Wrap a call so the statements it issues are added to ``counts``."""
+        def measured(client, *args):
+            self.local.counting, self.local.queries = True, 0
+            try:
+                return fn(client, *args)
+            finally:
+                self.local.counting = False
+                self.counts.append(self.local.queries)
+        return measured
+
+    def reset(self):
+        self.counts = []
+
+    def per_request(self):
+        return round(sum(self.counts) / len(self.counts), 2) if self.counts else None
+
+
+def seed_database(app, args):
+    with app.app_context():
+        seed(args.stores, args.items, args.tags_per_store, args.links_per_item)
+        password = get_password_hasher().hash(PASSWORD)
+        db.session.execute(db.insert(UserModel), [
+            {"username": f"user-{n}", "email": f"user-{n}@example.com", "password": password, "is_admin": n == 0}
+            for n in range(args.users)
+        ])
+        db.session.commit()
+
+
+def scenarios(app, args):
+    """``(label, fn[, prepare])`` per endpoint; fn/prepare take a test client."""
+    with app.app_context():
+        admin = UserModel.query.filter_by(username="user-0").one()
+        admin_headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id), fresh=True)}"}
+        item_id = db.session.query(ItemModel.id).order_by(ItemModel.id).first()[0]
+        store_id, tag_id = 1, 1
+        first_user = admin.id
+
+    unique = itertools.count()
+
+    def ok(response, *codes):
+        # Read streamed bodies to the end and release their database connection.
+        response.get_data()
+        response.close()
+        return response.status_code in (codes or (200,))
+
+    def get(path, **kwargs):
+        return lambda client: ok(client.get(path, headers=admin_headers, **kwargs))
+
+    def get_encoded(path, encoding):
+        headers = {**admin_headers, "Accept-Encoding": encoding}
+        return lambda client: ok(client.get(path, headers=headers))
+
+    def request(method, path, json=None, codes=(200,), headers=None):
+        def call(client, *_):
+            return ok(client.open(path, method=method, json=json, headers=headers or admin_headers), *codes)
+        return call
+
+    def create_store(client):
+        return client.post("/store", json={"name": f"bench-store-{next(unique)}"}, headers=admin_headers).get_json()["id"]
+
+    def create_tag(client):
+        return client.post(f"/store/{store_id}/tag", json={"name": f"bench-tag-{next(unique)}"}, headers=admin_headers).get_json()["id"]
+
+    def create_item(client):
+        body = {"name": f"bench-item-{next(unique)}", "price": 9.99, "description": "bench", "store_id": store_id}
+        return client.post("/item", json=body, headers=admin_headers).get_json()["id"]
+
+    def create_linked_item(client):
+        new_item = create_item(client)
+        client.post(f"/item/{new_item}/tag/{tag_id}", headers=admin_headers)
+        return new_item
+
+    def create_user(client):
+        username = f"bench-{next(unique)}"
+        client.post("/register", json={"username": username, "email": f"{username}@example.com", "password": PASSWORD})
+        tokens = client.post("/login", json={"username": username, "password": PASSWORD}).get_json()
+        return dict(tokens, username=username)
+
+    def create_reset_token(client):
+        raw = f"bench-reset-{next(unique)}-{os.getpid()}"
+        with app.app_context():
+            db.session.add(PasswordResetTokenModel(
+                user_id=first_user,
+                token_hash=hashlib.sha256(raw.encode("utf-8")).hexdigest(),
+                expires_at=datetime.now() + timedelta(hours=1),
+            ))
+            db.session.commit()
+        return raw
+
+    def bulk_items(n):
+        return [{"name": f"bulk-{next(unique)}", "price": 1.0, "store_id": store_id} for _ in range(n)]
+
+    def with_id(method, template, json=None, codes=(200,)):
+        def call(client, row_id):
+            body = json() if callable(json) else json
+            return ok(client.open(template.format(row_id), method=method, json=body, headers=admin_headers), *codes)
+        return call
+
+    def with_tokens(path, token_key, codes=(200,)):
+        def call(client, tokens):
+            return ok(client.post(path, headers={"Authorization": f"Bearer {tokens[token_key]}"}), *codes)
+        return call
+
+    def changes_cursor(client):
+        # The feed's end before the last two writes: a new item and its tag link.
+        create_linked_item(client)
+        with app.app_context():
+            head = db.session.get(ChangeCounterModel, 1).seq
+        return encode_cursor(CURSOR_SORT, [head - 2, END_RANK])
+
+    def create_user_id(client):
+        username = create_user(client)["username"]
+        with app.app_context():
+            return UserModel.query.filter_by(username=username).one().id
+
+    bulk_size = args.bulk_size
+    return [
+        ("GET /item", get("/item?limit=20")),
+        ("GET /item?filters", get(f"/item?limit=20&store_id={store_id}&sort=-price&min_price=10")),
+        ("GET /item/search", get(f"/item/search?q=item-0001&store_id={store_id}&limit=20")),
+        ("GET /item?tags", get(f"/item?limit=20&tags_any={tag_id}&tags_any={tag_id + 1}&tags_none={tag_id + 2}")),
+        ("GET /item?stream", get(f"/item?stream=true&store_id={store_id}")),
+        ("GET /item gzip", get_encoded("/item?limit=20", "gzip")),
+        ("GET /item?stream gzip", get_encoded(f"/item?stream=true&store_id={store_id}", "gzip")),
+        ("GET /item/<id>", get(f"/item/{item_id}")),
+        ("POST /item", lambda client: ok(client.post("/item", json={
+            "name": f"bench-item-{next(unique)}", "price": 1.5, "description": "bench", "store_id": store_id,
+        }, headers=admin_headers), 201)),
+        ("PUT /item/<id>", request("PUT", f"/item/{item_id}", {"name": "renamed", "price": 2.5, "description": "renamed"})),
+        ("DELETE /item/<id>", with_id("DELETE", "/item/{}"), create_item),
+        ("GET /store", get("/store?limit=20")),
+        ("GET /store/<id>", get(f"/store/{store_id}")),
+        ("GET /store/<id> br", get_encoded(f"/store/{store_id}", "br")),
+        ("GET /store/<id>/stats", get(f"/store/{store_id}/stats")),
+        ("GET /store/stats", get("/store/stats?stream=true")),
+        ("POST /store", lambda client: ok(client.post("/store", json={"name": f"bench-store-{next(unique)}"}, headers=admin_headers), 201)),
+        ("PUT /store/<id>", with_id("PUT", "/store/{}", lambda: {"name": f"renamed-store-{next(unique)}"}), create_store),
+        ("DELETE /store/<id>", with_id("DELETE", "/store/{}"), create_store),
+        ("GET /store/<id>/tag", get(f"/store/{store_id}/tag?limit=20")),
+        ("POST /store/<id>/tag", lambda client: ok(client.post(f"/store/{store_id}/tag", json={"name": f"bench-tag-{next(unique)}"}, headers=admin_headers), 201)),
+        ("GET /tag/<id>", get(f"/tag/{tag_id}")),
+        ("PUT /tag/<id>", with_id("PUT", "/tag/{}", lambda: {"name": f"renamed-tag-{next(unique)}"}), create_tag),
+        ("DELETE /tag/<id>", with_id("DELETE", "/tag/{}", codes=(200, 202)), create_tag),
+        ("POST /item/<id>/tag/<id>", with_id("POST", f"/item/{{}}/tag/{tag_id}", codes=(201,)), create_item),
+        ("DELETE /item/<id>/tag/<id>", with_id("DELETE", f"/item/{{}}/tag/{tag_id}"), create_linked_item),
+        ("POST /item/bulk", lambda client: ok(client.post("/item/bulk", json={"items": bulk_items(bulk_size)}, headers=admin_headers), 201)),
+        ("PUT /item/bulk", request("PUT", "/item/bulk", {"items": [{"id": item_id + n, "price": 3.0} for n in range(bulk_size)]})),
+        ("DELETE /item/bulk", lambda client, ids: ok(client.delete("/item/bulk", json={"ids": ids}, headers=admin_headers)),
+            lambda client: client.post("/item/bulk", json={"items": bulk_items(bulk_size)}, headers=admin_headers).get_json()["ids"]),
+        ("POST /batch", request("POST", "/batch", {"requests": [
+            {"method": "GET", "path": path}
+            for path in (f"/store/{store_id}", f"/store/{store_id}/tag", f"/item/{item_id}", f"/item/{item_id + 1}")
+        ]})),
+        ("GET /changes", get("/changes?limit=100")),
+        ("GET /changes?since", lambda client, cursor: ok(client.get("/changes", query_string={"since": cursor}, headers=admin_headers)),
+            changes_cursor),
+        ("POST /item/tags/bulk", lambda client, ids: ok(client.post("/item/tags/bulk", json={
+            "links": [{"item_id": new_id, "tag_id": tag_id} for new_id in ids],
+        }, headers=admin_headers), 200, 201),
+            lambda client: client.post("/item/bulk", json={"items": bulk_items(bulk_size)}, headers=admin_headers).get_json()["ids"]),
+        ("POST /register", lambda client: ok(client.post("/register", json={
+            "username": f"register-{next(unique)}", "email": f"register-{next(unique)}@example.com", "password": PASSWORD,
+        }), 201)),
+        ("POST /login", lambda client: ok(client.post("/login", json={"username": "user-1", "password": PASSWORD}))),
+        ("POST /refresh", with_tokens("/refresh", "refresh_token"), create_user),
+        ("POST /logout", with_tokens("/logout", "access_token"), create_user),
+        ("GET /user/<id>", get(f"/user/{first_user}")),
+        ("DELETE /user/<id>", with_id("DELETE", "/user/{}"), create_user_id),
+        ("POST /user/forgot-password", lambda client: ok(client.post("/user/forgot-password", json={"email": "user-1@example.com"}), 202)),
+        ("POST /user/reset-password", lambda client, raw: ok(client.post("/user/reset-password", json={"token": raw, "password": PASSWORD})),
+            create_reset_token),
+    ]
+
+
+def run(app, args):
+    counter = QueryCounter()
+    with app.app_context():
+        for engine in db.engines.values():
+            counter.listen(engine)
+
+    only = re.compile(args.only) if args.only else None
+    results = {}
+    for call in scenarios(app, args):
+        label = call[0]
+        if only and not only.search(label):
+            continue
+        counter.reset()
+        measured = (label, counter.measure(call[1]), *call[2:])
+        with RssSampler() as rss:
+            stats = run_load(app.test_client, [measured], args.concurrency, args.duration, warmup=args.warmup)[label]
+        stats["queries_per_request"] = counter.per_request()
+        stats["peak_rss_mb"] = rss.peak_mb
+        results[label] = stats
+        print_row(label, stats)
+    return results
+
+
+def print_row(label, stats):
+    cells = [stats["rps"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["queries_per_request"], stats["peak_rss_mb"]]
+    print(f"{label:30} " + " ".join(f"{'-' if c is None else c:>9}" for c in cells) + f" {stats['errors']:>7}")
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``, as printable lines."""
+    regressions = []
+    for label, stats in results.items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before:
+            continue
+        checks = [
+            ("p95_ms", lambda old, new: new > old * (1 + tolerance)),
+            ("p99_ms", lambda old, new: new > old * (1 + tolerance)),
+            ("rps", lambda old, new: new < old * (1 - tolerance)),
+            ("queries_per_request", lambda old, new: new - old >= 0.5),
+            ("peak_rss_mb", lambda old, new: new > old * (1 + tolerance)),
+        ]
+        for key, worse in checks:
+            old, new = before.get(key), stats.get(key)
+            if old is not None and new is not None and worse(old, new):
+                regressions.append(f"{label}: {key} {old} -> {new}")
+        if stats["errors"] > before.get("errors", 0):
+            regressions.append(f"{label}: errors {before.get('errors', 0)} -> {stats['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="Empty database to seed (default: a temporary SQLite file).")
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--tags-per-store", type=int, default=10)
+    parser.add_argument("--links-per-item", type=int, default=3)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--bulk-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--only", help="Regex; run only endpoints whose label matches.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help=f"Compare with this results file (e.g. {DEFAULT_BASELINE}).")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Write results to {DEFAULT_BASELINE}.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 0.2).")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    db_url = args.db_url
+    if db_url is None:
+        tmpdir = tempfile.mkdtemp(prefix="endpoints-bench-")
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    try:
+        app = create_app(db_url)
+        app.extensions["email_queue"] = CountingQueue()
+        seed_database(app, args)
+
+        print(f"{'endpoint':30} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>9} {'rss MB':>9} {'errors':>7}")
+        results = run(app, args)
+        with app.app_context():
+            dialect = db.engine.dialect.name
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "database": dialect},
+        "settings": {k: v for k, v in vars(args).items() if k not in ("db_url", "only", "output", "baseline", "update_baseline", "tolerance")},
+        "endpoints": results,
+    }
+    for path in filter(None, [args.output, DEFAULT_BASELINE if args.update_baseline else None]):
+        with open(path, "w") as out:
+            json.dump(report, out, indent=2)
+
+    failed = any(stats["errors"] for stats in results.values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != report["settings"]:
+            print("warning: baseline was recorded with different settings")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) against {args.baseline}.")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Threaded load generator shared by the benchmarks.
+
+``run_load`` starts ``concurrency`` threads, each with its own client from
+``make_client``, that pick calls from ``calls`` round-robin (offset per
+thread) until ``duration`` seconds have passed, and records one latency per
+call, grouped by the call's label.
+
+``RssSampler`` tracks the peak resident memory of a process (and its
+children) while a block runs.
+"""
+import itertools
+import os
+import subprocess
+import threading
+import time
+from collections import defaultdict
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, seconds):
+    """Throughput and latency percentiles (ms) for one label."""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def run_load(make_client, calls, concurrency, duration, warmup=0.0):
+    """Drive ``calls`` and return ``{label: summary}`` plus an ``"all"`` entry.
+
+    ``calls`` is a list of ``(label, fn)`` or ``(label, fn, prepare)``.
+    ``fn(client)`` performs one request and returns True on success. With
+    ``prepare``, ``prepare(client)`` runs untimed first (e.g. to create the
+    row a DELETE removes) and its result is passed as ``fn(client, prepared)``;
+    throughput for such labels counts timed work only. Calls started during
+    ``warmup`` are not counted.
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(offset):
+        client = make_client()
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        for call in itertools.islice(itertools.cycle(calls), offset, None):
+            label, fn = call[:2]
+            prepare = call[2] if len(call) > 2 else None
+            if time.perf_counter() >= stop_at:
+                break
+            try:
+                args = (prepare(client),) if prepare else ()
+                began = time.perf_counter()
+                ok = fn(client, *args)
+            except Exception:
+                began, ok = time.perf_counter(), False
+            if began < measure_from:
+                continue
+            if ok:
+                local_latencies[label].append(time.perf_counter() - began)
+            else:
+                local_errors[label] += 1
+        with lock:
+            for label, values in local_latencies.items():
+                latencies[label].extend(values)
+            for label, count in local_errors.items():
+                errors[label] += count
+
+    threads = [threading.Thread(target=worker, args=(i % len(calls),), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    prepared = {call[0] for call in calls if len(call) > 2}
+    results = {}
+    for label in dict.fromkeys(call[0] for call in calls):
+        seconds = duration
+        if label in prepared:
+            seconds = sum(latencies[label]) / concurrency
+        results[label] = summarize(latencies[label], errors[label], seconds)
+    results["all"] = summarize(
+        [value for values in latencies.values() for value in values], sum(errors.values()), duration
+    )
+    return results
+
+
+def rss_kb(pid=None, children=False):
+    """Resident memory of ``pid`` (default: this process), from /proc (Linux only)."""
+    pids = [str(pid or os.getpid())]
+    if children:
+        pids += subprocess.run(["pgrep", "-P", pids[0]], capture_output=True, text=True).stdout.split()
+    total = 0
+    try:
+        for proc in pids:
+            with open(f"/proc/{proc}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+    except OSError:
+        return None
+    return total
+
+
+class RssSampler:
+    """Context manager recording the peak of ``rss_kb`` every ``interval`` seconds."""
+
+    def __init__(self, pid=None, children=False, interval=0.1):
+        self.pid = pid
+        self.children = children
+        self.interval = interval
+        self.start_kb = None
+        self.peak_kb = None
+        self._stop = threading.Event()
+
+    def sample(self):
+        rss = rss_kb(self.pid, self.children)
+        if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+            self.peak_kb = rss
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.start_kb = self.sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    @property
+    def peak_mb(self):
+        return round(self.peak_kb / 1024, 1) if self.peak_kb else None
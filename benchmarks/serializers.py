@@ -0,0 +1,114 @@
+"""Parity check and benchmark for the compiled serializers.
+
+    python -m benchmarks.serializers --items 5000 --repeat 20
+
+Seeds an in-memory SQLite database, then:
+
+* checks that every compiled dumper in ``utils.serializers`` produces the
+  same JSON bytes as ``Schema.dump`` for each schema in ``schemas.py``, and
+  that the projected GET /item page matches the ORM + marshmallow page;
+* times both paths for one page of ``--page-size`` items.
+
+Exits non-zero if any output differs. tests/test_serializers.py runs the
+same checks under pytest.
+"""
+import argparse
+import os
+import sys
+import time
+
+from flask import json
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+
+from app import create_app
+from db import db
+from models import ItemModel, StoreModel, TagModel
+from resources.item import ITEM_LOAD_OPTIONS, dump_item_page
+import schemas
+from seed import seed
+from utils.pagination import apply_keyset, build_page
+from utils.projections import item_rows_query, build_item_rows
+from utils.serializers import compile_schema
+
+SORT_COLUMNS = {"id": ItemModel.id, "name": ItemModel.name, "price": ItemModel.price}
+
+
+def orm_page(sort, limit):
+    query = apply_keyset(ItemModel.query.options(*ITEM_LOAD_OPTIONS), sort, None, limit, SORT_COLUMNS, ItemModel.id)
+    return json.dumps(schemas.ItemPageSchema().dump(build_page(query.all(), sort, limit)))
+
+
+def compiled_page(sort, limit):
+    query = apply_keyset(item_rows_query(), sort, None, limit, SORT_COLUMNS, ItemModel.id)
+    page = build_page(query.all(), sort, limit)
+    page["data"] = build_item_rows(page["data"])
+    return json.dumps(dump_item_page(page))
+
+
+def check_parity(limit):
+    failures = []
+    samples = {
+        schemas.PlainItemSchema: ItemModel.query.limit(50).all(),
+        schemas.ItemSchema: ItemModel.query.limit(50).all(),
+        schemas.PlainStoreSchema: StoreModel.query.limit(20).all(),
+        schemas.StoreSchema: StoreModel.query.limit(20).all(),
+        schemas.PlainTagSchema: TagModel.query.limit(50).all(),
+        schemas.TagSchema: TagModel.query.limit(50).all(),
+    }
+    for schema_cls, objs in samples.items():
+        schema = schema_cls()
+        dump = compile_schema(schema)
+        for obj in objs:
+            if json.dumps(dump(obj)) != json.dumps(schema.dump(obj)):
+                failures.append(f"{schema_cls.__name__} id={obj.id}")
+
+    for sort in ("id", "-id", "name", "-name", "price", "-price"):
+        if orm_page(sort, limit) != compiled_page(sort, limit):
+            failures.append(f"GET /item page sort={sort}")
+    return failures
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--tags-per-store", type=int, default=10)
+    parser.add_argument("--links-per-item", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = create_app("sqlite://")
+    with app.app_context():
+        seed(args.stores, args.items, args.tags_per_store, args.links_per_item)
+
+        failures = check_parity(args.page_size)
+        if failures:
+            print("Parity check FAILED:")
+            for failure in failures:
+                print("  " + failure)
+            return 1
+        print("Parity check passed.")
+
+        baseline = timeit(lambda: orm_page("id", args.page_size), args.repeat)
+        compiled = timeit(lambda: compiled_page("id", args.page_size), args.repeat)
+        print(f"GET /item page of {args.page_size} (best of {args.repeat}):")
+        print(f"  ORM + marshmallow:      {baseline * 1000:8.2f} ms")
+        print(f"  projection + compiled:  {compiled * 1000:8.2f} ms")
+        print(f"  speedup:                {baseline / compiled:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
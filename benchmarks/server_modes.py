@@ -0,0 +1,184 @@
+"""Compare the WSGI (gunicorn) and ASGI (uvicorn + asgi.py) deployments.
+
+    python -m benchmarks.server_modes --concurrency 200 --duration 30
+    python -m benchmarks.server_modes --db-url postgresql://... --workers 2 --modes asgi
+
+Seeds a database (a SQLite file by default; a ``--db-url`` database must be
+empty), then for each mode starts the server with ``--workers`` processes,
+drives a mix of authenticated GETs on items, stores and tags plus a share of
+``PUT /item`` writes (``--write-ratio``) from ``--concurrency`` threads, and
+prints throughput, p50/p95/p99 latency, errors and the server's peak RSS.
+
+Run it against PostgreSQL for meaningful numbers: the ASGI mode only pays
+off when requests wait on database round trips, and SQLite serializes
+writers. ``--json`` writes the results for comparison between runs.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import requests
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+os.environ["RESPONSE_CACHE_BACKEND"] = os.getenv("RESPONSE_CACHE_BACKEND", "local")
+os.environ["QUEUE_BACKEND"] = "local"
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from benchmarks.load import RssSampler, run_load
+from db import db
+from models import UserModel
+from seed import seed
+
+COMMANDS = {
+    "wsgi": lambda port, workers, threads: [
+        "gunicorn", "app:create_app()", "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers), "--threads", str(threads), "--log-level", "warning",
+    ],
+    "asgi": lambda port, workers, threads: [
+        "uvicorn", "--factory", "asgi:create_asgi_app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ],
+}
+
+
+def seed_database(db_url, stores, items):
+    app = create_app(db_url)
+    with app.app_context():
+        seed(stores, items, tags_per_store=10, links_per_item=3)
+        db.session.execute(db.insert(UserModel), [{
+            "username": "server-modes",
+            "email": "server-modes@example.com",
+            "password": "unused",
+            "is_admin": True,
+        }])
+        db.session.commit()
+        user_id = UserModel.query.filter_by(username="server-modes").one().id
+        return create_access_token(identity=str(user_id), fresh=True, expires_delta=timedelta(days=1))
+
+
+def wait_until_ready(base_url, headers, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/store?limit=1", headers=headers, timeout=2).status_code == 200:
+                return
+        except (requests.ConnectionError, requests.Timeout):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def build_calls(base_url, headers, stores, items, write_ratio):
+    def get(path):
+        return lambda session: session.get(base_url + path, headers=headers).status_code == 200
+
+    calls = [
+        ("GET /item", get("/item?limit=20")),
+        ("GET /item?store_id", get("/item?limit=20&store_id=1&sort=price")),
+        ("GET /item/<id>", get(f"/item/{items // 2}")),
+        ("GET /store", get("/store?limit=20")),
+        ("GET /store/<id>", get("/store/1")),
+        ("GET /store/<id>/tag", get("/store/1/tag?limit=20")),
+        ("GET /tag/<id>", get("/tag/1")),
+    ]
+    if write_ratio > 0:
+        body = {"name": "renamed", "price": 1.0, "description": "renamed"}
+        put = lambda session: session.put(f"{base_url}/item/{items}", json=body, headers=headers).status_code == 200
+        writes = max(1, round(len(calls) * write_ratio / (1 - write_ratio)))
+        calls.extend([("PUT /item/<id>", put)] * writes)
+    return calls
+
+
+def run_mode(mode, args, db_url, token):
+    port = args.port
+    headers = {"Authorization": f"Bearer {token}"}
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_URL=db_url)
+    server = subprocess.Popen(COMMANDS[mode](port, args.workers, args.threads), env=env)
+    try:
+        wait_until_ready(base_url, headers)
+
+        def make_client():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount("http://", adapter)
+            return session
+
+        with RssSampler(server.pid, children=True, interval=0.5) as rss:
+            results = run_load(
+                make_client,
+                build_calls(base_url, headers, args.stores, args.items, args.write_ratio),
+                args.concurrency,
+                args.duration,
+                warmup=args.warmup,
+            )
+        results["all"]["peak_rss_mb"] = rss.peak_mb
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_results(mode, results):
+    print(f"\n{mode}")
+    print(f"  {'endpoint':22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for label, stats in results.items():
+        print(
+            f"  {label:22} {stats['rps'] or 0:>8} {stats['p50_ms'] or '-':>8} "
+            f"{stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8} {stats['errors']:>7}"
+        )
+    print(f"  peak RSS: {results['all']['peak_rss_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="Empty database to seed (default: a temporary SQLite file).")
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker.")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Write results to this file.")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    db_url = args.db_url
+    if db_url is None:
+        tmpdir = tempfile.mkdtemp(prefix="server-modes-")
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    try:
+        token = seed_database(db_url, args.stores, args.items)
+        report = {"settings": {k: v for k, v in vars(args).items() if k not in ("db_url", "json")}, "modes": {}}
+        for mode in args.modes.split(","):
+            report["modes"][mode] = run_mode(mode, args, db_url, token)
+            print_results(mode, report["modes"][mode])
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(report, out, indent=2)
+    failed = any(results["all"]["errors"] for results in report["modes"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Cold-start budget check for a web worker.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 7 --import-budget 1.5 --create-budget 0.5
+
+Starts ``--runs`` fresh interpreters. Each one times ``import app`` and then
+``create_app()``, using the migrations-only startup (``DB_CREATE_ALL=0``)
+against a SQLite file. It also reports which of ``DEFERRED_MODULES`` got
+imported.
+
+Exits non-zero when the median import or create time exceeds its budget, or
+when a deferred module is loaded at startup. Those modules are only needed
+by the ``flask db`` commands, the email worker or the RQ backend.
+tests/test_startup.py enforces the same budgets.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET = 0.8
+CREATE_BUDGET = 0.2
+DEFERRED_MODULES = ("flask_migrate", "alembic", "tasks", "maileroo", "requests", "rq", "asyncpg", "aiosqlite")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create": created - imported,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def probe(db_url):
+    env = dict(
+        os.environ,
+        DATABASE_URL=db_url,
+        DB_CREATE_ALL="0",
+        JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "startup-budget-secret-key-startup-budget"),
+        QUEUE_BACKEND="local",
+    )
+    for name in ("FLASK_RUN_FROM_CLI", "REDIS_URL", "PROMETHEUS_MULTIPROC_DIR"):
+        env.pop(name, None)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def check_budget(runs=5, import_budget=IMPORT_BUDGET, create_budget=CREATE_BUDGET):
+    """Probe ``runs`` cold starts; ``(import_time, create_time, failures)`` with median times."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'startup.db')}"
+        probes = [probe(db_url) for _ in range(runs)]
+
+    import_time = statistics.median(p["import"] for p in probes)
+    create_time = statistics.median(p["create"] for p in probes)
+    loaded = sorted({name for p in probes for name in p["loaded"]})
+
+    failures = []
+    if import_time > import_budget:
+        failures.append(f"import app took {import_time:.3f}s (budget {import_budget}s)")
+    if create_time > create_budget:
+        failures.append(f"create_app() took {create_time:.3f}s (budget {create_budget}s)")
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+    return import_time, create_time, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET, help="Seconds for `import app` (median).")
+    parser.add_argument("--create-budget", type=float, default=CREATE_BUDGET, help="Seconds for `create_app()` (median).")
+    args = parser.parse_args(argv)
+
+    import_time, create_time, failures = check_budget(args.runs, args.import_budget, args.create_budget)
+
+    print(f"import app:   {import_time:.3f}s (median of {args.runs}, budget {args.import_budget}s)")
+    print(f"create_app(): {create_time:.3f}s (median of {args.runs}, budget {args.create_budget}s)")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("Startup budget " + ("exceeded." if failures else "met."))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Deletes expired token-blocklist, password-reset and change-feed tombstone rows.
+
+Rows are removed in batches of ``COMPACTION_BATCH_SIZE`` ids, each batch in
+its own short transaction, so a large backlog never holds a long lock on
+the table. Run it with ``flask compact-expired``, or periodically on the RQ
+worker with ``flask compact-expired --schedule`` (the worker must run with
+``--with-scheduler``).
+
+Expired blocklist rows are safe to drop: a token past its ``exp`` is
+rejected by flask-jwt-extended before the blocklist is consulted. Pruning
+tombstones raises the change feed's ``retained_seq`` (models.changes), so
+clients holding an older cursor get 410 and resync. Change number
+allocations older than ``CHANGES_ALLOCATION_TIMEOUT`` belong to processes
+that died mid-transaction; readers already ignore them, and they go too.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, select
+
+from db import db
+from models import TokenBlocklistModel, PasswordResetTokenModel, TombstoneModel
+from models.changes import prune_tombstones, release_stale_allocations
+
+COMPACTED_MODELS = (TokenBlocklistModel, PasswordResetTokenModel, TombstoneModel)
+SCHEDULED_JOB_PREFIX = "compact-expired-"
+
+
+def compact_model(model, now, batch_size, pause=0.0):
+    """Delete rows of ``model`` that expired before ``now``; return how many."""
+    deleted = 0
+    expired = (
+        select(model.id)
+        .where(model.expires_at < now)
+        .order_by(model.expires_at)
+        .limit(batch_size)
+    )
+    while True:
+        ids = db.session.scalars(expired).all()
+        if not ids:
+            break
+        if model is TombstoneModel:
+            prune_tombstones(db.session.connection(), ids)
+        else:
+            db.session.execute(delete(model).where(model.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def compact_expired(batch_size=1000, pause=0.0, now=None):
+    """Compact every table in COMPACTED_MODELS and stale change allocations; report rows reclaimed and time taken."""
+    now = now or datetime.now()
+    report = {"tables": {}}
+    started = time.perf_counter()
+    for model in COMPACTED_MODELS:
+        table_started = time.perf_counter()
+        deleted = compact_model(model, now, batch_size, pause)
+        report["tables"][model.__tablename__] = {
+            "deleted": deleted,
+            "seconds": round(time.perf_counter() - table_started, 3),
+        }
+    table_started = time.perf_counter()
+    stale_before = now - timedelta(seconds=current_app.config["CHANGES_ALLOCATION_TIMEOUT"])
+    released = release_stale_allocations(db.session.connection(), stale_before)
+    db.session.commit()
+    report["tables"]["change_allocations"] = {
+        "deleted": released,
+        "seconds": round(time.perf_counter() - table_started, 3),
+    }
+    report["deleted"] = sum(t["deleted"] for t in report["tables"].values())
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def schedule_compaction(connection, interval):
+    """Enqueue the next periodic run on the RQ ``default`` queue.
+
+    Returns None when a run is already scheduled, so repeated ``--schedule``
+    calls do not start a second chain.
+    """
+    from rq import Queue
+
+    queue = Queue("default", connection=connection)
+    if any(job_id.startswith(SCHEDULED_JOB_PREFIX) for job_id in queue.scheduled_job_registry.get_job_ids()):
+        return None
+    return queue.enqueue_in(
+        timedelta(seconds=interval),
+        "compaction.run_scheduled_compaction",
+        job_id=f"{SCHEDULED_JOB_PREFIX}{int(time.time())}",
+    )
+
+
+def run_scheduled_compaction():
+    """RQ job: compact, then schedule the next run so the chain keeps going.
+
+    The next run is scheduled even when this one fails; RQ records the
+    failure, and one bad run does not end the chain.
+    """
+    from app import create_app
+    from utils.redis_client import get_redis
+
+    app = create_app()
+    with app.app_context():
+        try:
+            return compact_expired(app.config["COMPACTION_BATCH_SIZE"], app.config["COMPACTION_PAUSE"])
+        finally:
+            schedule_compaction(get_redis(), app.config["COMPACTION_INTERVAL"])
+
+
+def init_compaction(app):
+    app.config.setdefault("COMPACTION_BATCH_SIZE", int(os.getenv("COMPACTION_BATCH_SIZE", "1000")))
+    app.config.setdefault("COMPACTION_PAUSE", float(os.getenv("COMPACTION_PAUSE", "0")))
+    app.config.setdefault("COMPACTION_INTERVAL", int(os.getenv("COMPACTION_INTERVAL", "3600")))
+
+    @app.cli.command("compact-expired")
+    @click.option("--batch-size", type=int, default=None, help="Rows deleted per transaction.")
+    @click.option("--pause", type=float, default=None, help="Seconds to sleep between batches.")
+    @click.option("--schedule", is_flag=True, help="Start the periodic RQ job instead of running now.")
+    def compact_expired_command(batch_size, pause, schedule):
+        """Delete expired token blocklist, password reset and tombstone rows."""
+        if schedule:
+            from utils.redis_client import get_redis
+
+            connection = get_redis()
+            if connection is None:
+                raise click.ClickException("REDIS_URL is not set; cannot schedule compaction.")
+            if schedule_compaction(connection, app.config["COMPACTION_INTERVAL"]) is None:
+                click.echo("Compaction is already scheduled.")
+                return
+            click.echo(f"Compaction scheduled every {app.config['COMPACTION_INTERVAL']}s.")
+            return
+
+        report = compact_expired(
+            batch_size or app.config["COMPACTION_BATCH_SIZE"],
+            app.config["COMPACTION_PAUSE"] if pause is None else pause,
+        )
+        for table, stats in report["tables"].items():
+            click.echo(f"{table}: {stats['deleted']} rows reclaimed in {stats['seconds']}s")
+        click.echo(f"total: {report['deleted']} rows reclaimed in {report['seconds']}s")
@@ -1,3 +1,32 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
\ No newline at end of file
+from utils.replicas import DEFER_COMMIT, RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def commits_deferred():
+    """True while a transactional batch holds back the session's commits (resources/batch.py).
+
+    Nothing read in the meantime may be cached beyond the request: it is
+    uncommitted and may still be rolled back.
+    """
+    return db.session.info.get(DEFER_COMMIT, False)
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def enforce_sqlite_foreign_keys(app):
+    """Turn on foreign keys, and so their ON DELETE CASCADE, on every SQLite connection.
+
+    SQLite leaves them off unless each connection asks. Call after ``db.init_app``.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", _enable_foreign_keys)
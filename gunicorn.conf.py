@@ -0,0 +1,44 @@
+"""gunicorn settings, picked up from the working directory by ``gunicorn "app:create_app()"``.
+
+* ``preload_app`` (``GUNICORN_PRELOAD``, on by default): the app is imported
+  and built once in the master and workers fork from it, so scaling out does
+  not repeat the imports. ``post_fork`` drops the database connections the
+  master opened.
+* prometheus_client runs in multiprocess mode so ``/metrics`` reports every
+  worker, not just the one answering the scrape (see utils.metrics).
+"""
+import os
+import shutil
+import tempfile
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "store-api-prometheus")
+)
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this run's samples.
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Pooled connections opened in the master must not be shared with the workers.
+    from db import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
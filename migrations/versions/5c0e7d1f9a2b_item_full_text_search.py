@@ -0,0 +1,59 @@
+"""item full-text search
+
+Revision ID: 5c0e7d1f9a2b
+Revises: ba2d70cb50d1
+Create Date: 2026-10-18 19:02:11.408215
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0e7d1f9a2b'
+down_revision = 'ba2d70cb50d1'
+branch_labels = None
+depends_on = None
+
+# Same DDL as utils.search, which installs it for db.create_all. SQLite batch
+# operations that recreate `items` drop its triggers; re-run these after them.
+POSTGRES_UPGRADE = (
+    "CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin "
+    "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '')))",
+)
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "name, description, content='items', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name, description ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    # Index the rows that already exist.
+    "INSERT INTO items_fts(items_fts) VALUES ('rebuild')",
+)
+
+POSTGRES_DOWNGRADE = ("DROP INDEX IF EXISTS ix_items_search",)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS items_fts_update",
+    "DROP TRIGGER IF EXISTS items_fts_delete",
+    "DROP TRIGGER IF EXISTS items_fts_insert",
+    "DROP TABLE IF EXISTS items_fts",
+)
+
+
+def _run(postgres, sqlite):
+    dialect = op.get_bind().dialect.name
+    for statement in {"postgresql": postgres, "sqlite": sqlite}.get(dialect, ()):
+        op.execute(statement)
+
+
+def upgrade():
+    _run(POSTGRES_UPGRADE, SQLITE_UPGRADE)
+
+
+def downgrade():
+    _run(POSTGRES_DOWNGRADE, SQLITE_DOWNGRADE)
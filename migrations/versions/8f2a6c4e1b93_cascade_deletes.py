@@ -0,0 +1,66 @@
+"""cascade deletes
+
+Revision ID: 8f2a6c4e1b93
+Revises: 3d8f6a1c9e27
+Create Date: 2026-10-18 21:06:52.417730
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2a6c4e1b93'
+down_revision = '3d8f6a1c9e27'
+branch_labels = None
+depends_on = None
+
+# The initial schema left these foreign keys unnamed. PostgreSQL named them
+# <table>_<column>_fkey; SQLite reflects them without a name, so batch mode
+# is given the same convention to find them.
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+# table -> (column, referred table)
+FOREIGN_KEYS = {
+    "items": (("store_id", "stores"),),
+    "tags": (("store_id", "stores"),),
+    "items_tags": (("item_id", "items"), ("tag_id", "tags")),
+    "store_stats": (("store_id", "stores"),),
+}
+
+# Recreating `items` on SQLite drops the full-text search triggers (5c0e7d1f9a2b);
+# the index itself is unchanged, since the rows keep their ids.
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name, description ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+)
+
+
+def _replace_foreign_keys(ondelete):
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in foreign_keys:
+                name = f"{table}_{column}_fkey"
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade():
+    # Rows left behind by store deletes before this revision; the new constraints would reject them.
+    op.execute("DELETE FROM items WHERE store_id NOT IN (SELECT id FROM stores)")
+    op.execute("DELETE FROM tags WHERE store_id NOT IN (SELECT id FROM stores)")
+    op.execute("DELETE FROM items_tags WHERE item_id NOT IN (SELECT id FROM items) OR tag_id NOT IN (SELECT id FROM tags)")
+    op.execute("DELETE FROM store_stats WHERE store_id NOT IN (SELECT id FROM stores)")
+    _replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    _replace_foreign_keys(None)
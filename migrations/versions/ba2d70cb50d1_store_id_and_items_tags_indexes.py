@@ -0,0 +1,62 @@
+"""store_id and items_tags indexes
+
+Revision ID: ba2d70cb50d1
+Revises: 999435e2622f
+Create Date: 2026-10-18 17:21:30.683558
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ba2d70cb50d1'
+down_revision = '999435e2622f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_items_store_id'), ['store_id'], unique=False)
+
+    # (item_id, tag_id) becomes the primary key: drop half-empty and duplicate links first.
+    op.execute("DELETE FROM items_tags WHERE item_id IS NULL OR tag_id IS NULL")
+    op.execute(
+        "DELETE FROM items_tags WHERE id NOT IN "
+        "(SELECT min_id FROM (SELECT MIN(id) AS min_id FROM items_tags GROUP BY item_id, tag_id) AS keep)"
+    )
+
+    with op.batch_alter_table('items_tags', schema=None) as batch_op:
+        batch_op.drop_column('id')
+        batch_op.alter_column('item_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.alter_column('tag_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.create_primary_key('items_tags_pkey', ['item_id', 'tag_id'])
+        batch_op.create_index('ix_items_tags_tag_id_item_id', ['tag_id', 'item_id'], unique=False)
+
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tags_store_id'), ['store_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tags_store_id'))
+
+    # Recreate the table so the restored surrogate id is numbered by the database.
+    with op.batch_alter_table('items_tags', schema=None, recreate='always') as batch_op:
+        batch_op.drop_index('ix_items_tags_tag_id_item_id')
+        batch_op.drop_constraint('items_tags_pkey', type_='primary')
+        batch_op.add_column(sa.Column('id', sa.INTEGER(), primary_key=True, autoincrement=True))
+        batch_op.alter_column('tag_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.alter_column('item_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_items_store_id'))
@@ -4,4 +4,9 @@ from models.tag import TagModel
 from models.item_tags import ItemTags
 from models.user import UserModel
 from models.password_reset import PasswordResetTokenModel
-from models.token_blocklist import TokenBlocklistModel
\ No newline at end of file
+from models.token_blocklist import TokenBlocklistModel
+from models.store_stats import StoreStatsModel
+from models.changes import ChangeAllocationModel, ChangeCounterModel, TombstoneModel
+
+import models.versioning
+import models.change_tracking
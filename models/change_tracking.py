@@ -0,0 +1,59 @@
+"""Stamps ORM writes to the catalog with their transaction's change number.
+
+Inserts get it from the ``change_seq`` column default (models.changes). The
+listeners below cover the rest: updates of a row's own columns, deletes,
+which leave a tombstone, and links removed through ``ItemModel.tags``.
+Changes that only show up in other rows' payloads, such as a store rename
+for its items, do not restamp those rows. The feed sends plain rows, not
+nested ones.
+
+The bulk endpoints stamp and tombstone their set-based writes themselves.
+"""
+from itertools import chain
+
+from sqlalchemy import event, inspect
+
+from models.changes import add_tombstones, next_change_seq
+from models.item import ItemModel
+from models.store import StoreModel
+from models.tag import TagModel
+from utils.replicas import RoutingSession
+
+# Kind reported by GET /changes, and the columns that make up the row there.
+TRACKED_MODELS = {
+    StoreModel: ("store", ("name",)),
+    TagModel: ("tag", ("name", "store_id")),
+    ItemModel: ("item", ("name", "description", "price", "store_id")),
+}
+_tracked_classes = tuple(TRACKED_MODELS)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _take_change_seq(session, flush_context, instances):
+    # Lock the counter before any catalog row: writers always lock in the same order.
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, _tracked_classes):
+            next_change_seq(session.connection(bind_arguments={"mapper": inspect(obj).mapper}))
+            return
+
+
+def _stamp_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in TRACKED_MODELS[mapper.class_][1]):
+        target.change_seq = next_change_seq(connection)
+
+
+def _tombstone(mapper, connection, target):
+    add_tombstones(connection, TRACKED_MODELS[mapper.class_][0], [target.id])
+
+
+for _model in TRACKED_MODELS:
+    event.listen(_model, "before_update", _stamp_update)
+    event.listen(_model, "after_delete", _tombstone)
+
+
+@event.listens_for(ItemModel, "after_update")
+def _links_removed(mapper, connection, target):
+    removed = inspect(target).attrs.tags.history.deleted
+    if removed:
+        add_tombstones(connection, "item_tag", [target.id] * len(removed), [tag.id for tag in removed])
@@ -0,0 +1,193 @@
+"""Change sequence numbers and tombstones behind ``GET /changes``.
+
+Every transaction that writes to the catalog takes the next number the
+first time it needs one, and stamps it on the rows it inserts or updates
+(``change_seq`` on items, stores, tags and ``items_tags``). Deletes leave a
+tombstone with that number instead.
+
+Numbers are handed out in start order, but transactions commit in any
+order, and a feed that moved past 7 while 6 was still in flight would never
+deliver 6. So a number stays in ``change_allocations`` until its
+transaction commits: the writer deletes the row in that same commit, and a
+rollback deletes it afterwards. Readers stop just below the oldest number
+still allocated (``committed_head``), or at the counter when there is none.
+Both are read in one statement, so from one snapshot: every number up to
+the counter has been allocated by then, and every one of those that is no
+longer allocated is committed.
+
+The allocation itself is a short transaction of its own, on another
+connection from the pool: it bumps the ``change_counter`` row and inserts
+the allocation. The counter row is locked only for that transaction, which
+also makes allocations commit in number order, so a reader never sees a
+number without every smaller one. Writers no longer wait on each other
+for the rest of their transactions, bulk requests included. SQLite runs one
+writer at a time anyway, so there the number is taken inside the writing
+transaction and nothing is allocated.
+
+An allocation whose process died before it could release it is ignored
+once it is older than ``CHANGES_ALLOCATION_TIMEOUT`` seconds, and removed by
+``flask compact-expired``. A catalog write transaction running longer than
+that could have its changes skipped by a cursor that moved on meanwhile.
+
+Tombstones expire after ``CHANGES_TOMBSTONE_DAYS`` and are deleted by
+``flask compact-expired``. ``retained_seq`` is then raised past the
+newest pruned one, and cursors from before it can no longer be resumed.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import DDL, delete, event, func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+
+
+class ChangeCounterModel(db.Model):
+    __tablename__ = "change_counter"
+
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Tombstones numbered below this may have been pruned.
+    retained_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+class ChangeAllocationModel(db.Model):
+    """A change number whose transaction has not committed yet."""
+    __tablename__ = "change_allocations"
+    __table_args__ = (db.Index("ix_change_allocations_allocated_at", "allocated_at"),)
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    allocated_at = db.Column(db.DateTime, nullable=False)
+
+
+class TombstoneModel(db.Model):
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        db.Index("ix_tombstones_change_seq_id", "change_seq", "id"),
+        db.Index("ix_tombstones_expires_at", "expires_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)
+    # For "item_tag" tombstones row_id is the item and tag_id the tag.
+    row_id = db.Column(db.Integer, nullable=False)
+    tag_id = db.Column(db.Integer)
+    change_seq = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+counter_table = ChangeCounterModel.__table__
+allocations_table = ChangeAllocationModel.__table__
+tombstones_table = TombstoneModel.__table__
+
+event.listen(counter_table, "after_create", DDL("INSERT INTO change_counter (id, seq, retained_seq) VALUES (1, 0, 0)"))
+
+_SEQ_KEY = "change_seq"
+_ALLOCATED_KEY = "change_seq_allocated"
+
+
+def bump_counter(connection):
+    bump = update(counter_table).where(counter_table.c.id == 1).values(seq=counter_table.c.seq + 1)
+    if connection.dialect.update_returning:
+        return connection.execute(bump.returning(counter_table.c.seq)).scalar_one()
+    connection.execute(bump)
+    return connection.execute(select(counter_table.c.seq).where(counter_table.c.id == 1)).scalar_one()
+
+
+def allocate_change_seq(engine):
+    """Take the next number in a transaction of its own and record it as in flight."""
+    with engine.begin() as allocator:
+        seq = bump_counter(allocator)
+        allocator.execute(insert(allocations_table).values(seq=seq, allocated_at=datetime.now()))
+    return seq
+
+
+def next_change_seq(connection):
+    """The change number of ``connection``'s current transaction, taken on first use."""
+    transaction = connection.get_transaction()
+    cached = connection.info.get(_SEQ_KEY)
+    if cached is not None and cached[0] is transaction:
+        return cached[1]
+
+    if connection.dialect.name == "sqlite":
+        seq = bump_counter(connection)
+    else:
+        seq = allocate_change_seq(connection.engine)
+        connection.info[_ALLOCATED_KEY] = seq
+    connection.info[_SEQ_KEY] = (transaction, seq)
+    return seq
+
+
+@event.listens_for(Engine, "commit")
+def _release_on_commit(connection):
+    seq = connection.info.pop(_ALLOCATED_KEY, None)
+    if seq is not None:
+        # Part of the commit: readers see the number released together with the rows stamped with it.
+        connection.execute(delete(allocations_table).where(allocations_table.c.seq == seq))
+
+
+@event.listens_for(Engine, "rollback")
+def _release_on_rollback(connection):
+    seq = connection.info.pop(_ALLOCATED_KEY, None)
+    if seq is None:
+        return
+    try:
+        # Nothing numbered ``seq`` will commit; the transaction never touched the allocation row.
+        with connection.engine.begin() as releaser:
+            releaser.execute(delete(allocations_table).where(allocations_table.c.seq == seq))
+    except SQLAlchemyError:
+        pass  # Ignored by readers once older than CHANGES_ALLOCATION_TIMEOUT.
+
+
+def committed_head(session):
+    """``(head, retained_seq)``: every change numbered up to ``head`` has committed."""
+    timeout = current_app.config["CHANGES_ALLOCATION_TIMEOUT"]
+    oldest_allocated = (
+        select(func.min(allocations_table.c.seq))
+        .where(allocations_table.c.allocated_at > datetime.now() - timedelta(seconds=timeout))
+        .scalar_subquery()
+    )
+    seq, retained_seq, allocated = session.execute(
+        select(counter_table.c.seq, counter_table.c.retained_seq, oldest_allocated).where(counter_table.c.id == 1)
+    ).one()
+    return (seq if allocated is None else allocated - 1), retained_seq
+
+
+def release_stale_allocations(connection, before):
+    """Delete allocations made before ``before``, left behind by processes that died; return how many."""
+    result = connection.execute(delete(allocations_table).where(allocations_table.c.allocated_at < before))
+    return result.rowcount
+
+
+def change_seq_default(context):
+    """Column default: inserts, including executemany and ``items_tags`` links, get the transaction's number."""
+    return next_change_seq(context.connection)
+
+
+def tombstone_expiry():
+    days = current_app.config["CHANGES_TOMBSTONE_DAYS"] if has_app_context() else 30
+    return datetime.now() + timedelta(days=days)
+
+
+def add_tombstones(connection, kind, row_ids, tag_ids=None):
+    """Record the deletion of ``row_ids`` (with ``tag_ids`` for links) in this transaction."""
+    row_ids = list(row_ids)
+    if not row_ids:
+        return
+    seq, expires_at = next_change_seq(connection), tombstone_expiry()
+    tag_ids = tag_ids or [None] * len(row_ids)
+    connection.execute(insert(tombstones_table), [
+        {"kind": kind, "row_id": row_id, "tag_id": tag_id, "change_seq": seq, "expires_at": expires_at}
+        for row_id, tag_id in zip(row_ids, tag_ids)
+    ])
+
+
+def prune_tombstones(connection, ids):
+    """Delete the tombstones ``ids`` and raise ``retained_seq`` past them."""
+    newest = select(func.max(tombstones_table.c.change_seq)).where(tombstones_table.c.id.in_(ids)).scalar_subquery()
+    connection.execute(
+        update(counter_table).where(counter_table.c.id == 1, counter_table.c.retained_seq <= newest)
+        .values(retained_seq=newest + 1)
+    )
+    connection.execute(tombstones_table.delete().where(tombstones_table.c.id.in_(ids)))
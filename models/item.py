@@ -1,14 +1,28 @@
 from db import db
+from models.changes import change_seq_default
 
 
 class ItemModel(db.Model):
     __tablename__ = "items"
+    __table_args__ = (
+        # Keyset pagination sort orders on GET /item
+        db.Index("ix_items_name_id", "name", "id"),
+        db.Index("ix_items_price_id", "price", "id"),
+        # Min/max price per store for models.store_stats
+        db.Index("ix_items_store_id_price", "store_id", "price"),
+        # GET /changes
+        db.Index("ix_items_change_seq_id", "change_seq", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     description = db.Column(db.String)
     price = db.Column(db.Float(precision=2), unique=False, nullable=False)
-    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), unique=False, nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id", ondelete="CASCADE"), unique=False, nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    change_seq = db.Column(db.Integer, nullable=False, default=change_seq_default, server_default="0")
 
     store = db.relationship("StoreModel", back_populates="items")
-    tags = db.relationship("TagModel", back_populates="items", secondary="items_tags")
\ No newline at end of file
+    tags = db.relationship(
+        "TagModel", back_populates="items", secondary="items_tags", order_by="TagModel.id", passive_deletes=True
+    )
\ No newline at end of file
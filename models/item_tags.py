@@ -1,9 +1,16 @@
 from db import db
+from models.changes import change_seq_default
 
 # many to many
 class ItemTags(db.Model):
     __tablename__ = "items_tags"
+    __table_args__ = (
+        # The primary key covers lookups by item_id; this covers the tag side.
+        db.Index("ix_items_tags_tag_id_item_id", "tag_id", "item_id"),
+        # GET /changes
+        db.Index("ix_items_tags_change_seq", "change_seq", "item_id", "tag_id"),
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"))
-    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"))
\ No newline at end of file
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    change_seq = db.Column(db.Integer, nullable=False, default=change_seq_default, server_default="0")
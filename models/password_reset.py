@@ -8,7 +8,7 @@ class PasswordResetTokenModel(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     token_hash = db.Column(db.String(64), unique=True, nullable=False, index=True) # sha256 hex
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     used_at = db.Column(db.DateTime, nullable=True)
 
     user = db.relationship(
@@ -1,10 +1,18 @@
 from db import db
+from models.changes import change_seq_default
 
 
 class StoreModel(db.Model):
     __tablename__ = "stores"
+    __table_args__ = (
+        # GET /changes
+        db.Index("ix_stores_change_seq_id", "change_seq", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False, unique=True)
-    items = db.relationship("ItemModel", back_populates="store", lazy="dynamic", cascade="all, delete")
-    tags = db.relationship("TagModel", back_populates = "store", lazy="dynamic")
\ No newline at end of file
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    change_seq = db.Column(db.Integer, nullable=False, default=change_seq_default, server_default="0")
+    # Deleting a store cascades to its items and tags in the database (ON DELETE CASCADE).
+    items = db.relationship("ItemModel", back_populates="store", passive_deletes=True)
+    tags = db.relationship("TagModel", back_populates="store", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""Per-store aggregates behind ``/store/<id>/stats`` and ``/store/stats``.
+
+One row per store, kept current in the same transaction as the write that
+changes it. Single-row ORM writes apply deltas through the listeners below.
+Bulk inserts and links fold in per-store deltas (``add_items``,
+``add_links``); bulk updates and deletes call ``refresh_store_stats`` for
+the stores they touched. A deleted store's row goes with it (ON DELETE
+CASCADE).
+
+A removed or repriced item that held the store's min/max price triggers a
+re-read of that bound, which is a single probe of ``ix_items_store_id_price``.
+
+``rebuild_store_stats`` recomputes every row from the catalog
+(``flask rebuild-store-stats``).
+"""
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+
+from db import db
+from models.item import ItemModel
+from models.item_tags import ItemTags
+from models.store import StoreModel
+from models.tag import TagModel
+
+
+class StoreStatsModel(db.Model):
+    __tablename__ = "store_stats"
+
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    tag_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    link_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    price_sum = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    min_price = db.Column(db.Float)
+    max_price = db.Column(db.Float)
+
+    # Keyset pagination and build_page expect an ``id``.
+    id = db.synonym("store_id")
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.item_count if self.item_count else None
+
+
+stats_table = StoreStatsModel.__table__
+
+
+def _stats_of(store_id):
+    return update(stats_table).where(stats_table.c.store_id == store_id)
+
+
+def add_items(connection, store_id, count, price_sum, min_price, max_price, links=0):
+    """Fold ``count`` new items of one store, with these price aggregates, into its row."""
+    connection.execute(_stats_of(store_id).values(
+        item_count=stats_table.c.item_count + count,
+        price_sum=stats_table.c.price_sum + price_sum,
+        link_count=stats_table.c.link_count + links,
+        min_price=case(
+            (stats_table.c.min_price.is_(None) | (stats_table.c.min_price > min_price), min_price),
+            else_=stats_table.c.min_price,
+        ),
+        max_price=case(
+            (stats_table.c.max_price.is_(None) | (stats_table.c.max_price < max_price), max_price),
+            else_=stats_table.c.max_price,
+        ),
+    ))
+
+
+def add_links(connection, store_id, links):
+    _adjust(connection, store_id, link_count=links)
+
+
+def _item_added(connection, store_id, price, links):
+    add_items(connection, store_id, 1, price, price, price, links)
+
+
+def _item_removed(connection, store_id, price, links):
+    # Runs after the row left the store, so the bounds are re-read without it.
+    in_store = ItemModel.store_id == store_id
+    connection.execute(_stats_of(store_id).values(
+        item_count=stats_table.c.item_count - 1,
+        price_sum=case((stats_table.c.item_count > 1, stats_table.c.price_sum - price), else_=0),
+        link_count=stats_table.c.link_count - links,
+        min_price=case(
+            (stats_table.c.min_price >= price, select(func.min(ItemModel.price)).where(in_store).scalar_subquery()),
+            else_=stats_table.c.min_price,
+        ),
+        max_price=case(
+            (stats_table.c.max_price <= price, select(func.max(ItemModel.price)).where(in_store).scalar_subquery()),
+            else_=stats_table.c.max_price,
+        ),
+    ))
+
+
+def _adjust(connection, store_id, **deltas):
+    connection.execute(_stats_of(store_id).values(
+        {column: stats_table.c[column] + delta for column, delta in deltas.items()}
+    ))
+
+
+def _old_value(target, attr):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+def aggregates(store_ids=None):
+    """``SELECT`` of fresh stats rows, for every store or just ``store_ids``."""
+    store = StoreModel.__table__.alias("s")
+    in_store = ItemModel.store_id == store.c.id
+    query = select(
+        store.c.id,
+        select(func.count()).where(in_store).scalar_subquery(),
+        select(func.count()).select_from(TagModel).where(TagModel.store_id == store.c.id).scalar_subquery(),
+        select(func.count()).select_from(ItemTags).join(ItemModel, ItemModel.id == ItemTags.item_id)
+        .where(in_store).scalar_subquery(),
+        select(func.coalesce(func.sum(ItemModel.price), 0)).where(in_store).scalar_subquery(),
+        select(func.min(ItemModel.price)).where(in_store).scalar_subquery(),
+        select(func.max(ItemModel.price)).where(in_store).scalar_subquery(),
+    )
+    if store_ids is not None:
+        query = query.where(store.c.id.in_(store_ids))
+    return query
+
+
+STATS_COLUMNS = ("store_id", "item_count", "tag_count", "link_count", "price_sum", "min_price", "max_price")
+
+
+def refresh_store_stats(connection, store_ids):
+    """Recompute the rows of ``store_ids`` from the catalog."""
+    store_ids = list(store_ids)
+    if not store_ids:
+        return
+    connection.execute(delete(stats_table).where(stats_table.c.store_id.in_(store_ids)))
+    connection.execute(insert(stats_table).from_select(STATS_COLUMNS, aggregates(store_ids)))
+
+
+def rebuild_store_stats(connection):
+    """Recompute every row; returns the number of stores."""
+    connection.execute(delete(stats_table))
+    connection.execute(insert(stats_table).from_select(STATS_COLUMNS, aggregates()))
+    return connection.execute(select(func.count()).select_from(stats_table)).scalar()
+
+
+@event.listens_for(StoreModel, "after_insert")
+def _store_inserted(mapper, connection, target):
+    connection.execute(insert(stats_table).values(store_id=target.id))
+
+
+@event.listens_for(StoreModel, "before_delete")
+def _store_deleted(mapper, connection, target):
+    connection.execute(delete(stats_table).where(stats_table.c.store_id == target.id))
+
+
+@event.listens_for(ItemModel, "after_insert")
+def _item_inserted(mapper, connection, target):
+    links = len(inspect(target).attrs.tags.history.added)
+    _item_added(connection, target.store_id, target.price, links)
+
+
+@event.listens_for(ItemModel, "after_update")
+def _item_updated(mapper, connection, target):
+    tags = inspect(target).attrs.tags.history
+    link_delta = len(tags.added) - len(tags.deleted)
+    old_store_id, old_price = _old_value(target, "store_id"), _old_value(target, "price")
+    if old_store_id != target.store_id:
+        # The item's links move with it.
+        links = len(target.tags)
+        _item_removed(connection, old_store_id, old_price, links - link_delta)
+        _item_added(connection, target.store_id, target.price, links)
+    elif old_price != target.price:
+        _item_removed(connection, target.store_id, old_price, 0)
+        _item_added(connection, target.store_id, target.price, link_delta)
+    elif link_delta:
+        _adjust(connection, target.store_id, link_count=link_delta)
+
+
+@event.listens_for(ItemModel, "after_delete")
+def _item_deleted(mapper, connection, target):
+    # models.versioning's before_delete has loaded the collection already.
+    _item_removed(connection, target.store_id, target.price, len(target.tags))
+
+
+@event.listens_for(TagModel, "after_insert")
+def _tag_inserted(mapper, connection, target):
+    _adjust(connection, target.store_id, tag_count=1)
+
+
+@event.listens_for(TagModel, "after_delete")
+def _tag_deleted(mapper, connection, target):
+    _adjust(connection, target.store_id, tag_count=-1)
@@ -1,12 +1,19 @@
 from db import db
+from models.changes import change_seq_default
 
 
 class TagModel(db.Model):
     __tablename__ = 'tags'
+    __table_args__ = (
+        # GET /changes
+        db.Index("ix_tags_change_seq_id", "change_seq", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String(80), unique = True, nullable = False)
-    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    change_seq = db.Column(db.Integer, nullable=False, default=change_seq_default, server_default="0")
 
     store = db.relationship("StoreModel", back_populates="tags")
-    items = db.relationship("ItemModel", back_populates="tags", secondary="items_tags")
\ No newline at end of file
+    items = db.relationship("ItemModel", back_populates="tags", secondary="items_tags", passive_deletes=True)
\ No newline at end of file
@@ -9,7 +9,7 @@ class TokenBlocklistModel(db.Model):
     token_type = db.Column(db.String(10), nullable=False)  # "access" | "refresh"
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
     revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
 
     user = db.relationship(
         "UserModel",
@@ -0,0 +1,85 @@
+"""Row version counters behind the API's ETags.
+
+Each versioned row's ``version`` is bumped whenever anything in its
+serialized representation changes, including nested rows: an item's store
+and tags, a store's items and tags, a tag's store and items. An ETag built
+from ``(id, version)`` pairs is therefore exact, and checking it never needs
+the payload.
+"""
+from sqlalchemy import event, inspect, select, update
+
+from models.item import ItemModel
+from models.item_tags import ItemTags
+from models.store import StoreModel
+from models.tag import TagModel
+
+
+def _bump_self(mapper, connection, target):
+    # SQL expression so a bump issued by another row's event in the same flush isn't lost.
+    target.version = mapper.class_.version + 1
+
+
+def bump_versions(connection, model, *criteria):
+    """Set-based bump for writes that bypass the ORM unit of work (bulk endpoints)."""
+    connection.execute(
+        update(model).where(*criteria).values(version=model.version + 1)
+    )
+
+
+def _changed(target, *attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _old_value(target, attr):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+for _model in (ItemModel, StoreModel, TagModel):
+    event.listen(_model, "before_update", _bump_self)
+
+
+@event.listens_for(ItemModel, "after_insert")
+def _item_inserted(mapper, connection, target):
+    bump_versions(connection, StoreModel, StoreModel.id == target.store_id)
+
+
+@event.listens_for(ItemModel, "after_update")
+def _item_updated(mapper, connection, target):
+    if not _changed(target, "name", "description", "price", "store_id"):
+        return
+    store_ids = {target.store_id, _old_value(target, "store_id")}
+    bump_versions(connection, StoreModel, StoreModel.id.in_(store_ids))
+    bump_versions(connection, TagModel, TagModel.id.in_(select(ItemTags.tag_id).where(ItemTags.item_id == target.id)))
+
+
+@event.listens_for(ItemModel, "before_delete")
+def _item_deleted(mapper, connection, target):
+    bump_versions(connection, StoreModel, StoreModel.id == target.store_id)
+    # The link rows are already gone by now; the loaded collection still has them.
+    tag_ids = [tag.id for tag in target.tags]
+    if tag_ids:
+        bump_versions(connection, TagModel, TagModel.id.in_(tag_ids))
+
+
+@event.listens_for(StoreModel, "after_update")
+def _store_updated(mapper, connection, target):
+    if not _changed(target, "name"):
+        return
+    bump_versions(connection, ItemModel, ItemModel.store_id == target.id)
+    bump_versions(connection, TagModel, TagModel.store_id == target.id)
+
+
+@event.listens_for(TagModel, "after_insert")
+@event.listens_for(TagModel, "before_delete")
+def _tag_added_or_deleted(mapper, connection, target):
+    bump_versions(connection, StoreModel, StoreModel.id == target.store_id)
+
+
+@event.listens_for(TagModel, "after_update")
+def _tag_updated(mapper, connection, target):
+    if not _changed(target, "name"):
+        return
+    bump_versions(connection, StoreModel, StoreModel.id == target.store_id)
+    bump_versions(connection, ItemModel, ItemModel.id.in_(select(ItemTags.item_id).where(ItemTags.tag_id == target.id)))
@@ -0,0 +1,173 @@
+"""Background job queues.
+
+Jobs are enqueued by dotted path (``"tasks.send_user_registration_email"``)
+so the web process never imports the task module itself. With the ``rq``
+backend they go to Redis and run in ``rq worker -c settings``; the ``local``
+backend runs them on a daemon thread inside this process, which needs no
+Redis and is what development and offline tests use.
+
+Both backends retry a failing job after each of ``EMAIL_RETRY_INTERVALS``
+seconds and then move it to a dead-letter queue.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from importlib import import_module
+
+from flask import current_app
+
+import settings
+from utils.redis_client import get_redis
+
+
+def resolve(path):
+    module, _, name = path.rpartition(".")
+    return getattr(import_module(module), name)
+
+
+class LocalQueue:
+    """In-process queue with delayed retries and a bounded dead-letter list."""
+
+    def __init__(self, name, retry_intervals=(), max_dead=1000):
+        self.name = name
+        self.retry_intervals = list(retry_intervals)
+        self.dead_letter = deque(maxlen=max_dead)
+        self._scheduled = []  # heap of (run_at, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._thread = None
+        self._thread_pid = None
+        self.stats = {"enqueued": 0, "succeeded": 0, "retried": 0, "dead": 0}
+
+    def enqueue(self, func_path, *args, **kwargs):
+        job = {"func": func_path, "args": args, "kwargs": kwargs, "attempts": 0}
+        self.stats["enqueued"] += 1
+        self._schedule(job, 0)
+        return job
+
+    def join(self, timeout=None):
+        """Wait until nothing is queued, scheduled for retry or running."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._scheduled or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _schedule(self, job, delay):
+        with self._cond:
+            heapq.heappush(self._scheduled, (time.monotonic() + delay, next(self._seq), job))
+            self._cond.notify_all()
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own.
+        with self._cond:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._work, name=f"queue-{self.name}", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._scheduled:
+                        wait = self._scheduled[0][0] - time.monotonic()
+                        if wait <= 0:
+                            job = heapq.heappop(self._scheduled)[2]
+                            self._running += 1
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        job["attempts"] += 1
+        try:
+            resolve(job["func"])(*job["args"], **job["kwargs"])
+        except Exception:
+            job["error"] = traceback.format_exc()
+            if job["attempts"] <= len(self.retry_intervals):
+                self.stats["retried"] += 1
+                self._schedule(job, self.retry_intervals[job["attempts"] - 1])
+            else:
+                self.stats["dead"] += 1
+                self.dead_letter.append(job)
+        else:
+            self.stats["succeeded"] += 1
+
+
+def move_to_dead_letter(job, connection, exc_type, exc_value, tb):
+    """RQ failure callback: once retries are exhausted, park a copy of the job
+    on the dead-letter queue. Nothing consumes that queue by default; replay it
+    with ``rq worker -c settings <dead letter queue>``."""
+    if job.retries_left:
+        return
+    from rq import Queue
+
+    Queue(job.meta.get("dead_letter_queue", settings.DEAD_LETTER_QUEUE), connection=connection).enqueue(
+        job.func_name,
+        args=job.args,
+        kwargs=job.kwargs,
+        meta={"failed_job_id": job.id, "error": "".join(traceback.format_exception_only(exc_type, exc_value))},
+    )
+
+
+class RQQueue:
+    """Enqueues onto an RQ queue with retry/backoff and dead-lettering attached."""
+
+    def __init__(self, name, retry_intervals=(), dead_letter_queue=settings.DEAD_LETTER_QUEUE):
+        self.name = name
+        self.retry_intervals = list(retry_intervals)
+        self.dead_letter_queue = dead_letter_queue
+
+    def enqueue(self, func_path, *args, **kwargs):
+        from rq import Callback, Queue, Retry
+
+        retry = Retry(max=len(self.retry_intervals), interval=self.retry_intervals) if self.retry_intervals else None
+        # get_redis() hands each forked worker its own connection.
+        return Queue(self.name, connection=get_redis()).enqueue(
+            func_path,
+            args=args,
+            kwargs=kwargs,
+            retry=retry,
+            on_failure=Callback(move_to_dead_letter),
+            meta={"dead_letter_queue": self.dead_letter_queue},
+        )
+
+
+def init_queues(app):
+    app.config.setdefault("QUEUE_BACKEND", settings.QUEUE_BACKEND)
+    app.config.setdefault("EMAIL_RETRY_INTERVALS", settings.EMAIL_RETRY_INTERVALS)
+
+    backend = app.config["QUEUE_BACKEND"]
+    intervals = app.config["EMAIL_RETRY_INTERVALS"]
+    if backend == "rq":
+        if not settings.REDIS_URL:
+            raise RuntimeError("QUEUE_BACKEND=rq requires REDIS_URL to be set")
+        queue = RQQueue("emails", intervals)
+    elif backend == "local":
+        queue = LocalQueue("emails", intervals)
+    else:
+        raise ValueError(f"Unknown QUEUE_BACKEND {backend!r}")
+
+    app.extensions["email_queue"] = queue
+
+
+def get_email_queue():
+    return current_app.extensions["email_queue"]
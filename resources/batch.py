@@ -0,0 +1,164 @@
+"""``POST /batch``: several catalog requests in one round trip.
+
+Sub-requests are dispatched in-process, one after the other, through the
+same views, hooks and error handlers as standalone requests. Each one runs
+in its own request context but shares the batch's app context and so its
+database session. The batch's token is verified once, and the sub-requests
+reuse it (security.jwt_setup.BatchJWTManager) rather than decoding it and
+checking the blocklist again.
+
+With ``"transaction": true`` the session's commits are held back
+(utils.replicas.RoutingSession) until the last sub-request has succeeded,
+and the writes are then committed together. The first sub-request that
+fails with a 4xx/5xx rolls everything back; the ones after it are not run
+and are reported as 424. Without it, a failed sub-request's session is
+rolled back before the next one runs, so the failure stays its own.
+"""
+import json
+from contextlib import nullcontext
+
+from flask import Response, current_app, g, request
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException, InternalServerError
+from werkzeug.test import EnvironBuilder
+
+from db import db
+from resources.bulk import blp as bulk_blp
+from resources.item import blp as item_blp
+from resources.store import blp as store_blp
+from resources.tag import blp as tag_blp
+from schemas import BatchRequestSchema, BatchResponseSchema
+from utils.json_output import compact_dumps
+from utils.replicas import DEFER_COMMIT, use_primary
+from utils.response_cache import invalidate_deferred
+
+blp = Blueprint("batch", __name__, description="Several catalog requests in one round trip")
+
+# Blueprints a sub-request may target. The user endpoints issue, revoke and
+# rate-limit tokens, and stay standalone requests.
+BATCH_BLUEPRINTS = frozenset(bp.name for bp in (item_blp, store_blp, tag_blp, bulk_blp))
+
+# Response headers passed back to the client for each sub-request.
+RETURNED_HEADERS = ("ETag", "Location", "Retry-After")
+
+
+def check_sub_request():
+    if request.routing_exception is not None:
+        return
+    if request.blueprint not in BATCH_BLUEPRINTS:
+        abort(400, message=f"{request.path} cannot be part of a batch.")
+    if "stream" in request.args:
+        abort(400, message="Streaming is not supported in a batch.")
+
+
+def dispatch(sub, authorization):
+    """Run one sub-request; returns its response, fully read."""
+    headers = dict(sub.get("headers", {}))
+    headers["Authorization"] = authorization
+    builder = EnvironBuilder(
+        path=sub["path"],
+        method=sub["method"],
+        headers=headers,
+        base_url=request.host_url,
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+        **({"json": sub["body"]} if "body" in sub else {}),
+    )
+    app = current_app._get_current_object()
+    # The batch's own timings stay aside; the sub-request records its own.
+    timings = g.pop("timings", None)
+    try:
+        with app.request_context(builder.get_environ()):
+            try:
+                check_sub_request()
+                response = app.full_dispatch_request()
+            except HTTPException as e:
+                response = app.make_response(app.handle_user_exception(e))
+            except Exception:
+                current_app.logger.exception("Batch sub-request %s %s failed", sub["method"], sub["path"])
+                db.session.rollback()
+                response = app.make_response(app.handle_user_exception(InternalServerError()))
+            response.get_data()
+            return response
+    finally:
+        builder.close()
+        if timings is not None:
+            g.timings = timings
+
+
+def failed_dependency():
+    try:
+        abort(424, message="Not run: an earlier request in the transaction failed.")
+    except HTTPException as e:
+        return current_app.make_response(current_app.handle_user_exception(e))
+
+
+def encode_entry(response):
+    """One ``responses`` entry; a JSON body is spliced in as is, without a parse/dump round trip."""
+    body = response.get_data()
+    if not body or response.status_code in (204, 304):
+        body = b"null"
+    elif response.is_json:
+        body = body.rstrip(b"\n")
+    else:
+        body = json.dumps(body.decode("utf-8", "replace")).encode("utf-8")
+    headers = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+    head = compact_dumps()({"status": response.status_code, "headers": headers})
+    return head[:-1].encode("utf-8") + b',"body":' + body + b"}"
+
+
+@blp.route("/batch")
+class Batch(MethodView):
+    @jwt_required()
+    @blp.arguments(BatchRequestSchema)
+    @blp.response(200, BatchResponseSchema)
+    def post(self, args):
+        subs = args["requests"]
+        if len(subs) > current_app.config["BATCH_MAX_REQUESTS"]:
+            abort(413, message=f"At most {current_app.config['BATCH_MAX_REQUESTS']} requests per batch.")
+
+        authorization = request.headers["Authorization"]
+        g.batch_token = (authorization.partition(" ")[2], get_jwt())
+        transaction = args["transaction"]
+
+        responses = []
+        committed = None
+        if transaction:
+            db.session.info[DEFER_COMMIT] = True
+        try:
+            # A transaction reads its own writes, so its reads stay off the replicas.
+            with use_primary() if transaction else nullcontext():
+                for sub in subs:
+                    response = dispatch(sub, authorization)
+                    responses.append(response)
+                    if transaction and response.status_code >= 400:
+                        break
+                    if response.status_code >= 400 or not db.session.is_active:
+                        # Views abort without rolling back; the next request needs a usable session.
+                        db.session.rollback()
+        finally:
+            db.session.info.pop(DEFER_COMMIT, None)
+            g.pop("batch_token", None)
+
+        if transaction:
+            committed = len(responses) == len(subs) and responses[-1].status_code < 400
+            if committed:
+                try:
+                    db.session.commit()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    abort(500, message="An error occurred while committing the batch!")
+                finally:
+                    invalidate_deferred()
+            else:
+                db.session.rollback()
+                invalidate_deferred()
+                skipped = failed_dependency()
+                responses.extend(skipped for _ in range(len(subs) - len(responses)))
+
+        body = b'{"responses":[' + b",".join(encode_entry(response) for response in responses) + b"]"
+        if committed is not None:
+            body += b',"committed":' + (b"true" if committed else b"false")
+        return Response(body + b"}\n", mimetype=current_app.json.mimetype)
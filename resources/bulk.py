@@ -0,0 +1,265 @@
+from collections import Counter
+
+from flask import current_app
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+from models import ItemModel, StoreModel, TagModel, ItemTags
+from models.changes import add_tombstones, next_change_seq
+from models.versioning import bump_versions
+from models.store_stats import add_items, add_links, refresh_store_stats
+from schemas import (
+    ItemSchema, ItemBulkUpdateRowSchema, ItemTagLinkSchema, ItemBulkCreateSchema,
+    ItemBulkUpdateSchema, ItemBulkDeleteSchema, ItemTagBulkLinkSchema, BulkResultSchema)
+from utils.response_cache import invalidate
+
+blp = Blueprint("bulk", __name__, description="Bulk operations on items and tag links")
+
+items_table = ItemModel.__table__
+
+
+def batches(values):
+    values = list(values)
+    size = current_app.config["BULK_BATCH_SIZE"]
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def check_size(rows):
+    if len(rows) > current_app.config["BULK_MAX_ROWS"]:
+        abort(413, message=f"At most {current_app.config['BULK_MAX_ROWS']} rows per request.")
+    return rows
+
+
+def existing_ids(model, ids):
+    found = set()
+    for batch in batches(ids):
+        found.update(row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(batch)))
+    return found
+
+
+def load_rows(schema, rows):
+    """Validate ``rows`` with a many=True schema; return ``(index, data)`` pairs and per-row errors."""
+    errors = schema.validate(rows)
+    indexes = [i for i in range(len(rows)) if i not in errors]
+    loaded = schema.load([rows[i] for i in indexes])
+    return list(zip(indexes, loaded)), errors
+
+
+def linked_tag_ids(item_ids):
+    tag_ids = set()
+    for batch in batches(item_ids):
+        tag_ids.update(
+            tag_id for (tag_id,) in db.session.query(ItemTags.tag_id).filter(ItemTags.item_id.in_(batch))
+        )
+    return tag_ids
+
+
+def store_ids_of(item_ids):
+    store_ids = set()
+    for batch in batches(item_ids):
+        store_ids.update(
+            store_id for (store_id,) in db.session.query(ItemModel.store_id).filter(ItemModel.id.in_(batch))
+        )
+    return store_ids
+
+
+def item_stores(item_ids):
+    """``{item_id: store_id}`` for the ``item_ids`` that exist."""
+    stores = {}
+    for batch in batches(item_ids):
+        stores.update(db.session.query(ItemModel.id, ItemModel.store_id).filter(ItemModel.id.in_(batch)))
+    return stores
+
+
+def bump(model, ids):
+    connection = db.session.connection()
+    for batch in batches(ids):
+        bump_versions(connection, model, model.id.in_(batch))
+
+
+def refresh_stats(store_ids):
+    connection = db.session.connection()
+    for batch in batches(store_ids):
+        refresh_store_stats(connection, batch)
+
+
+def commit(message):
+    try:
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        abort(500, message=message)
+
+
+def result(count, errors, ids=None):
+    return {
+        "count": count,
+        "ids": ids,
+        "errors": [{"index": index, "errors": errors[index]} for index in sorted(errors)],
+    }
+
+
+@blp.route("/item/bulk")
+class ItemBulk(MethodView):
+    @jwt_required(fresh=True)
+    @blp.arguments(ItemBulkCreateSchema)
+    @blp.response(201, BulkResultSchema)
+    def post(self, args):
+        rows, errors = load_rows(ItemSchema(many=True), check_size(args["items"]))
+
+        stores = existing_ids(StoreModel, {data["store_id"] for _, data in rows})
+        valid = []
+        for index, data in rows:
+            if data["store_id"] in stores:
+                valid.append(data)
+            else:
+                errors[index] = {"store_id": ["Store does not exist."]}
+
+        dialect = db.session.get_bind().dialect
+        ids = [] if dialect.insert_executemany_returning else None
+        for batch in batches(valid):
+            if ids is None:
+                db.session.execute(insert(ItemModel), batch)
+            else:
+                stmt = insert(ItemModel).returning(ItemModel.id, sort_by_parameter_order=True)
+                ids.extend(db.session.scalars(stmt, batch))
+
+        prices_by_store = {}
+        for data in valid:
+            prices_by_store.setdefault(data["store_id"], []).append(data["price"])
+        store_ids = set(prices_by_store)
+        bump(StoreModel, store_ids)
+        connection = db.session.connection()
+        for store_id, prices in prices_by_store.items():
+            add_items(connection, store_id, len(prices), sum(prices), min(prices), max(prices))
+        commit("An error occurred while inserting the items!")
+
+        invalidate(stores=store_ids)
+        return result(len(valid), errors, ids)
+
+    @jwt_required(fresh=True)
+    @blp.arguments(ItemBulkUpdateSchema)
+    @blp.response(200, BulkResultSchema)
+    def put(self, args):
+        rows, errors = load_rows(ItemBulkUpdateRowSchema(many=True), check_size(args["items"]))
+
+        items = existing_ids(ItemModel, {data["id"] for _, data in rows})
+        stores = existing_ids(StoreModel, {data["store_id"] for _, data in rows if "store_id" in data})
+        valid = []
+        for index, data in rows:
+            if data["id"] not in items:
+                errors[index] = {"id": ["Item does not exist."]}
+            elif "store_id" in data and data["store_id"] not in stores:
+                errors[index] = {"store_id": ["Store does not exist."]}
+            elif len(data) > 1:
+                valid.append(data)
+
+        item_ids = {data["id"] for data in valid}
+        # Stores before and after the update both nest the items, as do their tags.
+        store_ids = store_ids_of(item_ids) | {data["store_id"] for data in valid if "store_id" in data}
+        tag_ids = linked_tag_ids(item_ids)
+
+        groups = {}
+        for data in valid:
+            groups.setdefault(tuple(sorted(k for k in data if k != "id")), []).append(data)
+
+        change_seq = next_change_seq(db.session.connection()) if groups else None
+        for columns, group in groups.items():
+            values = {column: bindparam(f"_{column}") for column in columns}
+            values["version"] = items_table.c.version + 1
+            values["change_seq"] = change_seq
+            stmt = update(items_table).where(items_table.c.id == bindparam("_id")).values(values)
+            for batch in batches(group):
+                db.session.execute(stmt, [{f"_{k}": v for k, v in data.items()} for data in batch])
+
+        bump(StoreModel, store_ids)
+        bump(TagModel, tag_ids)
+        refresh_stats(store_ids)
+        commit("An error occurred while updating the items!")
+
+        invalidate(items=item_ids, stores=store_ids, tags=tag_ids)
+        return result(len(valid), errors, sorted(item_ids))
+
+    @jwt_required()
+    @blp.arguments(ItemBulkDeleteSchema)
+    @blp.response(200, BulkResultSchema)
+    def delete(self, args):
+        if not get_jwt().get("is_admin"):
+            abort(401, message="Admin privilege required!!!")
+
+        requested = check_size(args["ids"])
+        item_ids = existing_ids(ItemModel, requested)
+        errors = {
+            index: {"id": ["Item does not exist."]}
+            for index, item_id in enumerate(requested)
+            if item_id not in item_ids
+        }
+
+        store_ids = store_ids_of(item_ids)
+        tag_ids = linked_tag_ids(item_ids)
+        bump(StoreModel, store_ids)
+        bump(TagModel, tag_ids)
+        connection = db.session.connection()
+        for batch in batches(item_ids):
+            # The item's tombstone implies its links.
+            add_tombstones(connection, "item", batch)
+            db.session.execute(delete(ItemTags).where(ItemTags.item_id.in_(batch)))
+            db.session.execute(delete(items_table).where(items_table.c.id.in_(batch)))
+        refresh_stats(store_ids)
+        commit("An error occurred while deleting the items!")
+
+        invalidate(items=item_ids, stores=store_ids, tags=tag_ids)
+        return result(len(item_ids), errors, sorted(item_ids))
+
+
+@blp.route("/item/tags/bulk")
+class ItemTagsBulk(MethodView):
+    @jwt_required()
+    @blp.arguments(ItemTagBulkLinkSchema)
+    @blp.response(201, BulkResultSchema)
+    def post(self, args):
+        rows, errors = load_rows(ItemTagLinkSchema(many=True), check_size(args["links"]))
+
+        store_of = item_stores({data["item_id"] for _, data in rows})
+        items = set(store_of)
+        tags = existing_ids(TagModel, {data["tag_id"] for _, data in rows})
+        linked = set()
+        for batch in batches(items):
+            linked.update(
+                db.session.query(ItemTags.item_id, ItemTags.tag_id)
+                .filter(ItemTags.item_id.in_(batch), ItemTags.tag_id.in_(tags))
+            )
+
+        valid = []
+        for index, data in rows:
+            pair = (data["item_id"], data["tag_id"])
+            if pair[0] not in items:
+                errors[index] = {"item_id": ["Item does not exist."]}
+            elif pair[1] not in tags:
+                errors[index] = {"tag_id": ["Tag does not exist."]}
+            elif pair in linked:
+                errors[index] = {"_schema": ["Item is already linked to this tag."]}
+            else:
+                linked.add(pair)
+                valid.append(data)
+
+        for batch in batches(valid):
+            db.session.execute(insert(ItemTags), batch)
+
+        item_ids = {data["item_id"] for data in valid}
+        tag_ids = {data["tag_id"] for data in valid}
+        bump(ItemModel, item_ids)
+        bump(TagModel, tag_ids)
+        links_per_store = Counter(store_of[data["item_id"]] for data in valid)
+        connection = db.session.connection()
+        for store_id, links in links_per_store.items():
+            add_links(connection, store_id, links)
+        commit("An error occurred while linking the tags!")
+
+        invalidate(items=item_ids, tags=tag_ids)
+        return result(len(valid), errors)
@@ -0,0 +1,134 @@
+"""``GET /changes``: what changed in the catalog since a client's last sync.
+
+Each catalog row carries the change number of the transaction that last
+wrote it (models.changes), and deletes leave tombstones. The feed is those
+rows and tombstones ordered by ``(change_seq, kind, key)``, so a sync reads
+a few index ranges and costs time in proportion to what changed, not to the
+size of the catalog.
+
+Without ``since`` the feed starts at the beginning and lists every live row
+without tombstones: a full sync. Every page returns a ``next_cursor``,
+including the last one, where it points at the current end of the feed.
+A client stores it and passes it as ``since`` next time.
+
+Within one change number, tombstones come first, then stores, tags, items
+and item_tag links. Deleting and re-creating a row in the same transaction
+therefore ends with the upsert. A deleted store implies its items and tags,
+and a deleted item or tag implies its links; the feed does not repeat them.
+
+A cursor older than the oldest retained tombstone answers 410: the client
+must drop its copy and resync without ``since``.
+"""
+import heapq
+
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select, tuple_
+
+from db import db
+from models import ItemModel, StoreModel, TagModel, ItemTags
+from models.changes import committed_head, tombstones_table
+from schemas import ChangesArgsSchema, ChangesPageSchema
+from utils.pagination import decode_cursor, encode_cursor, resolve_limit
+
+blp = Blueprint("changes", __name__, description="Catalog change feed for incremental sync")
+
+CURSOR_SORT = "changes"
+
+# (kind, key columns, other columns) in feed order within a change number. The rank is the index.
+TOMBSTONES = 0
+SOURCES = (
+    (None, (tombstones_table.c.id,), (tombstones_table.c.kind, tombstones_table.c.row_id, tombstones_table.c.tag_id)),
+    ("store", (StoreModel.id,), (StoreModel.name,)),
+    ("tag", (TagModel.id,), (TagModel.name, TagModel.store_id)),
+    ("item", (ItemModel.id,), (ItemModel.name, ItemModel.description, ItemModel.price, ItemModel.store_id)),
+    ("item_tag", (ItemTags.item_id, ItemTags.tag_id), ()),
+)
+END_RANK = len(SOURCES)
+
+SEQ_COLUMNS = (
+    tombstones_table.c.change_seq, StoreModel.change_seq, TagModel.change_seq, ItemModel.change_seq, ItemTags.change_seq,
+)
+
+
+def source_query(rank, cursor, head, limit):
+    """The next ``limit + 1`` rows of one source after ``cursor``, up to change number ``head``."""
+    _, keys, columns = SOURCES[rank]
+    seq = SEQ_COLUMNS[rank]
+    cursor_seq, cursor_rank, cursor_keys = cursor
+    if rank < cursor_rank:
+        after = seq > cursor_seq
+    elif rank == cursor_rank:
+        after = tuple_(seq, *keys) > tuple_(cursor_seq, *cursor_keys)
+    else:
+        after = seq >= cursor_seq
+    return (
+        select(seq, *keys, *columns)
+        .where(after, seq <= head)
+        .order_by(seq, *keys)
+        .limit(limit + 1)
+    )
+
+
+def to_change(rank, row):
+    """``(position, entry)`` for one row of source ``rank``; the position is what a cursor holds."""
+    kind, keys, columns = SOURCES[rank]
+    seq, values = row[0], row[1:]
+    key = list(values[:len(keys)])
+    if rank == TOMBSTONES:
+        kind, row_id, tag_id = values[1:]
+        data = {"item_id": row_id, "tag_id": tag_id} if kind == "item_tag" else {"id": row_id}
+        op = "delete"
+    else:
+        data = {column.key: value for column, value in zip(keys + columns, values)}
+        op = "upsert"
+    return (seq, rank, key), {"seq": seq, "kind": kind, "op": op, "data": data}
+
+
+def parse_cursor(since):
+    """``(seq, rank, key)`` from a ``next_cursor``."""
+    values = decode_cursor(since, CURSOR_SORT)
+    if not isinstance(values, list) or len(values) < 2 or any(type(value) is not int for value in values):
+        abort(400, message="Invalid cursor.")
+    seq, rank, *key = values
+    if not 0 <= rank <= END_RANK or len(key) != (len(SOURCES[rank][1]) if rank < END_RANK else 0):
+        abort(400, message="Invalid cursor.")
+    return seq, rank, key
+
+
+@blp.route("/changes")
+class Changes(MethodView):
+    @jwt_required()
+    @blp.arguments(ChangesArgsSchema, location="query")
+    @blp.response(200, ChangesPageSchema)
+    def get(self, args):
+        limit = resolve_limit(args)
+        head, retained_seq = committed_head(db.session)
+
+        if "since" in args:
+            cursor = parse_cursor(args["since"])
+            # Past the tombstones of its own change number, a cursor only needs the later ones.
+            oldest_needed = cursor[0] + 1 if cursor[1] > TOMBSTONES else cursor[0]
+            if oldest_needed < retained_seq:
+                abort(410, message="Changes since this cursor are no longer retained; sync again without since.")
+            ranks = range(len(SOURCES))
+        else:
+            # Rows written before the feed existed carry change number 0.
+            cursor = (0, -1, [])
+            ranks = range(TOMBSTONES + 1, len(SOURCES))
+
+        streams = []
+        for rank in ranks:
+            rows = db.session.execute(source_query(rank, cursor, head, limit)).all()
+            streams.append([to_change(rank, row) for row in rows])
+        merged = list(heapq.merge(*streams, key=lambda change: change[0]))
+
+        has_more = len(merged) > limit
+        if has_more:
+            merged = merged[:limit]
+            seq, rank, key = merged[-1][0]
+            next_cursor = encode_cursor(CURSOR_SORT, [seq, rank, *key])
+        else:
+            next_cursor = encode_cursor(CURSOR_SORT, [head, END_RANK])
+        return {"data": [entry for _, entry in merged], "next_cursor": next_cursor, "has_more": has_more}
@@ -1,22 +1,117 @@
+from flask import jsonify
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import select, func, exists
 from flask_jwt_extended import jwt_required, get_jwt
 
 from db import db
-from models import ItemModel
-from schemas import ItemSchema, ItemUpdateSchema
+from models import ItemModel, ItemTags
+from schemas import ItemSchema, ItemUpdateSchema, ItemListArgsSchema, ItemPageSchema, ItemSearchArgsSchema
+from utils.pagination import paginate, resolve_limit, apply_keyset, build_page
+from utils.etag import row_version, catalog_version, collection_version, version_digest
+from utils.response_cache import cached_response, invalidate
+from utils.streaming import wants_stream, stream_query
+from utils.serializers import compile_schema
+from utils.metrics import timed_dump
+from utils.projections import item_rows_query, build_item_rows
+from utils.search import search_terms, apply_search
+from utils.tag_bitmaps import get_tag_bitmaps
 
 blp = Blueprint("items", __name__, description = "Operations on items")
 
+# Everything ItemSchema dumps, loaded up front so a page costs a fixed number of queries.
+ITEM_LOAD_OPTIONS = (joinedload(ItemModel.store), selectinload(ItemModel.tags))
+
+dump_item = timed_dump(compile_schema(ItemSchema()))
+dump_item_page = timed_dump(compile_schema(ItemPageSchema(), mapping=True))
+
+
+SORT_COLUMNS = {"id": ItemModel.id, "name": ItemModel.name, "price": ItemModel.price}
+
+
+def dump_item_rows(rows):
+    return [dump_item(row) for row in build_item_rows(rows)]
+
+
+def item_filters(args):
+    filters = []
+    if "store_id" in args:
+        filters.append(ItemModel.store_id == args["store_id"])
+    if "min_price" in args:
+        filters.append(ItemModel.price >= args["min_price"])
+    if "max_price" in args:
+        filters.append(ItemModel.price <= args["max_price"])
+    if "name_prefix" in args:
+        filters.append(ItemModel.name.startswith(args["name_prefix"], autoescape=True))
+    return filters
+
+
+def item_tag_filters(args, bitmaps=None):
+    """``tags_all`` / ``tags_any`` / ``tags_none`` as filters answered from ``items_tags``.
+
+    With a TagBitmapIndex the matching ids are worked out in memory and
+    the filters collapse into one ``id IN (...)``, unless the index declines.
+    """
+    all_ids, any_ids, none_ids = (sorted(set(args.get(key, ()))) for key in ("tags_all", "tags_any", "tags_none"))
+    if bitmaps is not None:
+        item_ids = bitmaps.matching_ids(all_ids, any_ids, none_ids)
+        if item_ids is not None:
+            return [ItemModel.id.in_(item_ids)]
+
+    filters = []
+    if all_ids:
+        filters.append(ItemModel.id.in_(
+            select(ItemTags.item_id)
+            .where(ItemTags.tag_id.in_(all_ids))
+            .group_by(ItemTags.item_id)
+            .having(func.count() == len(all_ids))
+        ))
+    if any_ids:
+        filters.append(ItemModel.id.in_(select(ItemTags.item_id).where(ItemTags.tag_id.in_(any_ids))))
+    if none_ids:
+        filters.append(~exists().where(ItemTags.item_id == ItemModel.id, ItemTags.tag_id.in_(none_ids)))
+    return filters
+
+
+@blp.route("/item/search")
+class ItemSearch(MethodView):
+    @jwt_required()
+    @blp.etag
+    @blp.arguments(ItemSearchArgsSchema, location="query")
+    @blp.response(200, ItemPageSchema)
+    def get(self, args):
+        terms = search_terms(args["q"])
+        if not terms:
+            abort(400, message="Search query has no words to match.")
+
+        filters = item_filters(args)
+        if "tag_id" in args:
+            filters.append(ItemModel.id.in_(select(ItemTags.item_id).where(ItemTags.tag_id == args["tag_id"])))
+
+        query, rank, sort = apply_search(item_rows_query().add_columns(ItemModel.version).where(*filters), terms)
+        limit = resolve_limit(args)
+        query = apply_keyset(query, sort, args.get("cursor"), limit, {"rank": rank}, ItemModel.id)
+        page = build_page(query.all(), sort, limit)
+
+        # Ranked pages are not a keyset range of the list ETag, so digest the rows served.
+        blp.set_etag(version_digest((row.id, row.version) for row in page["data"]))
+        page["data"] = build_item_rows(page["data"])
+        return jsonify(dump_item_page(page))
+
 
 @blp.route("/item/<int:item_id>")
 class item(MethodView):
     @jwt_required()
+    @blp.etag
     @blp.response(200, ItemSchema)
     def get(self, item_id):
-        item = ItemModel.query.get_or_404(item_id)
-        return item
+        def render():
+            item = ItemModel.query.options(*ITEM_LOAD_OPTIONS).get_or_404(item_id)
+            return [item.id, item.version], dump_item(item)
+
+        return cached_response(blp, f"item:{item_id}", lambda: row_version(ItemModel, item_id), render)
     
     @jwt_required()
     def delete(self, item_id):
@@ -25,8 +120,10 @@ class item(MethodView):
             abort (401, message="Admin privilege required!!!")
 
         item = ItemModel.query.get_or_404(item_id)
+        store_id, tag_ids = item.store_id, [tag.id for tag in item.tags]
         db.session.delete(item)
         db.session.commit()
+        invalidate(items=[item_id], stores=[store_id], tags=tag_ids)
         return {"message": "Item deleted!"}
 
     @jwt_required()
@@ -44,15 +141,36 @@ class item(MethodView):
 
         db.session.add(item)
         db.session.commit()
+        invalidate(items=[item_id], stores=[item.store_id], tags=[tag.id for tag in item.tags])
         return item
     
 
 @blp.route("/item")
 class ItemList(MethodView):
     @jwt_required()
-    @blp.response(200, ItemSchema(many=True))
-    def get(self):
-        return ItemModel.query.all()
+    @blp.etag
+    @blp.arguments(ItemListArgsSchema, location="query")
+    @blp.response(200, ItemPageSchema)
+    def get(self, args):
+        filters = item_filters(args) + item_tag_filters(args, get_tag_bitmaps())
+
+        # Column projection + compiled dumpers; same output as ItemPageSchema().dump.
+        query = item_rows_query().where(*filters)
+        if wants_stream(args):
+            # Not a digest of the rows: that would read every one of them before the first is sent.
+            blp.set_etag(catalog_version())
+            return stream_query(query, args, SORT_COLUMNS, ItemModel.id, dump_item_rows)
+
+        blp.set_etag(collection_version(
+            db.session.query(ItemModel.id, ItemModel.version).where(*filters),
+            args,
+            SORT_COLUMNS,
+            ItemModel.id,
+            resolve_limit(args),
+        ))
+        page = paginate(query, args, SORT_COLUMNS, ItemModel.id)
+        page["data"] = build_item_rows(page["data"])
+        return jsonify(dump_item_page(page))
     
     @jwt_required(fresh=True)
     @blp.arguments(ItemSchema)
@@ -66,4 +184,5 @@ class ItemList(MethodView):
         except SQLAlchemyError:
             abort(500, message = "An error occurred while inserting the item!")
 
+        invalidate(stores=[item.store_id])
         return item
\ No newline at end of file
@@ -1,25 +1,134 @@
 # from flask import request
+from collections import Counter
+
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
+from sqlalchemy import delete, select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import selectinload
 from flask_jwt_extended import jwt_required, get_jwt
 
 
 from db import db
-from models import StoreModel
-from schemas import StoreSchema, StoreUpdateSchema
+from models import StoreModel, ItemModel, TagModel, ItemTags, StoreStatsModel
+from models.changes import add_tombstones
+from models.store_stats import add_links
+from models.versioning import bump_versions
+from schemas import (
+    StoreSchema, StoreUpdateSchema, StoreListArgsSchema, StorePageSchema, PaginationArgsSchema,
+    StoreStatsSchema, StoreStatsPageSchema)
+from utils.pagination import paginate, resolve_limit
+from utils.etag import row_version, catalog_version, collection_version
+from utils.response_cache import cached_response, invalidate
+from utils.streaming import wants_stream, stream_query
 
 
 blp = Blueprint("stores", __name__, description = "Operations on stores")
 
+# Everything StoreSchema dumps, loaded up front so a page costs a fixed number of queries.
+STORE_LOAD_OPTIONS = (selectinload(StoreModel.items), selectinload(StoreModel.tags))
+
+SORT_COLUMNS = {"id": StoreModel.id, "name": StoreModel.name}
+STATS_SORT_COLUMNS = {"id": StoreStatsModel.store_id}
+
+
+def store_filters(args):
+    filters = []
+    if "name_prefix" in args:
+        filters.append(StoreModel.name.startswith(args["name_prefix"], autoescape=True))
+    return filters
+
+
+def invalidate_store(store_id):
+    # A store's name is nested in its items' and tags' payloads.
+    item_ids = [item_id for (item_id,) in db.session.query(ItemModel.id).filter(ItemModel.store_id == store_id)]
+    tag_ids = [tag_id for (tag_id,) in db.session.query(TagModel.id).filter(TagModel.store_id == store_id)]
+    invalidate(items=item_ids, stores=[store_id], tags=tag_ids)
+
+
+def delete_returning_ids(table, *criteria):
+    """Delete the matching rows of ``table``; returns their ids, read by the DELETE itself where supported."""
+    statement = delete(table).where(*criteria)
+    if db.session.get_bind().dialect.delete_returning:
+        return db.session.scalars(statement.returning(table.c.id)).all()
+    ids = db.session.scalars(select(table.c.id).where(*criteria)).all()
+    db.session.execute(statement)
+    return ids
+
+
+def delete_store(store_id):
+    """Delete a store with its items, tags and their links in a fixed number of statements.
+
+    The database cascades to ``items_tags`` and ``store_stats``. Items and
+    tags of other stores linked to this one's lose those links, so their
+    versions and their stores' stats are updated too. Returns the ids whose
+    cached responses are now stale, as ``invalidate`` keyword arguments.
+    """
+    store_items = select(ItemModel.id).where(ItemModel.store_id == store_id)
+    store_tags = select(TagModel.id).where(TagModel.store_id == store_id)
+    # (item_id, store_id) per link from another store's item to one of this store's tags.
+    linked_items = db.session.query(ItemModel.id, ItemModel.store_id).join(ItemTags, ItemTags.item_id == ItemModel.id).filter(
+        ItemTags.tag_id.in_(store_tags), ItemModel.store_id != store_id
+    ).all()
+    linked_item_ids = list({item_id for item_id, _ in linked_items})
+    linked_tag_ids = [tag_id for (tag_id,) in db.session.query(TagModel.id).join(ItemTags, ItemTags.tag_id == TagModel.id).filter(
+        ItemTags.item_id.in_(store_items), TagModel.store_id != store_id
+    ).distinct()]
+
+    connection = db.session.connection()
+    # One tombstone stands for the store's items, tags and links (resources/changes.py).
+    add_tombstones(connection, "store", [store_id])
+    if linked_item_ids:
+        bump_versions(connection, ItemModel, ItemModel.id.in_(linked_item_ids))
+    if linked_tag_ids:
+        bump_versions(connection, TagModel, TagModel.id.in_(linked_tag_ids))
+    item_ids = delete_returning_ids(ItemModel.__table__, ItemModel.store_id == store_id)
+    tag_ids = delete_returning_ids(TagModel.__table__, TagModel.store_id == store_id)
+    db.session.execute(delete(StoreModel.__table__).where(StoreModel.id == store_id))
+    for linked_store_id, links in Counter(linked_store_id for _, linked_store_id in linked_items).items():
+        add_links(connection, linked_store_id, -links)
+
+    return {
+        "items": item_ids + linked_item_ids,
+        "stores": [store_id],
+        "tags": tag_ids + linked_tag_ids,
+    }
+
+
+@blp.route("/store/<int:store_id>/stats")
+class StoreStats(MethodView):
+    @jwt_required()
+    @blp.etag
+    @blp.response(200, StoreStatsSchema)
+    def get(self, store_id):
+        return StoreStatsModel.query.get_or_404(store_id)
+
+
+@blp.route("/store/stats")
+class StoreStatsList(MethodView):
+    @jwt_required()
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.response(200, StoreStatsPageSchema)
+    def get(self, args):
+        # One row per store from models.store_stats; nothing here scales with the items.
+        # No ETag: the rows change with every catalog write, and streams would need a second pass.
+        query = StoreStatsModel.query
+        if wants_stream(args):
+            return stream_query(query, args, STATS_SORT_COLUMNS, StoreStatsModel.store_id, StoreStatsSchema(many=True).dump)
+        return paginate(query, args, STATS_SORT_COLUMNS, StoreStatsModel.store_id)
+
 
 @blp.route("/store/<int:store_id>")
 class Store(MethodView):
     @jwt_required()
+    @blp.etag
     @blp.response(200, StoreSchema)
     def get(self, store_id):
-        store = StoreModel.query.get_or_404(store_id)
-        return store
+        def render():
+            store = StoreModel.query.options(*STORE_LOAD_OPTIONS).get_or_404(store_id)
+            return [store.id, store.version], StoreSchema().dump(store)
+
+        return cached_response(blp, f"store:{store_id}", lambda: row_version(StoreModel, store_id), render)
     
     @jwt_required()
     def delete(self, store_id):
@@ -27,9 +136,10 @@ class Store(MethodView):
         if not jwt.get("is_admin"):
             abort (401, message="Admin privilege required!!!")
             
-        store = StoreModel.query.get_or_404(store_id)
-        db.session.delete(store)
+        StoreModel.query.get_or_404(store_id)
+        stale = delete_store(store_id)
         db.session.commit()
+        invalidate(**stale)
         return {"message": "Store deleted!"}
 
     @jwt_required()
@@ -44,15 +154,33 @@ class Store(MethodView):
 
         db.session.add(store)
         db.session.commit()
+        invalidate_store(store_id)
 
         return store
 
 @blp.route("/store")
 class StoreList(MethodView):
     @jwt_required()
-    @blp.response(200, StoreSchema(many=True))
-    def get(self):
-        return StoreModel.query.all()
+    @blp.etag
+    @blp.arguments(StoreListArgsSchema, location="query")
+    @blp.response(200, StorePageSchema)
+    def get(self, args):
+        filters = store_filters(args)
+
+        query = StoreModel.query.options(*STORE_LOAD_OPTIONS).where(*filters)
+        if wants_stream(args):
+            # Not a digest of the rows: that would read every one of them before the first is sent.
+            blp.set_etag(catalog_version())
+            return stream_query(query, args, SORT_COLUMNS, StoreModel.id, StoreSchema(many=True).dump)
+
+        blp.set_etag(collection_version(
+            db.session.query(StoreModel.id, StoreModel.version).where(*filters),
+            args,
+            SORT_COLUMNS,
+            StoreModel.id,
+            resolve_limit(args),
+        ))
+        return paginate(query, args, SORT_COLUMNS, StoreModel.id)
     
     @jwt_required()
     @blp.arguments(StoreSchema)
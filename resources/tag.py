@@ -3,21 +3,58 @@ from flask.views import MethodView
 from flask_jwt_extended import jwt_required
 from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
 from db import db
-from models import TagModel, StoreModel, ItemModel
-from schemas import TagSchema, TagAndItemSchema, TagUpdateSchema
+from models import TagModel, StoreModel, ItemModel, ItemTags
+from schemas import TagSchema, TagAndItemSchema, TagUpdateSchema, TagListArgsSchema, TagPageSchema
+from utils.pagination import paginate, resolve_limit
+from utils.etag import row_version, catalog_version, collection_version
+from utils.response_cache import cached_response, invalidate
+from utils.streaming import wants_stream, stream_query
+from utils.tag_bitmaps import get_tag_bitmaps
+from resources.item import ITEM_LOAD_OPTIONS
 
 blp = Blueprint("Tags", "tags", description="Operations os tags")
 
+# Everything TagSchema dumps, loaded up front so a page costs a fixed number of queries.
+TAG_LOAD_OPTIONS = (joinedload(TagModel.store), selectinload(TagModel.items))
+
+SORT_COLUMNS = {"id": TagModel.id, "name": TagModel.name}
+
+
+def tag_filters(args, store_id):
+    filters = [TagModel.store_id == store_id]
+    if "name_prefix" in args:
+        filters.append(TagModel.name.startswith(args["name_prefix"], autoescape=True))
+    return filters
+
+
 @blp.route("/store/<int:store_id>/tag")
 class TagInStore(MethodView):
     @jwt_required()
-    @blp.response(200, TagSchema(many=True))
-    def get(self, store_id):
-        store = StoreModel.query.get_or_404(store_id)
-
-        return store.tags.all()
+    @blp.etag
+    @blp.arguments(TagListArgsSchema, location="query")
+    @blp.response(200, TagPageSchema)
+    def get(self, args, store_id):
+        StoreModel.query.get_or_404(store_id)
+
+        filters = tag_filters(args, store_id)
+
+        query = TagModel.query.options(*TAG_LOAD_OPTIONS).where(*filters)
+        if wants_stream(args):
+            # Not a digest of the rows: that would read every one of them before the first is sent.
+            blp.set_etag(catalog_version())
+            return stream_query(query, args, SORT_COLUMNS, TagModel.id, TagSchema(many=True).dump)
+
+        blp.set_etag(collection_version(
+            db.session.query(TagModel.id, TagModel.version).where(*filters),
+            args,
+            SORT_COLUMNS,
+            TagModel.id,
+            resolve_limit(args),
+        ))
+        return paginate(query, args, SORT_COLUMNS, TagModel.id)
 
     @jwt_required()
     @blp.arguments(TagSchema)
@@ -35,6 +72,7 @@ class TagInStore(MethodView):
         except SQLAlchemyError as e:
             abort(500, message=str(e))
 
+        invalidate(stores=[store_id])
         return tag
     
 
@@ -43,8 +81,10 @@ class LinkTagsToItem(MethodView):
     @jwt_required()
     @blp.response(201, TagSchema)
     def post(self, item_id, tag_id):
-        item = ItemModel.query.get_or_404(item_id)
-        tag = TagModel.query.get_or_404(tag_id)
+        item = ItemModel.query.options(*ITEM_LOAD_OPTIONS).get_or_404(item_id)
+        tag = TagModel.query.options(*TAG_LOAD_OPTIONS).get_or_404(tag_id)
+        if tag in item.tags:
+            abort(400, message="Item is already linked to this tag.")
 
         item.tags.append(tag)
 
@@ -52,15 +92,20 @@ class LinkTagsToItem(MethodView):
             db.session.add(item)
             db.session.commit()
         except SQLAlchemyError:
+            db.session.rollback()
             abort(500, message="An error occured while inserting the tag.")
 
+        invalidate(items=[item_id], stores={item.store_id, tag.store_id}, tags=[tag_id])
+        bitmaps = get_tag_bitmaps()
+        if bitmaps is not None:
+            bitmaps.record_link(tag, item_id, linked=True)
         return tag
     
     @jwt_required()
     @blp.response(200, TagAndItemSchema)
     def delete(self, item_id, tag_id):
-        item = ItemModel.query.get_or_404(item_id)
-        tag = TagModel.query.get_or_404(tag_id) 
+        item = ItemModel.query.options(*ITEM_LOAD_OPTIONS).get_or_404(item_id)
+        tag = TagModel.query.options(*TAG_LOAD_OPTIONS).get_or_404(tag_id)
 
         item.tags.remove(tag)
 
@@ -68,17 +113,26 @@ class LinkTagsToItem(MethodView):
                 db.session.add(item)
                 db.session.commit()
         except SQLAlchemyError:
+                db.session.rollback()
                 abort(500, message="An error occured while deleting the tag.")
 
-        return jsonify({"message": "Item removed from tag", "item": item, "tag": tag})
+        invalidate(items=[item_id], stores={item.store_id, tag.store_id}, tags=[tag_id])
+        bitmaps = get_tag_bitmaps()
+        if bitmaps is not None:
+            bitmaps.record_link(tag, item_id, linked=False)
+        return {"message": "Item removed from tag", "item": item, "tag": tag}
 
 @blp.route("/tag/<int:tag_id>")
 class Tag(MethodView):
     @jwt_required()
+    @blp.etag
     @blp.response(200, TagSchema)
     def get(self, tag_id):
-        tag = TagModel.query.get_or_404(tag_id)
-        return tag
+        def render():
+            tag = TagModel.query.options(*TAG_LOAD_OPTIONS).get_or_404(tag_id)
+            return [tag.id, tag.version], TagSchema().dump(tag)
+
+        return cached_response(blp, f"tag:{tag_id}", lambda: row_version(TagModel, tag_id), render)
     
     @jwt_required()
     @blp.response(202, 
@@ -94,9 +148,11 @@ class Tag(MethodView):
     def delete(self, tag_id):
         tag = TagModel.query.get_or_404(tag_id)
 
-        if not tag.items:
+        if not db.session.query(ItemTags.query.filter(ItemTags.tag_id == tag_id).exists()).scalar():
+            store_id = tag.store_id
             db.session.delete(tag)
             db.session.commit()
+            invalidate(stores=[store_id], tags=[tag_id])
             return jsonify({"message": "Tag deleted!"})
         
         return jsonify({
@@ -116,4 +172,5 @@ class Tag(MethodView):
 
         db.session.add(tag)
         db.session.commit()
+        invalidate(items=[item.id for item in tag.items], stores=[tag.store_id], tags=[tag_id])
         return tag
\ No newline at end of file
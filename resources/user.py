@@ -3,7 +3,6 @@ import os, secrets, hashlib
 from flask import jsonify, request
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
-from passlib.hash import pbkdf2_sha256
 from flask_jwt_extended import (
     create_access_token, create_refresh_token, get_jwt, jwt_required)
 from sqlalchemy import or_ 
@@ -12,8 +11,11 @@ from datetime import datetime, timedelta
 from db import db
 from models import UserModel, PasswordResetTokenModel, TokenBlocklistModel
 from schemas import UserSchema, UserRegisterSchema, ForgotPasswordRequestSchema, ResetPasswordConfirmSchema
-from tasks import send_user_registration_email, send_password_reset_email
+from queues import get_email_queue
 from security.admin_required import admin_required
+from security.jwt_setup import revoke_token
+from security.passwords import get_password_hasher
+from security.rate_limit import rate_limited
 
 
 
@@ -23,6 +25,7 @@ blp = Blueprint("Users", "users", description="Operations on users")
 
 @blp.route("/register")
 class UserRegister(MethodView):
+    @rate_limited("register")
     @blp.arguments(UserRegisterSchema)
     def post(self, user_data):
         email_norm = user_data["email"].strip().lower()
@@ -38,17 +41,12 @@ class UserRegister(MethodView):
         user = UserModel(
             username=user_data["username"],
             email=email_norm,
-            password=pbkdf2_sha256.hash(user_data["password"])
+            password=get_password_hasher().hash(user_data["password"])
         )
         db.session.add(user)
         db.session.commit()
 
-        # current_app.queue.enqueue(send_user_registration_email, user.email, user.username)
-
-        send_user_registration_email(
-            email=user.email,
-            username=user.username
-        )
+        get_email_queue().enqueue("tasks.send_user_registration_email", user.email, user.username)
         
         return jsonify({"message": "User created successfully"}), 201
     
@@ -56,13 +54,24 @@ class UserRegister(MethodView):
 
 @blp.route("/login")
 class UserLogin(MethodView):
+    @rate_limited("login")
     @blp.arguments(UserSchema)
     def post(self , user_data):
         user = UserModel.query.filter(
             UserModel.username == user_data["username"]
         ).first()
 
-        if user and pbkdf2_sha256.verify(user_data["password"], user.password):
+        if user:
+            valid, new_hash = get_password_hasher().verify(user_data["password"], user.password)
+        else:
+            valid, new_hash = False, None
+
+        if valid:
+            if new_hash:
+                # Configured rounds changed since this hash was made.
+                user.password = new_hash
+                db.session.commit()
+
             access_token = create_access_token(identity=str(user.id), fresh=True)
             refresh_token = create_refresh_token(identity=str(user.id))
             return {"access_token": access_token, "refresh_token": refresh_token}, 200
@@ -89,6 +98,7 @@ class TokenRefresh(MethodView):
         new_refresh = create_refresh_token(identity=user_id_str)
 
         db.session.commit()
+        revoke_token(jwt_data)
         return {"access_token": new_access, "refresh_token": new_refresh}, 200
 
 @blp.route("/logout")
@@ -105,6 +115,7 @@ class UserLogout(MethodView):
             expires_at=datetime.fromtimestamp(jwt_data["exp"]),
         ))
         db.session.commit()
+        revoke_token(jwt_data)
         return jsonify({"message": "Successfully logged out."}), 200
 
 
@@ -128,6 +139,7 @@ class User(MethodView):
 
 @blp.route("/user/forgot-password")
 class ForgotPassword(MethodView):
+    @rate_limited("forgot-password")
     @blp.arguments(ForgotPasswordRequestSchema)
     def post(self, args):
         email = args["email"].strip().lower()
@@ -166,9 +178,7 @@ class ForgotPassword(MethodView):
         reset_url = f"{base_reset_url}?token={raw_token}"
 
 
-        # current_app.queue.enqueue(send_password_reset_email, user.email, user.username, reset_url)
-
-        send_password_reset_email(user.email, user.username, reset_url)
+        get_email_queue().enqueue("tasks.send_password_reset_email", user.email, user.username, reset_url)
 
         return status_payload, 202
 
@@ -188,7 +198,7 @@ class ResetPassword(MethodView):
             abort(400, message="Invalid or expired token.")
 
         user = prt.user
-        user.password = pbkdf2_sha256.hash(new_password)
+        user.password = get_password_hasher().hash(new_password)
         prt.used_at = datetime.now()
 
         db.session.commit()
@@ -1,4 +1,14 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema as BaseSchema, fields, validate
+
+from utils.metrics import timed
+
+
+class Schema(BaseSchema):
+    """Times top-level dumps for the request's Server-Timing and metrics."""
+
+    def dump(self, obj, *, many=None):
+        with timed("dump"):
+            return super().dump(obj, many=many)
 
 
 class PlainItemSchema(Schema):
@@ -54,6 +64,176 @@ class TagAndItemSchema(Schema):
     tag = fields.Nested(TagSchema)
 
 
+class PaginationArgsSchema(Schema):
+    limit = fields.Int(validate=validate.Range(min=1))
+    cursor = fields.Str()
+    stream = fields.Bool(
+        load_default=False,
+        metadata={"description": "Stream every matching row as NDJSON instead of one page."},
+    )
+
+
+def tag_id_list(description):
+    return fields.List(
+        fields.Int(),
+        validate=validate.Length(min=1, max=20),
+        metadata={"description": description + " Repeat the parameter for each tag id."},
+    )
+
+
+class ItemListArgsSchema(PaginationArgsSchema):
+    store_id = fields.Int()
+    min_price = fields.Float()
+    max_price = fields.Float()
+    name_prefix = fields.Str(validate=validate.Length(min=1))
+    tags_all = tag_id_list("Only items that have every one of these tags.")
+    tags_any = tag_id_list("Only items that have at least one of these tags.")
+    tags_none = tag_id_list("Only items that have none of these tags.")
+    sort = fields.Str(
+        load_default="id",
+        validate=validate.OneOf(["id", "-id", "name", "-name", "price", "-price"]),
+    )
+
+
+class ItemSearchArgsSchema(Schema):
+    q = fields.Str(
+        required=True,
+        validate=validate.Length(min=1, max=200),
+        metadata={"description": "Words to find in item names and descriptions; each one also matches as a prefix."},
+    )
+    store_id = fields.Int()
+    tag_id = fields.Int()
+    min_price = fields.Float()
+    max_price = fields.Float()
+    limit = fields.Int(validate=validate.Range(min=1))
+    cursor = fields.Str()
+
+
+class StoreListArgsSchema(PaginationArgsSchema):
+    name_prefix = fields.Str(validate=validate.Length(min=1))
+    sort = fields.Str(load_default="id", validate=validate.OneOf(["id", "-id", "name", "-name"]))
+
+
+class TagListArgsSchema(StoreListArgsSchema):
+    pass
+
+
+class PageSchema(Schema):
+    next_cursor = fields.Str(allow_none=True)
+    has_more = fields.Bool()
+
+
+class ItemPageSchema(PageSchema):
+    data = fields.List(fields.Nested(ItemSchema()))
+
+
+class StorePageSchema(PageSchema):
+    data = fields.List(fields.Nested(StoreSchema()))
+
+
+class TagPageSchema(PageSchema):
+    data = fields.List(fields.Nested(TagSchema()))
+
+
+class StoreStatsSchema(Schema):
+    store_id = fields.Int()
+    item_count = fields.Int()
+    tag_count = fields.Int()
+    link_count = fields.Int(metadata={"description": "Item-tag links on the store's items."})
+    min_price = fields.Float(allow_none=True)
+    max_price = fields.Float(allow_none=True)
+    avg_price = fields.Float(allow_none=True)
+
+
+class StoreStatsPageSchema(PageSchema):
+    data = fields.List(fields.Nested(StoreStatsSchema()))
+
+
+class ChangesArgsSchema(Schema):
+    since = fields.Str(metadata={"description": "next_cursor of the previous call; omit for a full sync."})
+    limit = fields.Int(validate=validate.Range(min=1))
+
+
+class ChangeSchema(Schema):
+    seq = fields.Int()
+    kind = fields.Str(metadata={"description": "store, tag, item or item_tag."})
+    op = fields.Str(metadata={"description": "upsert or delete."})
+    data = fields.Dict(metadata={"description": "The row's columns; only its key for a delete."})
+
+
+class ChangesPageSchema(PageSchema):
+    data = fields.List(fields.Nested(ChangeSchema()))
+
+
+class ItemBulkUpdateRowSchema(ItemUpdateSchema):
+    id = fields.Int(required=True)
+
+
+class ItemTagLinkSchema(Schema):
+    item_id = fields.Int(required=True)
+    tag_id = fields.Int(required=True)
+
+
+class ItemBulkCreateSchema(Schema):
+    items = fields.List(fields.Dict(), required=True, metadata={"description": "Rows shaped like ItemSchema."})
+
+
+class ItemBulkUpdateSchema(Schema):
+    items = fields.List(fields.Dict(), required=True, metadata={"description": "Rows shaped like ItemBulkUpdateRowSchema."})
+
+
+class ItemBulkDeleteSchema(Schema):
+    ids = fields.List(fields.Int(), required=True)
+
+
+class ItemTagBulkLinkSchema(Schema):
+    links = fields.List(fields.Dict(), required=True, metadata={"description": "Rows shaped like ItemTagLinkSchema."})
+
+
+class BulkRowErrorSchema(Schema):
+    index = fields.Int()
+    errors = fields.Dict()
+
+
+class BulkResultSchema(Schema):
+    count = fields.Int()
+    ids = fields.List(fields.Int(), allow_none=True)
+    errors = fields.List(fields.Nested(BulkRowErrorSchema()))
+
+
+class BatchSubRequestSchema(Schema):
+    method = fields.Str(required=True, validate=validate.OneOf(["GET", "POST", "PUT", "PATCH", "DELETE"]))
+    path = fields.Str(
+        required=True,
+        validate=validate.Regexp(r"^/"),
+        metadata={"description": "Path and query string, e.g. /item?limit=5."},
+    )
+    body = fields.Raw(metadata={"description": "JSON request body."})
+    headers = fields.Dict(
+        keys=fields.Str(validate=validate.OneOf(["If-None-Match", "If-Match"])),
+        values=fields.Str(),
+    )
+
+
+class BatchRequestSchema(Schema):
+    requests = fields.List(fields.Nested(BatchSubRequestSchema()), required=True, validate=validate.Length(min=1))
+    transaction = fields.Bool(
+        load_default=False,
+        metadata={"description": "Commit the writes together, or not at all if any request fails."},
+    )
+
+
+class BatchSubResponseSchema(Schema):
+    status = fields.Int()
+    headers = fields.Dict(keys=fields.Str(), values=fields.Str())
+    body = fields.Raw(allow_none=True)
+
+
+class BatchResponseSchema(Schema):
+    responses = fields.List(fields.Nested(BatchSubResponseSchema()))
+    committed = fields.Bool(metadata={"description": "Transactional batches only."})
+
+
 class UserSchema(Schema):
     id = fields.Int(dump_only=True)
     username = fields.Str(required=True)
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+
+class RedisRevokedSet:
+    """Revoked JTIs shared between workers, one key per token expiring with it."""
+
+    def __init__(self, client, prefix="blocklist:jti:"):
+        self.client = client
+        self.prefix = prefix
+
+    def add(self, jti, expires_at):
+        self.client.set(self.prefix + jti, 1, exat=int(expires_at) + 1)
+
+    def contains(self, jti):
+        return bool(self.client.exists(self.prefix + jti))
+
+
+class BlocklistCache:
+    """Caches the answer to "is this JTI revoked?" for the life of the token.
+
+    Lookups are answered from an in-process LRU first. Tokens known to be
+    valid are only re-checked against the optional shared revoked set, so the
+    database is queried once per token per worker. Without a shared set,
+    nothing tells this worker about a logout on another one, so a valid
+    entry is trusted for at most ``local_ttl`` seconds: a revoked token keeps
+    working for up to that long. The default of 0 caches only revocations
+    and asks the database about every other token.
+    """
+
+    def __init__(self, shared=None, max_entries=10000, local_ttl=0):
+        self.shared = shared
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self._entries = OrderedDict()  # jti -> (revoked, valid_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def is_revoked(self, jti, expires_at, loader):
+        revoked = self.lookup(jti, expires_at)
+        if revoked is None:
+            revoked = bool(loader(jti))
+            self.remember(jti, revoked, expires_at)
+        return revoked
+
+    def lookup(self, jti, expires_at):
+        """Answer from the cache alone: True/False, or None when the database must be asked.
+
+        Callers that load the answer themselves (e.g. with an async session)
+        hand it back through ``remember``.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(jti)
+                self.hits += 1
+            else:
+                self.misses += 1
+                return None
+
+        revoked = entry[0]
+        if revoked or self.shared is None:
+            return revoked
+        try:
+            if self.shared.contains(jti):
+                self.remember(jti, True, expires_at)
+                return True
+            return False
+        except RedisError:
+            self.shared_errors += 1
+            return None
+
+    def revoke(self, jti, expires_at):
+        self.remember(jti, True, expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.add(jti, expires_at)
+            except RedisError:
+                self.shared_errors += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "shared_errors": self.shared_errors,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def remember(self, jti, revoked, expires_at):
+        valid_until = expires_at
+        if not revoked and self.shared is None:
+            if self.local_ttl <= 0:
+                return
+            valid_until = min(expires_at, time.time() + self.local_ttl)
+
+        with self._lock:
+            self._entries[jti] = (revoked, valid_until)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
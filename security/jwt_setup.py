@@ -1,23 +1,69 @@
 import os
 from datetime import datetime, timedelta
-from flask import jsonify
+from flask import jsonify, current_app, g
 from flask_jwt_extended import JWTManager
 from models import UserModel, TokenBlocklistModel
+from security.blocklist_cache import BlocklistCache, RedisRevokedSet
+from utils.redis_client import get_redis
+from utils.replicas import use_primary
+from utils.metrics import timed
 
-jwt = JWTManager()
+class BatchJWTManager(JWTManager):
+    """Decodes a batch's token once for all of its sub-requests (resources/batch.py)."""
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        verified = g.get("batch_token")
+        if verified is not None and verified[0] == encoded_token:
+            return verified[1]
+        return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+
+jwt = BatchJWTManager()
 
 def init_jwt(app):
     access_minutes = int(os.getenv("JWT_ACCESS_MINUTES", "60"))
     refresh_days = int(os.getenv("JWT_REFRESH_DAYS", "30"))
     app.config.setdefault("JWT_ACCESS_TOKEN_EXPIRES", timedelta(minutes=access_minutes))
     app.config.setdefault("JWT_REFRESH_TOKEN_EXPIRES", timedelta(days=refresh_days))
+    app.config.setdefault("JWT_BLOCKLIST_CACHE_SIZE", int(os.getenv("JWT_BLOCKLIST_CACHE_SIZE", "10000")))
+    # Without REDIS_URL, a token revoked on another worker stays usable here for up to this many seconds.
+    app.config.setdefault("JWT_BLOCKLIST_CACHE_TTL", int(os.getenv("JWT_BLOCKLIST_CACHE_TTL", "0")))
     jwt.init_app(app)
 
+    redis_client = get_redis()
+    app.extensions["blocklist_cache"] = BlocklistCache(
+        shared=RedisRevokedSet(redis_client) if redis_client is not None else None,
+        max_entries=app.config["JWT_BLOCKLIST_CACHE_SIZE"],
+        local_ttl=app.config["JWT_BLOCKLIST_CACHE_TTL"],
+    )
+
+
+def get_blocklist_cache():
+    return current_app.extensions["blocklist_cache"]
+
+
+def revoke_token(jwt_data):
+    # Call after the TokenBlocklistModel row is committed.
+    get_blocklist_cache().revoke(jwt_data["jti"], jwt_data["exp"])
+
+
+def _load_revoked(jti):
+    # A replica may not have the row of a logout that just happened yet.
+    with use_primary():
+        return TokenBlocklistModel.query.filter_by(jti=jti).first() is not None
+
 @jwt.token_in_blocklist_loader
 def token_in_blocklist(jwt_header, jwt_payload):
-    # DB blocklist check (logout / refresh rotation / manual revoke)
+    # DB blocklist check (logout / refresh rotation / manual revoke), cached per JTI
     jti = jwt_payload.get("jti")
-    return bool(jti and TokenBlocklistModel.query.filter_by(jti=jti).first())
+    if not jti:
+        return False
+    verified = g.get("batch_token")
+    if verified is not None and verified[1].get("jti") == jti:
+        # Checked once, by the batch request itself.
+        return False
+    with timed("blocklist"):
+        return get_blocklist_cache().is_revoked(jti, jwt_payload["exp"], _load_revoked)
 
 @jwt.revoked_token_loader
 def revoked_token_callback(jwt_header, jwt_payload):
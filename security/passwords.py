@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from flask_smorest import abort
+from passlib.hash import pbkdf2_sha256
+
+
+def _hash(password, rounds):
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password, password_hash, rounds):
+    # Returns (ok, new_hash); new_hash is set when the stored hash uses other rounds.
+    if not pbkdf2_sha256.verify(password, password_hash):
+        return False, None
+    if pbkdf2_sha256.from_string(password_hash).rounds != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+class PasswordHasher:
+    """Runs pbkdf2 hash/verify in a process pool with a bounded backlog.
+
+    ``workers=0`` runs the work inline (useful for tests and one-off scripts).
+    When ``max_pending`` operations are already queued or running in this
+    process, new ones are rejected with a 503 instead of waiting.
+
+    An operation holds its slot until the pool is done with it, including
+    after its request gave up waiting at ``timeout``, so slow work cannot
+    pile up past the bound. A pool whose worker died is replaced.
+    """
+
+    def __init__(self, workers=2, max_pending=16, timeout=10, rounds=None, retry_after=1):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rounds = rounds or pbkdf2_sha256.default_rounds
+        self.retry_after = retry_after
+        self._pool = None
+        self._pool_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def hash(self, password):
+        return self._run("hash", _hash, password, self.rounds)
+
+    def verify(self, password, password_hash):
+        return self._run("verify", _verify, password, password_hash, self.rounds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                op: dict(s, avg_seconds=s["total_seconds"] / s["count"] if s["count"] else 0.0)
+                for op, s in self._stats.items()
+            }
+
+    def _run(self, op, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._record(op, None, outcome="rejected")
+                self._reject()
+            self._pending += 1
+
+        start = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+        else:
+            try:
+                pool, future = self._submit(fn, *args)
+            except BaseException:
+                self._release()
+                raise
+            future.add_done_callback(self._release)
+            try:
+                result = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # Drops it if it has not started yet; running work keeps its slot until it ends.
+                future.cancel()
+                with self._lock:
+                    self._record(op, None, outcome="timed_out")
+                self._reject()
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+                with self._lock:
+                    self._record(op, None, outcome="broken")
+                self._reject()
+
+        with self._lock:
+            self._record(op, time.perf_counter() - start)
+        return result
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            pool = self._get_pool()
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died since the last call: start over on a new pool.
+            self._discard_pool(pool)
+            with self._lock:
+                pool = self._get_pool()
+            return pool, pool.submit(fn, *args)
+
+    def _get_pool(self):
+        # Pools do not survive a fork, so each gunicorn worker builds its own.
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # Outside the lock: cancelling queued work runs their release callbacks.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, op, seconds, outcome=None):
+        s = self._stats.setdefault(
+            op, {"count": 0, "rejected": 0, "timed_out": 0, "broken": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        if outcome is not None:
+            s[outcome] += 1
+            return
+        s["count"] += 1
+        s["total_seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+
+    def _reject(self):
+        abort(
+            503,
+            message="Server is busy, please retry shortly.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+def init_password_hasher(app):
+    app.config.setdefault("PASSWORD_HASH_WORKERS", int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+    app.config.setdefault("PASSWORD_HASH_MAX_PENDING", int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16")))
+    app.config.setdefault("PASSWORD_HASH_TIMEOUT", float(os.getenv("PASSWORD_HASH_TIMEOUT", "10")))
+    app.config.setdefault("PASSWORD_HASH_ROUNDS", int(os.getenv("PASSWORD_HASH_ROUNDS", str(pbkdf2_sha256.default_rounds))))
+
+    app.extensions["password_hasher"] = PasswordHasher(
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+        rounds=app.config["PASSWORD_HASH_ROUNDS"],
+    )
+
+
+def get_password_hasher():
+    return current_app.extensions["password_hasher"]
@@ -0,0 +1,193 @@
+"""Token-bucket admission control for the unauthenticated, CPU-heavy auth endpoints.
+
+``rate_limited(scope)`` goes outermost on a view, so a rejected request
+costs a bucket lookup: no schema load, no database, no password hashing.
+Each scope (``login``, ``register``, ``forgot-password``) has one bucket per
+client address and one global bucket. The global bucket caps how much CPU
+the scope can take from the rest of the API when many clients arrive at
+once. A request must get a token from both buckets. Otherwise it is answered
+with 429 and ``Retry-After``.
+
+Backends (``RATE_LIMIT_BACKEND``):
+
+* ``local``: buckets per process, so a deployment admits up to
+  ``workers x`` the configured rates.
+* ``redis``: shared buckets, updated atomically by a Lua script in one round
+  trip. If Redis fails, the request falls back to the local buckets.
+* ``none``: disabled.
+
+Behind a reverse proxy, set ``RATE_LIMIT_TRUSTED_PROXIES`` to the number of
+proxies that append to X-Forwarded-For, so clients are told apart.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_smorest import abort
+from redis.exceptions import RedisError
+
+from utils.redis_client import get_redis
+
+
+class LocalTokenBuckets:
+    """In-process buckets; the least recently used are dropped beyond ``max_keys``."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, limits, now=None):
+        """Take a token from every ``(key, rate, burst)`` bucket, or from none.
+
+        Returns 0 when admitted, else the seconds until a retry can succeed.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            levels = []
+            for key, rate, burst in limits:
+                tokens, updated_at = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated_at) * rate)
+                if tokens < 1:
+                    return (1 - tokens) / rate
+                levels.append(tokens)
+            for (key, _, _), tokens in zip(limits, levels):
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0
+
+
+# KEYS: bucket keys. ARGV: now, then rate and burst for each key.
+# Returns 0 when admitted, else the seconds to wait as a string (Lua numbers
+# would be truncated to integers on the way out).
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+    if tokens < 1 then
+        return tostring((1 - tokens) / rate)
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'updated_at', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000))
+end
+return 0
+"""
+
+
+class RedisTokenBuckets:
+    """Buckets shared by every worker; a full bucket's key expires."""
+
+    def __init__(self, client, fallback, prefix="ratelimit:"):
+        self.client = client
+        self.fallback = fallback
+        self.prefix = prefix
+        self.errors = 0
+        self._take = client.register_script(TAKE_SCRIPT)
+
+    def take(self, limits, now=None):
+        keys = [self.prefix + key for key, _, _ in limits]
+        args = [time.time() if now is None else now]
+        for _, rate, burst in limits:
+            args.extend((rate, burst))
+        try:
+            return float(self._take(keys=keys, args=args))
+        except RedisError:
+            self.errors += 1
+            return self.fallback.take(limits)
+
+
+class RateLimiter:
+    def __init__(self, buckets, client_rate, client_burst, global_rate, global_burst, trusted_proxies=0):
+        self.buckets = buckets
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.trusted_proxies = trusted_proxies
+        self.rejected = 0
+
+    def client_address(self):
+        if self.trusted_proxies:
+            # Each trusted proxy appended the address it received the request from.
+            route = request.access_route
+            return route[-min(self.trusted_proxies, len(route))]
+        return request.remote_addr or "-"
+
+    def admit(self, scope):
+        """Seconds the client should wait, or 0 if the request may proceed."""
+        wait = self.buckets.take((
+            (f"{scope}:client:{self.client_address()}", self.client_rate, self.client_burst),
+            (f"{scope}:global", self.global_rate, self.global_burst),
+        ))
+        if wait:
+            self.rejected += 1
+        return wait
+
+
+def rate_limited(scope):
+    """Reject requests over the ``scope`` limits with 429 before the view runs."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get("rate_limiter")
+            if limiter is not None:
+                wait = limiter.admit(scope)
+                if wait:
+                    abort(
+                        429,
+                        message="Too many requests, try again later.",
+                        headers={"Retry-After": str(math.ceil(wait))},
+                    )
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def init_rate_limiter(app):
+    app.config.setdefault("RATE_LIMIT_BACKEND", os.getenv("RATE_LIMIT_BACKEND", "local"))
+    app.config.setdefault("RATE_LIMIT_CLIENT_RATE", float(os.getenv("RATE_LIMIT_CLIENT_RATE", "0.2")))
+    app.config.setdefault("RATE_LIMIT_CLIENT_BURST", float(os.getenv("RATE_LIMIT_CLIENT_BURST", "10")))
+    app.config.setdefault("RATE_LIMIT_GLOBAL_RATE", float(os.getenv("RATE_LIMIT_GLOBAL_RATE", "20")))
+    app.config.setdefault("RATE_LIMIT_GLOBAL_BURST", float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "40")))
+    app.config.setdefault("RATE_LIMIT_TRUSTED_PROXIES", int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0")))
+
+    backend = app.config["RATE_LIMIT_BACKEND"]
+    if backend == "none":
+        app.extensions["rate_limiter"] = None
+        return
+    if backend == "redis":
+        client = get_redis()
+        if client is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires REDIS_URL to be set.")
+        buckets = RedisTokenBuckets(client, fallback=LocalTokenBuckets())
+    elif backend == "local":
+        buckets = LocalTokenBuckets()
+    else:
+        raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND {backend!r}.")
+
+    app.extensions["rate_limiter"] = RateLimiter(
+        buckets,
+        app.config["RATE_LIMIT_CLIENT_RATE"],
+        app.config["RATE_LIMIT_CLIENT_BURST"],
+        app.config["RATE_LIMIT_GLOBAL_RATE"],
+        app.config["RATE_LIMIT_GLOBAL_BURST"],
+        app.config["RATE_LIMIT_TRUSTED_PROXIES"],
+    )
@@ -0,0 +1,43 @@
+"""A synthetic catalog for tests and benchmarks.
+
+``seed(stores, items, tags_per_store, links_per_item)`` fills an empty
+database with the same rows for the same arguments: stores ``store-<n>``,
+tags ``tag-<store>-<n>``, items ``item-<nnnnnn>`` spread over random stores,
+and ``links_per_item`` tags of its own store per item. Rows go in with Core
+bulk inserts, so ids are fixed and ``store_stats`` is rebuilt at the end.
+"""
+import random
+
+from db import db
+from models import ItemModel, StoreModel, TagModel, ItemTags
+from models.store_stats import rebuild_store_stats
+
+
+def seed(stores, items, tags_per_store, links_per_item):
+    rng = random.Random(42)
+    db.session.execute(db.insert(StoreModel), [{"id": s + 1, "name": f"store-{s}"} for s in range(stores)])
+    tag_rows = [
+        {"id": s * tags_per_store + t + 1, "name": f"tag-{s}-{t}", "store_id": s + 1}
+        for s in range(stores)
+        for t in range(tags_per_store)
+    ]
+    db.session.execute(db.insert(TagModel), tag_rows)
+
+    item_rows, link_rows = [], []
+    for i in range(items):
+        store_id = rng.randint(1, stores)
+        item_rows.append({
+            "id": i + 1,
+            "name": f"item-{i:06d}",
+            "description": None if i % 7 == 0 else f"description of item {i}",
+            "price": round(rng.uniform(0, 500), 2),
+            "store_id": store_id,
+        })
+        first_tag = (store_id - 1) * tags_per_store + 1
+        for tag_id in rng.sample(range(first_tag, first_tag + tags_per_store), links_per_item):
+            link_rows.append({"item_id": i + 1, "tag_id": tag_id})
+    db.session.execute(db.insert(ItemModel), item_rows)
+    db.session.execute(db.insert(ItemTags), link_rows)
+    # Core inserts skip the store_stats listeners.
+    rebuild_store_stats(db.session.connection())
+    db.session.commit()
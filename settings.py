@@ -4,4 +4,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
-QUEUES = ["emails", "default"] 
\ No newline at end of file
+QUEUES = ["emails", "default"]
+
+# Read by the web app as well as by `rq worker -c settings`.
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND") or ("rq" if REDIS_URL else "local")
+EMAIL_RETRY_INTERVALS = [int(s) for s in os.getenv("EMAIL_RETRY_INTERVALS", "10,60,300").split(",") if s.strip()]
+DEAD_LETTER_QUEUE = os.getenv("DEAD_LETTER_QUEUE", "emails-dead")
@@ -0,0 +1,23 @@
+"""``flask rebuild-store-stats``: recompute the store_stats summary table.
+
+The table is maintained incrementally (see models.store_stats). Rebuild it
+after writes that bypassed the app, or to clear floating-point drift in
+``price_sum``. The rebuild runs in one transaction, so readers see either the
+old rows or the new ones.
+"""
+import time
+
+import click
+
+from db import db
+from models.store_stats import rebuild_store_stats
+
+
+def init_store_stats(app):
+    @app.cli.command("rebuild-store-stats")
+    def rebuild_store_stats_command():
+        """Recompute per-store item, tag and price statistics from scratch."""
+        started = time.perf_counter()
+        stores = rebuild_store_stats(db.session.connection())
+        db.session.commit()
+        click.echo(f"store_stats: {stores} stores rebuilt in {time.perf_counter() - started:.3f}s")
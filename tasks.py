@@ -1,41 +1,87 @@
 from maileroo import MailerooClient, EmailAddress
+import maileroo.client
 import os
+import requests
 from dotenv import load_dotenv
 import jinja2
 
 load_dotenv()
 
-template_loader = jinja2.FileSystemLoader("templates")
-template_env = jinja2.Environment(loader=template_loader)
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
+# Templates are parsed once at import; auto_reload off skips the per-render mtime check.
+template_loader = jinja2.FileSystemLoader(TEMPLATE_DIR)
+template_env = jinja2.Environment(loader=template_loader, auto_reload=False)
+templates = {
+    name: template_env.get_template(name)
+    for name in ("email/action.html", "email/password_reset.html")
+}
 
-def render_template(tenplate_filename, **context):
-    return template_env.get_template(tenplate_filename).render(**context)
 
+def render_template(template_filename, **context):
+    template = templates.get(template_filename) or template_env.get_template(template_filename)
+    return template.render(**context)
+
+
+class PooledRequests:
+    """Stands in for ``requests`` inside the Maileroo SDK, which calls
+    ``requests.get``/``requests.request`` directly. Those go through one
+    Session per process, so consecutive sends reuse the TLS connection;
+    everything else (exceptions, ...) is the real module."""
+
+    def __init__(self):
+        self._session = None
+        self._pid = None
+
+    def session(self):
+        # Sessions do not survive a fork, so each worker process opens its own.
+        if self._session is None or self._pid != os.getpid():
+            self._session = requests.Session()
+            self._pid = os.getpid()
+        return self._session
+
+    def get(self, url, **kwargs):
+        return self.session().get(url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        return self.session().request(method, url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+maileroo.client.requests = PooledRequests()
+
+_client = None
+_client_pid = None
+
+
+def get_mail_client():
+    global _client, _client_pid
 
-def send_simple_email(to, username, subject, body, html=None):
     api = os.getenv('MAILEROO_API_KEY')
     if not api:
         raise ValueError("MAILEROO_API_KEY is not set in environment variables")
-    
-    client = MailerooClient(api)
 
-    try:
-        email_data = {
-            "from": EmailAddress("noreply@25d346ff4380bf05.maileroo.org", "STORES API"),
-            "to": [EmailAddress(to, username)],
-            "subject": subject,
-            "plain": body
-        }
+    if _client is None or _client_pid != os.getpid():
+        _client = MailerooClient(api)
+        _client_pid = os.getpid()
+    return _client
+
+
+def send_simple_email(to, username, subject, body, html=None):
+    # Errors propagate so the queue can retry and, eventually, dead-letter the job.
+    email_data = {
+        "from": EmailAddress("noreply@25d346ff4380bf05.maileroo.org", "STORES API"),
+        "to": [EmailAddress(to, username)],
+        "subject": subject,
+        "plain": body
+    }
 
-        if html:
-            email_data["html"] = html
+    if html:
+        email_data["html"] = html
 
-        response = client.send_basic_email(email_data)
-        return response
-    except Exception as e:
-        print("Error sending email:", e)
-        return None
+    return get_mail_client().send_basic_email(email_data)
 
 
 
@@ -58,4 +104,4 @@ def send_password_reset_email(email, username, reset_url):
         username=username,
         reset_url=reset_url,
     )
-    return send_simple_email(email, username, subject, text_body, html_body)
\ No newline at end of file
+    return send_simple_email(email, username, subject, text_body, html_body)
@@ -0,0 +1,44 @@
+import os
+
+# Before the app is imported: modules read some of these at import time.
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-test-secret-key-test")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("QUEUE_BACKEND", "local")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+os.environ.setdefault("DB_CREATE_ALL", "1")
+# One process, so the local caches are safe, and the tests cover cached answers.
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "local")
+os.environ.setdefault("JWT_BLOCKLIST_CACHE_TTL", "60")
+for name in ("DATABASE_URL", "DATABASE_REPLICA_URLS", "REDIS_URL", "PROMETHEUS_MULTIPROC_DIR"):
+    os.environ.pop(name, None)
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from db import db
+from models import UserModel
+from seed import seed
+
+
+@pytest.fixture(scope="module")
+def app():
+    """An app on a fresh in-memory database, seeded like the benchmarks, with its context pushed."""
+    app = create_app("sqlite://")
+    with app.app_context():
+        seed(stores=5, items=200, tags_per_store=5, links_per_item=2)
+        db.session.add(UserModel(username="admin", email="admin@example.com", password="-", is_admin=True))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="module")
+def auth_headers(app):
+    user = UserModel.query.filter_by(username="admin").one()
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id), fresh=True)}"}
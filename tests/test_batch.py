@@ -0,0 +1,83 @@
+import pytest
+
+from models import StoreModel
+
+
+def post_batch(client, auth_headers, requests, transaction=False):
+    response = client.post("/batch", json={"requests": requests, "transaction": transaction}, headers=auth_headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.json
+
+
+def statuses(result):
+    return [entry["status"] for entry in result["responses"]]
+
+
+@pytest.mark.parametrize("failing", [
+    {"method": "POST", "path": "/store", "body": {"name": "store-0"}},
+    {"method": "POST", "path": "/store/1/tag", "body": {"name": "tag-0-0"}},
+])
+def test_failed_write_does_not_break_later_requests(client, auth_headers, failing):
+    result = post_batch(client, auth_headers, [failing, {"method": "GET", "path": "/store/1"}])
+    assert statuses(result)[0] in (400, 500)
+    assert statuses(result)[1] == 200
+    assert result["responses"][1]["body"]["id"] == 1
+    assert "committed" not in result
+
+
+def test_sub_requests_get_their_own_status(client, auth_headers):
+    result = post_batch(client, auth_headers, [
+        {"method": "GET", "path": "/store/999999"},
+        {"method": "POST", "path": "/store", "body": {"name": "batch-isolated"}},
+        {"method": "GET", "path": "/item?limit=2"},
+    ])
+    assert statuses(result) == [404, 201, 200]
+    assert result["responses"][1]["body"]["name"] == "batch-isolated"
+    assert len(result["responses"][2]["body"]["data"]) == 2
+    assert StoreModel.query.filter_by(name="batch-isolated").count() == 1
+
+
+def test_transaction_rolls_back_and_skips_the_rest(client, auth_headers):
+    before = client.get("/store/2", headers=auth_headers).json["name"]
+
+    result = post_batch(client, auth_headers, [
+        {"method": "POST", "path": "/store", "body": {"name": "batch-rolled-back"}},
+        {"method": "PUT", "path": "/store/2", "body": {"name": "batch-renamed"}},
+        {"method": "GET", "path": "/store/2"},
+        {"method": "POST", "path": "/store", "body": {"name": "store-0"}},
+        {"method": "GET", "path": "/store/1"},
+    ], transaction=True)
+
+    assert statuses(result) == [201, 200, 200, 400, 424]
+    assert result["committed"] is False
+    # Reads inside the transaction see its writes...
+    assert result["responses"][2]["body"]["name"] == "batch-renamed"
+    # ...but nothing is kept, and no cached body leaks the rolled-back rename.
+    assert StoreModel.query.filter_by(name="batch-rolled-back").count() == 0
+    assert client.get("/store/2", headers=auth_headers).json["name"] == before
+
+
+def test_transaction_commits_together(client, auth_headers):
+    result = post_batch(client, auth_headers, [
+        {"method": "POST", "path": "/store", "body": {"name": "batch-committed"}},
+        {"method": "PUT", "path": "/store/3", "body": {"name": "batch-committed-rename"}},
+    ], transaction=True)
+
+    assert statuses(result) == [201, 200]
+    assert result["committed"] is True
+    assert StoreModel.query.filter_by(name="batch-committed").count() == 1
+    assert client.get("/store/3", headers=auth_headers).json["name"] == "batch-committed-rename"
+
+
+@pytest.mark.parametrize("path", ["/batch", "/login", "/item?stream=1"])
+def test_paths_outside_the_batch_are_rejected(client, auth_headers, path):
+    result = post_batch(client, auth_headers, [
+        {"method": "POST" if path != "/item?stream=1" else "GET", "path": path, "body": {"requests": []}},
+    ])
+    assert statuses(result) == [400]
+
+
+def test_too_many_requests(app, client, auth_headers):
+    requests = [{"method": "GET", "path": "/store/1"}] * (app.config["BATCH_MAX_REQUESTS"] + 1)
+    response = client.post("/batch", json={"requests": requests}, headers=auth_headers)
+    assert response.status_code == 413
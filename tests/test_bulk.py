@@ -0,0 +1,100 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from models import ItemModel, StoreModel, StoreStatsModel, UserModel
+
+
+@pytest.fixture(scope="module")
+def store(client, auth_headers):
+    """A store of its own, so the counts below are not disturbed by other tests."""
+    response = client.post("/store", json={"name": "bulk-store"}, headers=auth_headers)
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def stats(store_id):
+    return StoreStatsModel.query.get(store_id)
+
+
+def version(model, row_id):
+    return model.query.get(row_id).version
+
+
+def test_create_reports_errors_by_row_index(client, auth_headers, store):
+    store_version = version(StoreModel, store)
+    response = client.post("/item/bulk", json={"items": [
+        {"name": "bulk-a", "price": 2.0, "store_id": store},
+        {"name": "bulk-no-price", "store_id": store},
+        {"name": "bulk-no-store", "price": 1.0, "store_id": 999999},
+        {"name": "bulk-b", "price": 6.0, "store_id": store},
+    ]}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.json["count"] == 2
+    assert [error["index"] for error in response.json["errors"]] == [1, 2]
+    assert "price" in response.json["errors"][0]["errors"]
+    assert response.json["errors"][1]["errors"] == {"store_id": ["Store does not exist."]}
+    assert version(StoreModel, store) == store_version + 1
+    row = stats(store)
+    assert (row.item_count, row.min_price, row.max_price) == (2, 2.0, 6.0)
+
+
+def test_update_bumps_versions_and_stats(client, auth_headers, store):
+    items = ItemModel.query.filter_by(store_id=store).order_by(ItemModel.id).all()
+    item_version, store_version = items[0].version, version(StoreModel, store)
+    response = client.put("/item/bulk", json={"items": [
+        {"id": items[0].id, "price": 10.0},
+        {"id": 999999, "price": 1.0},
+    ]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["count"] == 1
+    assert response.json["errors"] == [{"index": 1, "errors": {"id": ["Item does not exist."]}}]
+    assert version(ItemModel, items[0].id) == item_version + 1
+    assert version(StoreModel, store) == store_version + 1
+    assert stats(store).max_price == 10.0
+    assert client.get(f"/item/{items[0].id}", headers=auth_headers).json["price"] == 10.0
+
+
+def test_update_needs_a_fresh_token(app, client, store):
+    user = UserModel.query.filter_by(username="admin").one()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id), fresh=False)}"}
+    item = ItemModel.query.filter_by(store_id=store).first()
+    response = client.put("/item/bulk", json={"items": [{"id": item.id, "price": 3.0}]}, headers=headers)
+    assert response.status_code == 401
+
+
+def test_links_reject_duplicates(client, auth_headers, store):
+    tag_id = client.post(f"/store/{store}/tag", json={"name": "bulk-tag"}, headers=auth_headers).json["id"]
+    item_ids = [item.id for item in ItemModel.query.filter_by(store_id=store).order_by(ItemModel.id)]
+    item_version = version(ItemModel, item_ids[0])
+
+    response = client.post("/item/tags/bulk", json={"links": [
+        {"item_id": item_ids[0], "tag_id": tag_id},
+        {"item_id": item_ids[0], "tag_id": tag_id},
+        {"item_id": item_ids[1], "tag_id": tag_id},
+    ]}, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json["count"] == 2
+    assert response.json["errors"] == [{"index": 1, "errors": {"_schema": ["Item is already linked to this tag."]}}]
+
+    again = client.post("/item/tags/bulk", json={"links": [{"item_id": item_ids[1], "tag_id": tag_id}]}, headers=auth_headers)
+    assert again.json["count"] == 0
+    assert [error["index"] for error in again.json["errors"]] == [0]
+
+    assert version(ItemModel, item_ids[0]) == item_version + 1
+    assert stats(store).link_count == 2
+    assert {tag["id"] for tag in client.get(f"/item/{item_ids[0]}", headers=auth_headers).json["tags"]} == {tag_id}
+
+
+@pytest.mark.parametrize("method, path, key", [
+    ("POST", "/item/bulk", "items"),
+    ("PUT", "/item/bulk", "items"),
+    ("DELETE", "/item/bulk", "ids"),
+    ("POST", "/item/tags/bulk", "links"),
+])
+def test_too_many_rows(app, client, auth_headers, monkeypatch, method, path, key):
+    monkeypatch.setitem(app.config, "BULK_MAX_ROWS", 2)
+    rows = [1, 2, 3] if key == "ids" else [{}] * 3
+    response = client.open(path, method=method, json={key: rows}, headers=auth_headers)
+    assert response.status_code == 413
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from db import db
+from models.changes import allocations_table, counter_table
+from resources.changes import END_RANK
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def changes_since(client, auth_headers, seq):
+    response = client.get(f"/changes?since={encode_cursor('changes', [seq, END_RANK])}", headers=auth_headers)
+    assert response.status_code == 200
+    return response.json
+
+
+def counter():
+    return db.session.scalar(select(counter_table.c.seq).where(counter_table.c.id == 1))
+
+
+@pytest.fixture
+def in_flight(app):
+    """A number taken by a transaction that has not committed yet, as on PostgreSQL."""
+    def allocate(allocated_at=None):
+        seq = counter() + 1
+        db.session.execute(update(counter_table).where(counter_table.c.id == 1).values(seq=seq))
+        db.session.execute(insert(allocations_table).values(seq=seq, allocated_at=allocated_at or datetime.now()))
+        db.session.commit()
+        return seq
+
+    yield allocate
+    db.session.execute(delete(allocations_table))
+    db.session.commit()
+
+
+def test_feed_stops_below_a_number_in_flight(client, auth_headers, in_flight):
+    start = counter()
+    seq = in_flight()
+    client.post("/store", json={"name": "changes-after-in-flight"}, headers=auth_headers)
+
+    page = changes_since(client, auth_headers, start)
+    assert page["data"] == []
+    assert decode_cursor(page["next_cursor"], "changes") == [seq - 1, END_RANK]
+
+    db.session.execute(delete(allocations_table).where(allocations_table.c.seq == seq))
+    db.session.commit()
+    page = changes_since(client, auth_headers, start)
+    assert [entry["data"]["name"] for entry in page["data"]] == ["changes-after-in-flight"]
+
+
+def test_stale_allocation_is_ignored(app, client, auth_headers, in_flight):
+    start = counter()
+    in_flight(datetime.now() - timedelta(seconds=app.config["CHANGES_ALLOCATION_TIMEOUT"] + 1))
+    client.post("/store", json={"name": "changes-after-stale"}, headers=auth_headers)
+
+    page = changes_since(client, auth_headers, start)
+    assert [entry["data"]["name"] for entry in page["data"]] == ["changes-after-stale"]
@@ -0,0 +1,19 @@
+import pytest
+
+import app as app_module
+import compaction
+
+
+def test_failed_run_still_schedules_the_next(app, monkeypatch):
+    scheduled = []
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("compaction failed")
+
+    monkeypatch.setattr(app_module, "create_app", lambda: app)
+    monkeypatch.setattr(compaction, "compact_expired", fail)
+    monkeypatch.setattr(compaction, "schedule_compaction", lambda connection, interval: scheduled.append(interval))
+
+    with pytest.raises(RuntimeError):
+        compaction.run_scheduled_compaction()
+    assert scheduled == [app.config["COMPACTION_INTERVAL"]]
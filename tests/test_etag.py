@@ -0,0 +1,73 @@
+"""The async read path (asgi.py) must send the ETags the Flask path sends."""
+import asyncio
+
+import pytest
+from flask_jwt_extended import create_access_token
+from flask_smorest.etag import EtagMixin
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from asgi import CatalogReadApp, async_database_url
+from app import create_app
+from db import db
+from models import UserModel
+from seed import seed
+from utils.etag import etag_value
+
+PATHS = ["/item/1", "/store/1", "/tag/1", "/item", "/item?sort=-price&limit=5", "/store", "/store/1/tag"]
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    # The async engine needs a database it can open too, so not an in-memory one.
+    url = f"sqlite:///{tmp_path_factory.mktemp('etag') / 'catalog.db'}"
+    app = create_app(url)
+    with app.app_context():
+        seed(stores=3, items=30, tags_per_store=3, links_per_item=2)
+        db.session.add(UserModel(username="admin", email="admin@example.com", password="-", is_admin=True))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope="module")
+def read_app(app):
+    engine = create_async_engine(async_database_url(app.config["SQLALCHEMY_DATABASE_URI"]))
+    yield CatalogReadApp(app, engine, wsgi_threads=1)
+    asyncio.run(engine.dispose())
+
+
+def async_etag(read_app, path, token):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode("latin-1"),
+        "headers": [(b"authorization", f"Bearer {token}".encode("latin-1"))],
+    }
+    response = asyncio.run(read_app.serve_read(scope))
+    assert response is not None, f"{path} fell back to the Flask app"
+    return response[0]
+
+
+@pytest.mark.parametrize("etag_data", [[1, 3], "0a1b2c", [[1, 2], {"page": 1}]])
+def test_etag_value_matches_flask_smorest(app, etag_data):
+    assert etag_value(etag_data) == EtagMixin._generate_etag(etag_data)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_sync_and_async_etags_match(app, read_app, path):
+    user = UserModel.query.filter_by(username="admin").one()
+    token = create_access_token(identity=str(user.id))
+    response = app.test_client().get(path, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert async_etag(read_app, path, token) == response.headers["ETag"]
+
+
+@pytest.mark.parametrize("path", ["/item?stream=1", "/store?stream=1", "/store/1/tag?stream=1"])
+def test_stream_etag_changes_with_any_write(app, path):
+    user = UserModel.query.filter_by(username="admin").one()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+    client = app.test_client()
+    etag = client.get(path, headers=headers).headers["ETag"]
+    assert client.get(path, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.put("/store/2", json={"name": f"renamed for {path}"}, headers=headers)
+    assert client.get(path, headers={**headers, "If-None-Match": etag}).status_code == 200
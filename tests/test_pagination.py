@@ -0,0 +1,74 @@
+import base64
+import json
+
+import pytest
+
+from db import db
+from models import ItemModel, StoreModel
+from utils.pagination import encode_cursor
+
+
+@pytest.fixture(scope="module")
+def tied_store(app):
+    """A store whose items share two prices, so pages end in the middle of a tie."""
+    store = StoreModel(name="pagination-ties")
+    db.session.add(store)
+    db.session.flush()
+    for i in range(7):
+        db.session.add(ItemModel(name=f"tie-{i}", price=5.0 if i < 4 else 7.5, description="", store_id=store.id))
+    db.session.commit()
+    return store.id
+
+
+def walk(client, auth_headers, path):
+    """Every item of a paginated listing, following next_cursor page by page."""
+    ids, cursor = [], None
+    while True:
+        page = client.get(path + (f"&cursor={cursor}" if cursor else ""), headers=auth_headers)
+        assert page.status_code == 200, page.get_data(as_text=True)
+        ids += [item["id"] for item in page.json["data"]]
+        if not page.json["has_more"]:
+            return ids
+        cursor = page.json["next_cursor"]
+
+
+@pytest.mark.parametrize("sort", ["price", "-price", "name", "-id"])
+def test_pages_cover_ties_once_in_order(client, auth_headers, tied_store, sort):
+    ids = walk(client, auth_headers, f"/item?store_id={tied_store}&sort={sort}&limit=3")
+
+    items = ItemModel.query.filter_by(store_id=tied_store).all()
+    key = sort.lstrip("-")
+    expected = sorted(items, key=lambda item: (getattr(item, key), item.id), reverse=sort.startswith("-"))
+    assert ids == [item.id for item in expected]
+
+
+def tampered(cursor):
+    raw = bytearray(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    raw[-3] ^= 0x55
+    return base64.urlsafe_b64encode(bytes(raw)).decode("ascii").rstrip("=")
+
+
+def raw_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/item?sort=price&cursor=", tampered(encode_cursor("price", [5.0, 1]))),
+    ("/item?sort=price&cursor=", "not a cursor"),
+    ("/item?sort=price&cursor=", raw_cursor({"v": [5.0, 1]})),
+    ("/item?sort=price&cursor=", encode_cursor("name", ["item-1", 1])),
+    ("/item?sort=-price&cursor=", encode_cursor("price", [5.0, 1])),
+    ("/item?sort=price&cursor=", encode_cursor("price", ["cheap", 1])),
+    ("/item?sort=price&cursor=", encode_cursor("price", [5.0, "1"])),
+    ("/item?sort=price&cursor=", encode_cursor("price", [5.0, True])),
+    ("/item?sort=price&cursor=", encode_cursor("price", [5.0])),
+    ("/item?cursor=", encode_cursor("id", {"id": 1})),
+    ("/store?sort=name&cursor=", encode_cursor("name", [3, 1])),
+    ("/item/search?q=item&cursor=", encode_cursor("id", [1])),
+    ("/changes?since=", encode_cursor("changes", [1, 0, "1"])),
+    ("/changes?since=", encode_cursor("changes", [1, 99])),
+    ("/changes?since=", encode_cursor("id", [1, 0, 1])),
+])
+def test_bad_cursors_are_rejected(client, auth_headers, path, cursor):
+    response = client.get(path + cursor, headers=auth_headers)
+    assert response.status_code == 400, response.get_data(as_text=True)
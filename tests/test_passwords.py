@@ -0,0 +1,55 @@
+import os
+import signal
+import time
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import ServiceUnavailable
+
+from security.passwords import PasswordHasher
+
+
+def sleep_for(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def kill_worker():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.1)
+    with Flask(__name__).app_context():
+        yield hasher
+    if hasher._pool is not None:
+        hasher._pool.shutdown(cancel_futures=True)
+
+
+def wait_until_idle(hasher, deadline=5.0):
+    started = time.monotonic()
+    while hasher._pending and time.monotonic() - started < deadline:
+        time.sleep(0.01)
+
+
+def test_timed_out_work_keeps_its_slot(hasher):
+    with pytest.raises(ServiceUnavailable):
+        hasher._run("hash", sleep_for, 0.5)
+    assert hasher._pending == 1
+    with pytest.raises(ServiceUnavailable):
+        hasher._run("hash", sleep_for, 0)
+    assert hasher.stats()["hash"]["timed_out"] == 1
+    assert hasher.stats()["hash"]["rejected"] == 1
+
+    wait_until_idle(hasher)
+    assert hasher._run("hash", sleep_for, 0) == 0
+
+
+def test_broken_pool_is_replaced(hasher):
+    with pytest.raises(ServiceUnavailable):
+        hasher._run("hash", kill_worker)
+    assert hasher.stats()["hash"]["broken"] == 1
+
+    wait_until_idle(hasher)
+    assert hasher._run("hash", sleep_for, 0) == 0
@@ -0,0 +1,47 @@
+"""Collection and detail GETs issue a fixed number of statements, whatever the page size.
+
+Nested relationships are eager loaded (``*_LOAD_OPTIONS``); a lazy load
+would add a statement per row and break the budget on the larger page.
+"""
+import pytest
+
+from utils.query_budget import assert_query_budget
+from utils.response_cache import NullResponseCache
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_blocklist(client, auth_headers):
+    # The first request with a token looks it up in the blocklist; later ones hit the cache.
+    client.get("/store/stats", headers=auth_headers)
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/item", 3),
+    ("/item?sort=-price&store_id=1", 3),
+    ("/item?tags_any=1&tags_any=2", 3),
+    ("/item/search?q=item", 2),
+    ("/store", 4),
+    ("/store/1/tag", 4),
+    ("/store/stats", 1),
+    ("/changes", 5),
+])
+@pytest.mark.parametrize("limit", [5, 100])
+def test_collection_query_budget(client, auth_headers, path, budget, limit):
+    separator = "&" if "?" in path else "?"
+    with assert_query_budget(budget):
+        response = client.get(f"{path}{separator}limit={limit}", headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/item/1", 3),
+    ("/store/1", 4),
+    ("/tag/1", 3),
+    ("/store/1/stats", 1),
+])
+def test_detail_query_budget(app, client, auth_headers, monkeypatch, path, budget):
+    # Measure the load path, not a response cache hit.
+    monkeypatch.setitem(app.extensions, "response_cache", NullResponseCache())
+    with assert_query_budget(budget):
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
@@ -0,0 +1,88 @@
+"""No endpoint may read a whole table: EXPLAIN every statement it issues.
+
+A failure here usually means an index was dropped, or a new filter or sort
+is not covered by one. The calls run in order on one database, so the
+writes near the end see the rows the earlier calls left.
+"""
+import pytest
+from passlib.hash import pbkdf2_sha256
+
+from db import db
+from models import ItemModel, TagModel, UserModel
+from utils.pagination import encode_cursor
+from utils.query_plans import capture_statements, find_full_scans
+
+PASSWORD = "query-plans-password"
+
+# (method, path, json body); paths and bodies are formatted with the ids from ``plan_ids``.
+ENDPOINTS = [
+    ("GET", "/item?limit=20", None),
+    ("GET", "/item?limit=20&sort=-name", None),
+    ("GET", "/item?limit=20&sort=price", None),
+    ("GET", "/item?limit=20&store_id={store_id}", None),
+    ("GET", "/item?limit=20&store_id={store_id}&sort=name", None),
+    ("GET", "/item?limit=20&sort=price&min_price=10&max_price=20", None),
+    ("GET", "/item?limit=20&sort=name&name_prefix=item-0001", None),
+    ("GET", "/item?limit=20&tags_all={linked_tag_id}&tags_none={free_tag_id}", None),
+    ("GET", "/item?limit=20&sort=price&tags_any={linked_tag_id}&tags_any={free_tag_id}", None),
+    ("GET", "/item/search?q=item-0001&limit=20", None),
+    ("GET", "/item/search?q=item&store_id={store_id}&tag_id={linked_tag_id}&limit=20", None),
+    ("GET", "/item/{item_id}", None),
+    ("GET", "/store/{store_id}/stats", None),
+    ("GET", "/store/stats?limit=20", None),
+    ("GET", "/store?limit=20", None),
+    ("GET", "/store?limit=20&sort=name", None),
+    ("GET", "/store/{store_id}", None),
+    ("GET", "/store/{store_id}/tag?limit=20", None),
+    ("GET", "/tag/{linked_tag_id}", None),
+    ("PUT", "/item/{item_id}", {"name": "renamed", "price": 1.0, "description": "renamed"}),
+    ("POST", "/item/{item_id}/tag/{free_tag_id}", None),
+    ("DELETE", "/item/{item_id}/tag/{free_tag_id}", None),
+    ("POST", "/item/bulk", {"items": [{"name": "bulk-query-plans", "price": 1.0, "store_id": "{store_id}"}]}),
+    ("PUT", "/item/bulk", {"items": [{"id": "{item_id}", "price": 2.0}]}),
+    ("POST", "/item/tags/bulk", {"links": [{"item_id": "{item_id}", "tag_id": "{free_tag_id}"}]}),
+    ("DELETE", "/item/{item_id}", None),
+    ("DELETE", "/store/{store_id}", None),
+    ("GET", "/changes?limit=20", None),
+    ("GET", "/changes?limit=20&since=" + encode_cursor("changes", [1, 0, 0]), None),
+    ("POST", "/login", {"username": "query-plans", "password": PASSWORD}),
+]
+
+
+def fill(value, ids):
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    if isinstance(value, str) and value.startswith("{") and value.endswith("}"):
+        return ids[value[1:-1]]
+    return value
+
+
+@pytest.fixture(scope="module")
+def plan_ids(app):
+    db.session.add(UserModel(
+        username="query-plans",
+        email="query-plans@example.com",
+        password=pbkdf2_sha256.using(rounds=app.config["PASSWORD_HASH_ROUNDS"]).hash(PASSWORD),
+    ))
+    db.session.commit()
+
+    item = ItemModel.query.order_by(ItemModel.id.desc()).first()
+    linked = [tag.id for tag in item.tags]
+    free = TagModel.query.filter(TagModel.store_id == item.store_id, TagModel.id.notin_(linked)).first()
+    return {"item_id": item.id, "store_id": item.store_id, "linked_tag_id": linked[0], "free_tag_id": free.id}
+
+
+@pytest.mark.parametrize("method, path, body", ENDPOINTS, ids=[f"{m} {p}" for m, p, _ in ENDPOINTS])
+def test_no_full_table_scans(client, auth_headers, plan_ids, method, path, body):
+    with capture_statements() as statements:
+        response = client.open(path.format(**plan_ids), method=method, json=fill(body, plan_ids), headers=auth_headers)
+    assert response.status_code < 400, response.get_data(as_text=True)
+    assert statements
+
+    problems = find_full_scans(statements)
+    assert not problems, "\n".join(
+        f"scans {', '.join(tables)}: {' '.join(statement.split())}\n  " + "\n  ".join(steps)
+        for statement, tables, steps in problems
+    )
@@ -0,0 +1,31 @@
+from flask_smorest import Blueprint
+
+from utils.response_cache import LocalResponseCache, cached_response, get_response_cache, invalidate
+
+
+def test_fill_after_invalidation_is_dropped():
+    cache = LocalResponseCache(ttl=30)
+    generation = cache.reserve("item:1")
+    cache.delete("item:1")
+    cache.set("item:1", [1, 1], b"old", generation)
+    assert cache.get("item:1") is None
+
+    cache.set("item:1", [1, 2], b"new", cache.reserve("item:1"))
+    assert cache.get("item:1") == ([1, 2], b"new")
+
+
+def test_invalidation_during_render_is_not_undone(app):
+    blp = Blueprint("cache-test", __name__)
+
+    def render():
+        # A write commits and invalidates while this request is still rendering the old row.
+        invalidate(items=[424242])
+        return [424242, 1], {"version": 1}
+
+    with app.test_request_context("/item/424242"):
+        cached_response(blp, "item:424242", lambda: [424242, 1], render)
+    assert get_response_cache().get("item:424242") is None
+
+    with app.test_request_context("/item/424242"):
+        cached_response(blp, "item:424242", lambda: [424242, 2], lambda: ([424242, 2], {"version": 2}))
+    assert get_response_cache().get("item:424242")[0] == [424242, 2]
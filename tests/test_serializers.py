@@ -0,0 +1,85 @@
+"""The compiled dumpers and the response cache must send the bytes marshmallow would."""
+import pytest
+from flask import jsonify
+
+import schemas
+from models import ItemModel, StoreModel, TagModel
+from resources.item import ITEM_LOAD_OPTIONS, SORT_COLUMNS, dump_item_page
+from utils.pagination import apply_keyset, build_page
+from utils.projections import build_item_rows, item_rows_query
+from utils.serializers import compile_schema
+
+SORTS = ("id", "-id", "name", "-name", "price", "-price")
+
+
+def body(payload):
+    return jsonify(payload).get_data()
+
+
+@pytest.mark.parametrize("schema_cls, model", [
+    (schemas.PlainItemSchema, ItemModel),
+    (schemas.ItemSchema, ItemModel),
+    (schemas.PlainStoreSchema, StoreModel),
+    (schemas.StoreSchema, StoreModel),
+    (schemas.PlainTagSchema, TagModel),
+    (schemas.TagSchema, TagModel),
+])
+def test_compiled_dump_matches_schema(app, schema_cls, model):
+    schema = schema_cls()
+    dump = compile_schema(schema)
+    for obj in model.query.order_by(model.id).limit(50):
+        assert body(dump(obj)) == body(schema.dump(obj)), f"{schema_cls.__name__} id={obj.id}"
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_projected_item_page_matches_orm_page(app, sort):
+    orm = apply_keyset(ItemModel.query.options(*ITEM_LOAD_OPTIONS), sort, None, 20, SORT_COLUMNS, ItemModel.id)
+    expected = schemas.ItemPageSchema().dump(build_page(orm.all(), sort, 20))
+
+    projected = apply_keyset(item_rows_query(), sort, None, 20, SORT_COLUMNS, ItemModel.id)
+    page = build_page(projected.all(), sort, 20)
+    page["data"] = build_item_rows(page["data"])
+
+    assert body(dump_item_page(page)) == body(expected)
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_item_list_response_matches_schema(app, client, auth_headers, sort):
+    response = client.get(f"/item?limit=20&sort={sort}", headers=auth_headers)
+    assert response.status_code == 200
+
+    orm = apply_keyset(ItemModel.query.options(*ITEM_LOAD_OPTIONS), sort, None, 20, SORT_COLUMNS, ItemModel.id)
+    assert response.get_data() == body(schemas.ItemPageSchema().dump(build_page(orm.all(), sort, 20)))
+
+
+@pytest.mark.parametrize("path, model, schema_cls", [
+    ("/item", ItemModel, schemas.ItemSchema),
+    ("/store", StoreModel, schemas.StoreSchema),
+    ("/tag", TagModel, schemas.TagSchema),
+])
+def test_cached_detail_matches_schema(app, client, auth_headers, path, model, schema_cls):
+    obj = model.query.order_by(model.id).first()
+    expected = body(schema_cls().dump(obj))
+
+    miss = client.get(f"{path}/{obj.id}", headers=auth_headers)
+    hit = client.get(f"{path}/{obj.id}", headers=auth_headers)
+    assert miss.status_code == hit.status_code == 200
+    assert miss.get_data() == expected
+    assert hit.get_data() == expected
+
+
+def test_stream_lines_match_detail_bodies(app, client, auth_headers):
+    response = client.get("/store?stream=1&limit=3", headers=auth_headers)
+    assert response.status_code == 200
+    lines = response.get_data().splitlines(keepends=True)
+    stores = StoreModel.query.order_by(StoreModel.id).limit(3).all()
+    assert lines == [body(schemas.StoreSchema().dump(store)) for store in stores]
+
+
+def test_batch_entries_are_compact(app, client, auth_headers):
+    store = StoreModel.query.order_by(StoreModel.id).first()
+    response = client.post("/batch", json={"requests": [{"method": "GET", "path": f"/store/{store.id}"}]}, headers=auth_headers)
+    assert response.status_code == 200
+    entry = response.get_data().split(b'"responses":[', 1)[1]
+    assert entry.startswith(b'{"headers":{"ETag":')
+    assert b'},"status":200,"body":' + body(schemas.StoreSchema().dump(store)).rstrip(b"\n") + b"}" in entry
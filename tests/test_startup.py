@@ -0,0 +1,11 @@
+"""Worker cold start stays within budget.
+
+Each probe is a fresh interpreter that imports ``app`` and calls
+``create_app()``: in this process both are long since imported.
+"""
+from benchmarks.startup import check_budget
+
+
+def test_startup_budget():
+    _, _, failures = check_budget(runs=3)
+    assert not failures, "\n".join(failures)
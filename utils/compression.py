@@ -0,0 +1,254 @@
+"""Negotiated response compression (gzip, and brotli / zstd when installed).
+
+The encoding is picked from ``Accept-Encoding``: the client's q-values
+decide, and ties go to the first entry of ``COMPRESSION_ENCODINGS``. Only
+compressible types (``COMPRESSION_MIMETYPES``) are touched, and a buffered
+body shorter than ``COMPRESSION_MIN_SIZE`` is sent as is: below about one
+packet, compressing saves no round trip and still costs CPU.
+
+NDJSON streams are compressed chunk by chunk. Each chunk is flushed, so the
+client can decode each batch as soon as it arrives.
+
+Responses with an ETag are cacheable. Their compressed bodies are kept in
+a per-process LRU keyed by encoding and a digest of the uncompressed body,
+so a hot ``/store/<id>`` or ``/item`` page is compressed once, not on every
+request. The digest key means nothing ever has to be invalidated: a
+changed body simply misses.
+
+A compressed variant gets its own ETag, ``"<etag>-<encoding>"``, because
+caches must not confuse it with the identity body. The suffix is removed
+from If-None-Match / If-Match before the views compare them, so
+conditional requests keep answering 304.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+from utils.metrics import timed
+from utils.response_cache import CacheStats
+
+try:
+    import brotli
+except ImportError:  # optional: br is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is not offered without it
+    zstandard = None
+
+
+class GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def _gzip(body, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+# encoding -> (one-shot compress, stream class)
+CODECS = {"gzip": (_gzip, GzipStream)}
+if brotli is not None:
+    CODECS["br"] = (lambda body, level: brotli.compress(body, quality=level), BrotliStream)
+if zstandard is not None:
+    CODECS["zstd"] = (lambda body, level: zstandard.ZstdCompressor(level=level).compress(body), ZstdStream)
+
+ETAG_SUFFIX = re.compile(r'-(?:gzip|br|zstd)"')
+SKIPPED_STATUSES = (204, 206, 304)
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies with a total size budget in bytes."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # (encoding, digest) -> compressed body
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self.size -= len(oldest)
+                self.stats.evictions += 1
+
+
+class ResponseCompressor:
+    def __init__(self, encodings, levels, min_size, mimetypes, cache=None):
+        self.encodings = [encoding for encoding in encodings if encoding in CODECS]
+        self.levels = levels
+        self.min_size = min_size
+        self.mimetypes = frozenset(mimetypes)
+        self.cache = cache
+
+    def negotiate(self, accept_encoding):
+        """The encoding to use for this ``Accept-Encoding`` value, or None for identity."""
+        if not accept_encoding:
+            return None
+        return parse_accept_header(accept_encoding).best_match(self.encodings)
+
+    def compress(self, body, encoding, cacheable=False):
+        compress = CODECS[encoding][0]
+        if not cacheable or self.cache is None:
+            return compress(body, self.levels[encoding])
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = compress(body, self.levels[encoding])
+            self.cache.set(key, compressed)
+        return compressed
+
+    def stream(self, response, encoding):
+        """Replace a streamed body with its compressed, per-chunk flushed version."""
+        inner = response.response
+        chunks = response.iter_encoded()
+        compressor = CODECS[encoding][1](self.levels[encoding])
+
+        def generate():
+            try:
+                for chunk in chunks:
+                    data = compressor.compress(chunk)
+                    if data:
+                        yield data
+                yield compressor.finish()
+            finally:
+                if hasattr(inner, "close"):
+                    inner.close()
+
+        response.response = generate()
+
+    def process(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in SKIPPED_STATUSES
+            or response.mimetype not in self.mimetypes
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or "no-transform" in response.headers.get("Cache-Control", "")
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.is_streamed:
+            self.stream(response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            with timed("compress"):
+                response.set_data(self.compress(body, encoding, cacheable=etag is not None))
+        response.headers["Content-Encoding"] = encoding
+        if etag is not None:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+
+def encoded_etag(etag, encoding):
+    return f"{etag}-{encoding}"
+
+
+def strip_encoded_etags(value):
+    """Map the ETags of compressed variants in a conditional header back to the identity ETags."""
+    return ETAG_SUFFIX.sub('"', value)
+
+
+def init_compression(app):
+    app.config.setdefault("COMPRESSION_ENABLED", os.getenv("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes"))
+    app.config.setdefault("COMPRESSION_ENCODINGS", os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip"))
+    app.config.setdefault("COMPRESSION_MIN_SIZE", int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+    app.config.setdefault("COMPRESSION_GZIP_LEVEL", int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")))
+    app.config.setdefault("COMPRESSION_BROTLI_LEVEL", int(os.getenv("COMPRESSION_BROTLI_LEVEL", "5")))
+    app.config.setdefault("COMPRESSION_ZSTD_LEVEL", int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")))
+    app.config.setdefault("COMPRESSION_CACHE_MAX_BYTES", int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(16 * 1024 * 1024))))
+    app.config.setdefault(
+        "COMPRESSION_MIMETYPES",
+        os.getenv("COMPRESSION_MIMETYPES", "application/json,application/x-ndjson,text/html,text/plain"),
+    )
+    if not app.config["COMPRESSION_ENABLED"]:
+        app.extensions["compression"] = None
+        return
+
+    max_bytes = app.config["COMPRESSION_CACHE_MAX_BYTES"]
+    compressor = ResponseCompressor(
+        [encoding.strip() for encoding in app.config["COMPRESSION_ENCODINGS"].split(",")],
+        {
+            "gzip": app.config["COMPRESSION_GZIP_LEVEL"],
+            "br": app.config["COMPRESSION_BROTLI_LEVEL"],
+            "zstd": app.config["COMPRESSION_ZSTD_LEVEL"],
+        },
+        app.config["COMPRESSION_MIN_SIZE"],
+        [mimetype.strip() for mimetype in app.config["COMPRESSION_MIMETYPES"].split(",")],
+        CompressedBodyCache(max_bytes) if max_bytes else None,
+    )
+    app.extensions["compression"] = compressor
+
+    @app.before_request
+    def accept_encoded_etags():
+        # EnvironHeaders reads the environ, so flask-smorest sees the rewritten values.
+        for header in ("HTTP_IF_NONE_MATCH", "HTTP_IF_MATCH"):
+            if header in request.environ:
+                request.environ[header] = strip_encoded_etags(request.environ[header])
+
+    @app.after_request
+    def compress_response(response):
+        return compressor.process(response)
@@ -0,0 +1,64 @@
+"""Cheap ETag inputs built from the row version counters (see models.versioning).
+
+Resources pass these to ``blp.set_etag`` *before* loading or serializing
+anything, so a matching If-None-Match is answered with a 304 after one
+narrow query.
+"""
+import hashlib
+
+from flask import json
+from flask_smorest import abort
+from sqlalchemy import select
+
+from db import db
+from models.changes import allocations_table, counter_table
+from utils.pagination import apply_keyset
+
+
+def row_version(model, row_id):
+    """ETag data for one row: ``[id, version]``. Aborts with 404 if it doesn't exist."""
+    version = db.session.query(model.version).filter(model.id == row_id).scalar()
+    if version is None:
+        abort(404)
+    return [row_id, version]
+
+
+def collection_version(query, args, sort_columns, id_column, limit):
+    """ETag data for a list page: a digest of the ``(id, version)`` pairs it covers.
+
+    ``query`` must select the id and version columns, in that order, with the
+    list's filters applied. It reads the page's rows a second time, so it is
+    for pages only: NDJSON streams use ``catalog_version``.
+    """
+    query = apply_keyset(query, args.get("sort", "id"), args.get("cursor"), limit, sort_columns, id_column)
+    return version_digest(query.yield_per(1000))
+
+
+def catalog_version():
+    """ETag data for an NDJSON stream: the change counter and the numbers still in flight.
+
+    Every catalog write takes a change number (models.changes), so this
+    changes whenever a write commits, without reading the streamed rows. It
+    is coarse: any write, to any row, gives every stream a new ETag.
+    """
+    seq = db.session.scalar(select(counter_table.c.seq).where(counter_table.c.id == 1))
+    # Read after the counter: a number in flight then either shows up here or has already committed.
+    in_flight = db.session.scalars(select(allocations_table.c.seq).order_by(allocations_table.c.seq)).all()
+    return [seq, in_flight]
+
+
+def version_digest(pairs):
+    """Digest of ``(id, version)`` pairs, as used for collection ETags."""
+    digest = hashlib.sha1()
+    for row_id, version in pairs:
+        digest.update(f"{row_id}:{version};".encode("ascii"))
+    return digest.hexdigest()
+
+
+def etag_value(etag_data):
+    """The (unquoted) ETag ``blp.set_etag(etag_data)`` sends: a SHA-1 of the sorted JSON.
+
+    The async read path (asgi.py) answers without flask-smorest and uses this
+    to send the same value; tests/test_etag.py checks the two paths agree.
+    """
+    return hashlib.sha1(json.dumps(etag_data, sort_keys=True).encode("utf-8")).hexdigest()
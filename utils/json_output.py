@@ -0,0 +1,22 @@
+"""JSON text for bodies the app assembles itself (NDJSON streams, batch entries).
+
+``current_app.json.dumps`` keeps the stdlib's ``", "`` and ``": "``
+separators, while ``current_app.json.response`` writes compact bodies.
+``compact_dumps`` matches the latter, so a row costs the same bytes whether
+it comes from a page, a stream or a batch. It never indents: an NDJSON
+record has to stay on one line.
+"""
+from functools import partial
+
+from flask import current_app
+
+
+def compact_dumps():
+    """The current app's ``json.dumps``, compact unless the provider sets ``compact = False``.
+
+    Look it up once and reuse it for every object of a body.
+    """
+    provider = current_app.json
+    if provider.compact is False:
+        return provider.dumps
+    return partial(provider.dumps, separators=(",", ":"))
@@ -0,0 +1,230 @@
+"""Per-request timings: total, SQL, schema dumps and the JWT blocklist lookup.
+
+Every request collects:
+
+* ``db``: number and total time of the statements it executed (engine events);
+* ``dump``: time spent in marshmallow / compiled schema dumps (``timed("dump")``);
+* ``blocklist``: time spent deciding whether the JWT is revoked;
+* ``compress``: time spent compressing a buffered body (utils.compression).
+
+They are sent back in a ``Server-Timing`` header (``SERVER_TIMING_ENABLED``)
+and, when prometheus_client is installed, recorded as histograms per method
+and URL rule, served at ``METRICS_PATH`` (default ``/metrics``).
+
+``/metrics`` answers only scrapers that connect from ``METRICS_ALLOWED_IPS``
+(addresses or networks, comma separated; loopback by default) or that send
+``Authorization: Bearer <METRICS_TOKEN>``. The address is the peer's own,
+not X-Forwarded-For: scrape the workers directly, not through the proxy.
+
+Under gunicorn, gunicorn.conf.py points ``PROMETHEUS_MULTIPROC_DIR`` at an
+empty directory before the app is imported. Each worker then writes its
+samples there and ``/metrics`` aggregates all workers, whichever one answers.
+
+Timings are taken when the response is created, so for NDJSON streams they
+cover the time to the first byte, not the whole body.
+"""
+import hmac
+import ipaddress
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # optional: Server-Timing works without it
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SERVER_TIMING_PARTS = ("db", "dump", "blocklist", "compress")
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.durations = defaultdict(float)
+        self.active = set()
+
+    def server_timing(self, total):
+        parts = []
+        for name in SERVER_TIMING_PARTS:
+            if name == "db":
+                parts.append(f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.sql_count} queries"')
+            elif name in self.durations:
+                parts.append(f"{name};dur={self.durations[name] * 1000:.2f}")
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current_timings():
+    return g.get("timings") if has_request_context() else None
+
+
+@contextmanager
+def timed(name):
+    """Add the enclosed block's duration to the request's ``name`` timing.
+
+    Nested blocks of the same name (e.g. nested schema dumps) count once.
+    Outside a request, or with metrics disabled, this does nothing.
+    """
+    timings = current_timings()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += time.perf_counter() - started
+        timings.active.discard(name)
+
+
+def timed_dump(dump):
+    """Wrap a compiled dumper (utils.serializers) so its calls count as ``dump`` time."""
+    @wraps(dump)
+    def wrapper(obj):
+        with timed("dump"):
+            return dump(obj)
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_timings() is not None:
+        context._timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_timing_started", None)
+    if started is None:
+        return
+    timings = current_timings()
+    if timings is not None:
+        timings.sql_count += 1
+        timings.durations["db"] += time.perf_counter() - started
+
+
+class PrometheusMetrics:
+    """Request histograms; a single instance per process (metric names are global)."""
+
+    def __init__(self):
+        labels = ["method", "endpoint"]
+        histogram = prometheus_client.Histogram
+        self.duration = histogram(
+            "http_request_duration_seconds", "Time to build the response.",
+            labels + ["status"], buckets=LATENCY_BUCKETS,
+        )
+        self.sql_queries = histogram(
+            "http_request_sql_queries", "SQL statements executed per request.",
+            labels, buckets=QUERY_COUNT_BUCKETS,
+        )
+        self.sql_duration = histogram(
+            "http_request_sql_duration_seconds", "Time spent executing SQL per request.",
+            labels, buckets=LATENCY_BUCKETS,
+        )
+        self.dump_duration = histogram(
+            "http_request_dump_duration_seconds", "Time spent dumping schemas per request.",
+            labels, buckets=LATENCY_BUCKETS,
+        )
+        self.blocklist_duration = histogram(
+            "http_request_blocklist_duration_seconds", "Time spent checking the JWT blocklist per request.",
+            labels, buckets=LATENCY_BUCKETS,
+        )
+
+    def observe(self, method, endpoint, status, timings, total):
+        self.duration.labels(method, endpoint, str(status)).observe(total)
+        self.sql_queries.labels(method, endpoint).observe(timings.sql_count)
+        self.sql_duration.labels(method, endpoint).observe(timings.durations["db"])
+        self.dump_duration.labels(method, endpoint).observe(timings.durations["dump"])
+        if "blocklist" in timings.durations:
+            self.blocklist_duration.labels(method, endpoint).observe(timings.durations["blocklist"])
+
+    def render(self):
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry)
+
+
+_prometheus = None
+
+
+def parse_networks(value):
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+def metrics_allowed(networks, token):
+    if token:
+        scheme, _, sent = request.headers.get("Authorization", "").partition(" ")
+        if scheme == "Bearer" and hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8")):
+            return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def get_prometheus():
+    global _prometheus
+    if _prometheus is None and prometheus_client is not None:
+        _prometheus = PrometheusMetrics()
+    return _prometheus
+
+
+def init_metrics(app, db):
+    app.config.setdefault("METRICS_ENABLED", os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes"))
+    app.config.setdefault("METRICS_PATH", os.getenv("METRICS_PATH", "/metrics"))
+    app.config.setdefault("METRICS_ALLOWED_IPS", os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1"))
+    app.config.setdefault("METRICS_TOKEN", os.getenv("METRICS_TOKEN"))
+    app.config.setdefault("SERVER_TIMING_ENABLED", os.getenv("SERVER_TIMING_ENABLED", "1").lower() in ("1", "true", "yes"))
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    prometheus = get_prometheus()
+    metrics_path = app.config["METRICS_PATH"]
+
+    @app.before_request
+    def start_timings():
+        g.timings = RequestTimings()
+
+    @app.after_request
+    def record_timings(response):
+        timings = g.pop("timings", None)
+        if timings is None or request.path == metrics_path:
+            return response
+        total = time.perf_counter() - timings.started
+        if current_app.config["SERVER_TIMING_ENABLED"]:
+            response.headers["Server-Timing"] = timings.server_timing(total)
+        if prometheus is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            prometheus.observe(request.method, endpoint, response.status_code, timings, total)
+        return response
+
+    if prometheus is not None:
+        networks = parse_networks(app.config["METRICS_ALLOWED_IPS"])
+        token = app.config["METRICS_TOKEN"]
+
+        def metrics():
+            # Per-route traffic is not for the public: answer as if the route did not exist.
+            if not metrics_allowed(networks, token):
+                abort(404)
+            # CONTENT_TYPE_LATEST already names the charset; as a mimetype it would get a second one.
+            return Response(prometheus.render(), content_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+        app.add_url_rule(metrics_path, "metrics", metrics)
@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+
+from flask import current_app
+from flask_smorest import abort
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(sort, values):
+    raw = json.dumps({"s": sort, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, sort, types=None):
+    """The values of a cursor made by ``encode_cursor(sort, ...)``.
+
+    With ``types``, one Python type per value (None for any scalar), the
+    values must be a list that matches them or the cursor is rejected.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["v"]
+        cursor_sort = data["s"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        abort(400, message="Invalid cursor.")
+
+    if cursor_sort != sort:
+        abort(400, message="Cursor does not match the requested sort order.")
+    if types is not None and not (
+        isinstance(values, list)
+        and len(values) == len(types)
+        and all(_is_cursor_value(value, value_type) for value, value_type in zip(values, types))
+    ):
+        abort(400, message="Invalid cursor.")
+    return values
+
+
+def _is_cursor_value(value, value_type):
+    # JSON has no int/float distinction, and bool must not pass for int.
+    if value_type is None:
+        return type(value) in (int, float, str)
+    if value_type is float:
+        return type(value) in (int, float)
+    return type(value) is value_type
+
+
+def _python_type(column):
+    # Untyped expressions such as bm25() report ``object``.
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    return None if python_type is object else python_type
+
+
+def resolve_limit(args):
+    default_limit = current_app.config["PAGINATION_DEFAULT_LIMIT"]
+    max_limit = current_app.config["PAGINATION_MAX_LIMIT"]
+    return min(args.get("limit") or default_limit, max_limit)
+
+
+def apply_keyset(query, sort, cursor, limit, sort_columns, id_column):
+    """Order ``query`` by ``sort`` (``"name"`` / ``"-name"``) with ``id_column``
+    as the tie breaker, resume after ``cursor`` and fetch one extra row so the
+    caller can tell whether another page exists.
+
+    Works on both legacy ``Query`` objects and 2.0 ``select()`` statements.
+    """
+    descending = sort.startswith("-")
+    column = sort_columns[sort.lstrip("-")]
+
+    if column is id_column:
+        order_by = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order_by = [
+            column.desc() if descending else column.asc(),
+            id_column.desc() if descending else id_column.asc(),
+        ]
+
+    if cursor:
+        types = [_python_type(id_column)]
+        if column is not id_column:
+            types.insert(0, _python_type(column))
+        values = decode_cursor(cursor, sort, types)
+        if column is id_column:
+            last_id = values[0]
+            query = query.where(id_column < last_id if descending else id_column > last_id)
+        else:
+            last_value, last_id = values
+            after = column < last_value if descending else column > last_value
+            tie = id_column < last_id if descending else id_column > last_id
+            query = query.where(or_(after, and_(column == last_value, tie)))
+
+    query = query.order_by(*order_by)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def build_page(rows, sort, limit):
+    """Trim the look-ahead row and wrap ``rows`` in the page envelope."""
+    has_more = limit is not None and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        key = sort.lstrip("-")
+        values = [last.id] if key == "id" else [getattr(last, key), last.id]
+        next_cursor = encode_cursor(sort, values)
+
+    return {"data": rows, "next_cursor": next_cursor, "has_more": has_more}
+
+
+def paginate(query, args, sort_columns, id_column):
+    """Run one keyset page of ``query`` using the parsed list query ``args``."""
+    sort = args.get("sort", "id")
+    limit = resolve_limit(args)
+    query = apply_keyset(query, sort, args.get("cursor"), limit, sort_columns, id_column)
+    return build_page(query.all(), sort, limit)
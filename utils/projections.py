@@ -0,0 +1,71 @@
+"""Column-only query paths for the hot list endpoints.
+
+These build the rows that ``ItemSchema`` dumps from a handful of columns
+instead of full mapped instances, and are meant to be fed to the compiled
+dumpers in ``utils.serializers``.
+"""
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from db import db
+from models import ItemModel, StoreModel, TagModel, ItemTags
+
+ItemRow = namedtuple("ItemRow", ["id", "name", "description", "price", "store", "tags"])
+StoreRow = namedtuple("StoreRow", ["id", "name"])
+TagRow = namedtuple("TagRow", ["id", "name"])
+
+
+ITEM_ROW_COLUMNS = (
+    ItemModel.id,
+    ItemModel.name,
+    ItemModel.description,
+    ItemModel.price,
+    StoreModel.id.label("store_id"),
+    StoreModel.name.label("store_name"),
+)
+
+
+def item_rows_query():
+    """Item columns plus the owning store's, ready for filters and keyset pagination."""
+    return db.session.query(*ITEM_ROW_COLUMNS).join(StoreModel, StoreModel.id == ItemModel.store_id)
+
+
+def item_rows_select(*extra_columns):
+    """``item_rows_query`` as a 2.0 ``select()``, for async sessions."""
+    return select(*ITEM_ROW_COLUMNS, *extra_columns).join(StoreModel, StoreModel.id == ItemModel.store_id)
+
+
+def item_tags_select(item_ids):
+    """``(item_id, tag id, tag name)`` for the given items, in ItemSchema's tag order."""
+    return (
+        select(ItemTags.item_id, TagModel.id, TagModel.name)
+        .join(TagModel, TagModel.id == ItemTags.tag_id)
+        .where(ItemTags.item_id.in_(list(item_ids)))
+        .order_by(ItemTags.item_id, TagModel.id)
+    )
+
+
+def assemble_item_rows(rows, tag_rows):
+    tags_by_item = {row.id: [] for row in rows}
+    for item_id, tag_id, tag_name in tag_rows:
+        tags_by_item[item_id].append(TagRow(tag_id, tag_name))
+
+    return [
+        ItemRow(
+            row.id,
+            row.name,
+            row.description,
+            row.price,
+            StoreRow(row.store_id, row.store_name),
+            tags_by_item[row.id],
+        )
+        for row in rows
+    ]
+
+
+def build_item_rows(rows):
+    """Turn ``item_rows_query`` results into ItemRows with their tags, in one extra query."""
+    if not rows:
+        return []
+    return assemble_item_rows(rows, db.session.execute(item_tags_select(row.id for row in rows)))
@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from db import db
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Record every SQL statement sent to ``engine`` (default: ``db.engine``)."""
+    engine = engine if engine is not None else db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_query_budget(max_queries, engine=None):
+    """Fail when the wrapped block issues more than ``max_queries`` statements.
+
+    Meant for tests, e.g.::
+
+        with app.app_context(), assert_query_budget(3):
+            client.get("/item?limit=100", headers=headers)
+
+    The budget is fixed, so it catches N+1 regressions whatever the row count.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+
+    if counter.count > max_queries:
+        listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(counter.statements))
+        raise AssertionError(
+            f"Expected at most {max_queries} queries, {counter.count} were issued:\n{listing}"
+        )
@@ -0,0 +1,103 @@
+"""EXPLAIN helpers for spotting queries that fall back to full table scans.
+
+``capture_statements`` records what an endpoint sends to the database and
+``find_full_scans`` explains each statement and reports the tables it reads
+end to end. SQLite (``EXPLAIN QUERY PLAN``) and PostgreSQL
+(``EXPLAIN (FORMAT JSON)``) are supported.
+
+A scan is accepted when the statement has a LIMIT and the plan walks rows in
+the requested order (no separate sort step), because it stops after LIMIT
+rows; that is how keyset pagination over the primary key looks.
+"""
+import json
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from db import db
+
+EXPLAINED_VERBS = ("SELECT", "UPDATE", "DELETE")
+# A virtual table scan with a MATCH constraint (idxStr containing "M") is an
+# FTS5 index lookup, not a full scan.
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)\b(?! VIRTUAL TABLE INDEX \d+:\S*M)")
+LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+
+@contextmanager
+def capture_statements(engine=None):
+    """Collect ``(statement, parameters)`` for each single-row statement executed."""
+    engine = engine if engine is not None else db.engine
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINED_VERBS):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def explain(connection, statement, parameters):
+    """Return the plan of ``statement`` as a list of ``(table, step)`` pairs.
+
+    ``table`` is set for steps that read every row of it, otherwise None.
+    The ``step`` texts also include sort steps so callers can tell ordered
+    scans from ones followed by a sort.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        steps = []
+        for row in rows:
+            detail = row[-1]
+            match = SQLITE_SCAN.match(detail)
+            steps.append((match.group(1) if match else None, detail))
+        return steps
+
+    if dialect == "postgresql":
+        # Seeded tables are small enough that the planner prefers sequential
+        # scans anyway; disabling them leaves a Seq Scan only where no index applies.
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        steps = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            table = node.get("Relation Name") if node["Node Type"] == "Seq Scan" else None
+            steps.append((table, node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")))
+            nodes.extend(node.get("Plans", []))
+        return steps
+
+    raise NotImplementedError(f"EXPLAIN is not supported for the {dialect} dialect")
+
+
+def is_ordered_limit(statement, steps):
+    sorted_later = any(
+        "TEMP B-TREE FOR ORDER BY" in step or step.startswith(("Sort", "Incremental Sort"))
+        for _, step in steps
+    )
+    return bool(LIMIT.search(statement)) and not sorted_later
+
+
+def find_full_scans(statements, engine=None, ignore_tables=()):
+    """Explain ``statements`` and return ``[(statement, tables, steps)]`` for
+    those that read a whole table outside of an ordered LIMIT."""
+    engine = engine if engine is not None else db.engine
+    problems = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            transaction = connection.begin()
+            try:
+                steps = explain(connection, statement, parameters)
+            finally:
+                transaction.rollback()
+            tables = sorted({table for table, _ in steps if table and table not in ignore_tables})
+            if tables and not is_ordered_limit(statement, steps):
+                problems.append((statement, tables, [step for _, step in steps]))
+    return problems
@@ -0,0 +1,25 @@
+import os
+
+import settings
+
+_connection = None
+_connection_pid = None
+
+
+def get_redis():
+    """Return a shared Redis connection built from settings.REDIS_URL, or None when unset.
+
+    The connection is created lazily and re-created after a fork so gunicorn
+    workers never share a socket with their parent.
+    """
+    global _connection, _connection_pid
+
+    if not settings.REDIS_URL:
+        return None
+
+    if _connection is None or _connection_pid != os.getpid():
+        import redis
+
+        _connection = redis.from_url(settings.REDIS_URL)
+        _connection_pid = os.getpid()
+    return _connection
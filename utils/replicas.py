@@ -0,0 +1,225 @@
+"""Read-replica routing.
+
+Set ``DATABASE_REPLICA_URLS`` (comma separated) to register each replica as a
+Flask-SQLAlchemy bind named ``replica_0``, ``replica_1``, ... ``RoutingSession``
+then sends the reads of GET/HEAD requests to one replica per request, picked
+round-robin among the healthy ones. Everything else goes to the primary:
+
+* other HTTP methods, flushes and DML statements, and code run inside
+  ``use_primary()`` (e.g. the JWT blocklist check);
+* requests from a client that wrote within the last ``REPLICA_STICKY_SECONDS``
+  (read-your-writes), keyed by JWT subject, else by remote address.
+
+A replica whose connections fail is skipped for ``REPLICA_RETRY_SECONDS``;
+with no healthy replica, reads fall back to the primary.
+
+Pool settings come from ``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``,
+``DB_POOL_TIMEOUT``, ``DB_POOL_RECYCLE`` and ``DB_POOL_PRE_PING`` for the
+primary and ``REPLICA_*`` / ``REPLICA_<n>_*`` for the replicas.
+"""
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from redis.exceptions import RedisError
+from sqlalchemy import event
+
+from utils.redis_client import get_redis
+
+READ_METHODS = ("GET", "HEAD")
+
+POOL_OPTIONS = (
+    ("POOL_SIZE", "pool_size", int),
+    ("MAX_OVERFLOW", "max_overflow", int),
+    ("POOL_TIMEOUT", "pool_timeout", float),
+    ("POOL_RECYCLE", "pool_recycle", int),
+    ("POOL_PRE_PING", "pool_pre_ping", lambda value: value.lower() in ("1", "true", "yes")),
+)
+
+
+def engine_options_from_env(*prefixes):
+    """Engine options set in the environment; later prefixes override earlier ones."""
+    options = {}
+    for prefix in prefixes:
+        for suffix, option, cast in POOL_OPTIONS:
+            value = os.getenv(f"{prefix}_{suffix}")
+            if value:
+                options[option] = cast(value)
+    return options
+
+
+class LocalWriteMarks:
+    """Remembers, per process, which clients wrote recently."""
+
+    def __init__(self, window):
+        self.window = window
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._marks) > 10000:
+                self._marks = {k: until for k, until in self._marks.items() if until > now}
+            self._marks[key] = now + self.window
+
+    def is_recent(self, key):
+        return self._marks.get(key, 0) > time.monotonic()
+
+
+class RedisWriteMarks:
+    """Shares recent-write marks between workers; any Redis error routes to the primary."""
+
+    def __init__(self, client, window, prefix="replica:wrote:"):
+        self.client = client
+        self.window = window
+        self.prefix = prefix
+
+    def mark(self, key):
+        try:
+            self.client.set(self.prefix + key, 1, px=int(self.window * 1000))
+        except RedisError:
+            pass
+
+    def is_recent(self, key):
+        try:
+            return bool(self.client.exists(self.prefix + key))
+        except RedisError:
+            return True
+
+
+class ReplicaRouter:
+    def __init__(self, names, marks, retry_after=30):
+        self.names = list(names)
+        self.marks = marks
+        self.retry_after = retry_after
+        self._cycle = itertools.cycle(self.names)
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """Next healthy replica in round-robin order, or None if all are down."""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.names)):
+                name = next(self._cycle)
+                if self._down_until.get(name, 0) <= now:
+                    return name
+        return None
+
+    def mark_down(self, name):
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.retry_after
+
+    def stats(self):
+        now = time.monotonic()
+        return {name: "down" if self._down_until.get(name, 0) > now else "up" for name in self.names}
+
+
+def client_key():
+    from flask_jwt_extended import get_jwt
+
+    try:
+        subject = get_jwt().get("sub")
+    except RuntimeError:
+        subject = None
+    return f"user:{subject}" if subject else f"addr:{request.remote_addr}"
+
+
+def replica_for_request(router):
+    """The replica bind serving this request's reads, or None for the primary."""
+    if request.method not in READ_METHODS or g.get("db_primary") or g.get("db_wrote"):
+        return None
+    if "db_replica" not in g:
+        g.db_replica = None if router.marks.is_recent(client_key()) else router.choose()
+    return g.db_replica
+
+
+@contextmanager
+def use_primary():
+    """Run the enclosed queries on the primary, whatever the request method."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get("db_primary", False)
+    g.db_primary = True
+    try:
+        yield
+    finally:
+        g.db_primary = previous
+
+
+# Session.info key set by resources/batch.py while it runs a batch as one transaction.
+DEFER_COMMIT = "defer_commit"
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends request reads to a replica when one is configured.
+
+    While ``info[DEFER_COMMIT]`` is set, ``commit()`` only flushes, so the
+    views of a transactional batch share the transaction the batch commits.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            router = current_app.extensions.get("replica_router")
+            if router is not None:
+                if self._flushing or getattr(clause, "is_dml", False):
+                    g.db_wrote = True
+                else:
+                    replica = replica_for_request(router)
+                    if replica is not None:
+                        return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        if self.info.get(DEFER_COMMIT):
+            self.flush()
+            return
+        super().commit()
+
+
+def configure_replicas(app):
+    """Set engine options and replica binds; call before ``db.init_app``."""
+    urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    app.config.setdefault("DATABASE_REPLICA_URLS", urls)
+    app.config.setdefault("REPLICA_STICKY_SECONDS", float(os.getenv("REPLICA_STICKY_SECONDS", "5")))
+    app.config.setdefault("REPLICA_RETRY_SECONDS", float(os.getenv("REPLICA_RETRY_SECONDS", "30")))
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options_from_env("DB"))
+
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    for index, url in enumerate(app.config["DATABASE_REPLICA_URLS"]):
+        binds[f"replica_{index}"] = dict(engine_options_from_env("REPLICA", f"REPLICA_{index}"), url=url)
+
+
+def init_replicas(app, db):
+    """Install the router once ``db.init_app`` has built the replica engines."""
+    names = [key for key in app.config["SQLALCHEMY_BINDS"] if key.startswith("replica_")]
+    if not names:
+        return
+
+    window = app.config["REPLICA_STICKY_SECONDS"]
+    redis_client = get_redis()
+    marks = RedisWriteMarks(redis_client, window) if redis_client is not None else LocalWriteMarks(window)
+    router = ReplicaRouter(names, marks, retry_after=app.config["REPLICA_RETRY_SECONDS"])
+    app.extensions["replica_router"] = router
+
+    with app.app_context():
+        for name in names:
+            engine = db.engines[name]
+
+            def mark_unhealthy(context, name=name, engine=engine):
+                if context.is_disconnect or isinstance(context.original_exception, engine.dialect.loaded_dbapi.OperationalError):
+                    router.mark_down(name)
+
+            event.listen(engine, "handle_error", mark_unhealthy)
+
+    @app.after_request
+    def remember_writes(response):
+        if (request.method not in READ_METHODS or g.get("db_wrote")) and response.status_code < 400:
+            router.marks.mark(client_key())
+        return response
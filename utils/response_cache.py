@@ -0,0 +1,280 @@
+"""Read-through cache of serialized single-resource GET bodies.
+
+Entries are keyed by resource (``item:1``, ``store:3``, ``tag:7``) and hold
+the JSON body together with the ETag data it was rendered from. Handlers
+that change a resource call ``invalidate`` after committing, for the
+resource itself and for every resource whose payload nests it.
+
+A fill reads the resource, renders it, and only then stores the body; an
+invalidation landing in between would be undone by that store. So every
+key has a generation that ``delete`` bumps: a fill takes it with
+``reserve`` before reading and ``set`` stores nothing if it has moved.
+
+The local backend is per process: in a multi-worker deployment other
+workers keep serving an entry until its TTL runs out, so it is only
+used when asked for. The default is Redis when ``REDIS_URL`` is set and
+no cache otherwise.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from flask import Response, current_app
+from redis.exceptions import RedisError
+
+import settings
+from db import commits_deferred, db
+from utils.redis_client import get_redis
+from utils.replicas import use_primary
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+class LocalResponseCache:
+    """In-process LRU with a TTL and a total size budget in bytes."""
+
+    def __init__(self, ttl=30, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (etag_data, body, expires_at)
+        self._generations = {}  # key -> (generation, expires_at), for keys invalidated within the TTL
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0], entry[1]
+
+    def reserve(self, key):
+        with self._lock:
+            return self._generation(key)
+
+    def set(self, key, etag_data, body, generation=None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and self._generation(key) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (etag_data, body, time.monotonic() + self.ttl)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                self._generations[key] = (self._generation(key) + 1, now + self.ttl)
+            if len(self._generations) > len(self._entries) + 1024:
+                # A generation only has to outlive the fills that reserved it.
+                self._generations = {key: entry for key, entry in self._generations.items() if entry[1] > now}
+
+    def _generation(self, key):
+        entry = self._generations.get(key)
+        return entry[0] if entry is not None else 0
+
+    def _remove(self, key):
+        _, body, _ = self._entries.pop(key)
+        self.size -= len(body)
+
+
+class RedisResponseCache:
+    """Shared cache; Redis handles expiry and eviction (configure maxmemory-policy)."""
+
+    # Store the entry only if the key's generation is still the one the fill reserved.
+    SET_IF_GENERATION = """
+    if (redis.call('GET', KEYS[2]) or '') == ARGV[3] then
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    end
+    """
+
+    def __init__(self, client, ttl=30, prefix="response:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._set_if_generation = client.register_script(self.SET_IF_GENERATION)
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except RedisError:
+            self.stats.errors += 1
+            return None
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        header, body = raw.split(b"\n", 1)
+        return json.loads(header), body
+
+    def reserve(self, key):
+        try:
+            raw = self.client.get(self.prefix + "generation:" + key)
+        except RedisError:
+            self.stats.errors += 1
+            return None
+        return raw.decode("ascii") if raw is not None else ""
+
+    def set(self, key, etag_data, body, generation=None):
+        value = json.dumps(etag_data).encode("utf-8") + b"\n" + body
+        try:
+            if generation is None:
+                self.client.set(self.prefix + key, value, ex=self.ttl)
+            else:
+                self._set_if_generation(
+                    keys=[self.prefix + key, self.prefix + "generation:" + key],
+                    args=[value, self.ttl, generation],
+                )
+        except RedisError:
+            self.stats.errors += 1
+
+    def delete(self, *keys):
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.delete(*(self.prefix + key for key in keys))
+            for key in keys:
+                # Expires with the entries: a fill older than the TTL is long done.
+                pipeline.incr(self.prefix + "generation:" + key)
+                pipeline.expire(self.prefix + "generation:" + key, self.ttl)
+            pipeline.execute()
+        except RedisError:
+            self.stats.errors += 1
+
+
+class NullResponseCache:
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        return None
+
+    def reserve(self, key):
+        return None
+
+    def set(self, key, etag_data, body, generation=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+INVALIDATE_AFTER_COMMIT = "invalidate_after_commit"
+
+
+def init_response_cache(app):
+    default_backend = "redis" if settings.REDIS_URL else "none"
+    app.config.setdefault("RESPONSE_CACHE_BACKEND", os.getenv("RESPONSE_CACHE_BACKEND") or default_backend)
+    app.config.setdefault("RESPONSE_CACHE_TTL", int(os.getenv("RESPONSE_CACHE_TTL", "30")))
+    app.config.setdefault("RESPONSE_CACHE_MAX_BYTES", int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+    backend = app.config["RESPONSE_CACHE_BACKEND"]
+    ttl = app.config["RESPONSE_CACHE_TTL"]
+    if backend == "redis":
+        client = get_redis()
+        if client is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires REDIS_URL to be set.")
+        cache = RedisResponseCache(client, ttl=ttl)
+    elif backend == "local":
+        cache = LocalResponseCache(ttl=ttl, max_bytes=app.config["RESPONSE_CACHE_MAX_BYTES"])
+    elif backend == "none":
+        cache = NullResponseCache()
+    else:
+        raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND {backend!r}.")
+
+    app.extensions["response_cache"] = cache
+
+
+def get_response_cache():
+    return current_app.extensions["response_cache"]
+
+
+def render_body(payload):
+    """The bytes an uncached response would carry: ``json.response`` compacts and adds the newline."""
+    return current_app.json.response(payload).get_data()
+
+
+def cached_response(blp, key, load_etag_data, render):
+    """Serve ``key`` from the cache, or render and cache it.
+
+    ``load_etag_data()`` returns the ETag data for the resource (and aborts
+    with 404 if it is gone); it is checked against If-None-Match before
+    anything is loaded. ``render()`` returns ``(etag_data, payload)`` for a
+    freshly loaded resource.
+    """
+    cache = get_response_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        etag_data, body = entry
+        blp.set_etag(etag_data)
+        return Response(body, mimetype=current_app.json.mimetype)
+
+    generation = cache.reserve(key)
+    # Fill from the primary: a lagging replica would otherwise re-cache data
+    # that was just invalidated, and keep serving it for the whole TTL.
+    with use_primary() if not isinstance(cache, NullResponseCache) else nullcontext():
+        blp.set_etag(load_etag_data())
+        etag_data, payload = render()
+    body = render_body(payload)
+    if not commits_deferred() and generation is not None:
+        cache.set(key, etag_data, body, generation)
+    blp.set_etag(etag_data)
+    return Response(body, mimetype=current_app.json.mimetype)
+
+
+def invalidate(items=(), stores=(), tags=()):
+    keys = (
+        [f"item:{i}" for i in items]
+        + [f"store:{s}" for s in stores]
+        + [f"tag:{t}" for t in tags]
+    )
+    if keys:
+        cache = get_response_cache()
+        cache.delete(*keys)
+        cache.stats.invalidations += len(keys)
+        if commits_deferred():
+            # Again after the batch commits: another request may have refilled them from the old rows.
+            db.session.info.setdefault(INVALIDATE_AFTER_COMMIT, []).extend(keys)
+
+
+def invalidate_deferred():
+    """Replay the invalidations of a transactional batch once it has committed or rolled back."""
+    keys = db.session.info.pop(INVALIDATE_AFTER_COMMIT, None)
+    if keys:
+        get_response_cache().delete(*keys)
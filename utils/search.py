@@ -0,0 +1,103 @@
+"""Full-text search over item names and descriptions.
+
+PostgreSQL uses a GIN expression index on ``search_vector()`` and ranks with
+``ts_rank``. SQLite uses an FTS5 external-content table, ``items_fts``, that
+triggers keep in step with ``items``, and ranks with ``bm25``. Either way the
+database maintains the index on every insert, update and delete, including
+the executemany writes of the bulk endpoints.
+
+``db.create_all`` installs the index through the DDL listeners below.
+Existing databases get it from migration 5c0e7d1f9a2b.
+
+Each word of the query must match a word of the item as a prefix, so
+``red sh`` finds "Red shoes".
+
+Other databases fall back to a case-insensitive substring filter with no
+index and no ranking: matches come in id order.
+"""
+import re
+
+from sqlalchemy import Double, cast, event, func, literal, literal_column, or_, table, column
+
+from db import db
+from models import ItemModel
+
+MAX_TERMS = 8
+
+POSTGRES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin "
+    "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '')))",
+)
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "name, description, content='items', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name, description ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+)
+
+items_fts = table("items_fts", column("rowid"), column("items_fts"))
+
+
+def _create_search_index(target, connection, **kw):
+    statements = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS items_fts")
+
+
+event.listen(ItemModel.__table__, "after_create", _create_search_index)
+event.listen(ItemModel.__table__, "after_drop", _drop_search_index)
+
+
+def search_terms(q):
+    """Lower-cased words of ``q``; anything else (quotes, operators) is dropped."""
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+
+def search_vector():
+    """The indexed expression. Literals are inlined so the planner can match it to ix_items_search."""
+    text = func.coalesce(ItemModel.name, literal_column("''")).op("||")(literal_column("' '")).op("||")(
+        func.coalesce(ItemModel.description, literal_column("''"))
+    )
+    return func.to_tsvector(literal_column("'simple'"), text)
+
+
+def apply_search(query, terms):
+    """Restrict an item ``query`` to rows matching every term and add a ``rank`` column.
+
+    Returns ``(query, rank, sort)``: ``sort`` is the ``apply_keyset`` sort
+    that puts the best matches first with ``{"rank": rank}`` as sort column.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        # ts_rank is float4, which a cursor's Python float does not round-trip; compare as float8.
+        rank = cast(func.ts_rank(search_vector(), tsquery), Double)
+        query = query.where(search_vector().op("@@")(tsquery))
+        return query.add_columns(rank.label("rank")), rank, "-rank"
+
+    if dialect == "sqlite":
+        rank = func.bm25(literal_column("items_fts"))
+        query = (
+            query.join(items_fts, items_fts.c.rowid == ItemModel.id)
+            .where(items_fts.c.items_fts.match(" ".join(f'"{term}"*' for term in terms)))
+        )
+        return query.add_columns(rank.label("rank")), rank, "rank"
+
+    for term in terms:
+        query = query.where(or_(
+            ItemModel.name.icontains(term, autoescape=True),
+            ItemModel.description.icontains(term, autoescape=True),
+        ))
+    rank = literal(0)
+    return query.add_columns(rank.label("rank")), rank, "rank"
@@ -0,0 +1,116 @@
+"""Compile marshmallow schemas into plain dump functions.
+
+``compile_schema(ItemSchema())`` returns a function that produces the same
+dict as ``ItemSchema().dump(obj)`` without walking marshmallow's field
+machinery on every call. Int, Float, Str, Nested and List fields are turned
+into inline conversions. Any other field type falls back to that field's
+own ``serialize``, so the output always matches ``Schema.dump``.
+
+Compiled functions read attributes, so they accept ORM instances as well as
+the lightweight row tuples built by ``utils.projections``. Pass
+``mapping=True`` for a schema that dumps dicts, such as a page envelope.
+"""
+from marshmallow import fields, missing
+
+_CONVERTERS = {
+    fields.Integer: "int",
+    fields.Float: "float",
+    fields.String: "str",
+}
+
+_compiled = {}
+
+
+def _converter(field):
+    for field_cls, name in _CONVERTERS.items():
+        if type(field) is field_cls and not getattr(field, "as_string", False):
+            return name
+    return None
+
+
+def _has_dump_hooks(schema):
+    hooks = getattr(schema, "_hooks", {})
+    return any(hooks.get(key) for key in hooks if key[0] in ("pre_dump", "post_dump"))
+
+
+def _value_expr(field, ref, namespace):
+    """Expression converting ``ref`` for ``field``, or None if it can't be inlined."""
+    name = _converter(field)
+    if name:
+        return f"{name}({ref})"
+
+    if isinstance(field, fields.Nested) and not field.many:
+        fn = f"_n{len(namespace)}"
+        namespace[fn] = compile_schema(field.schema)
+        return f"{fn}({ref})"
+
+    if isinstance(field, fields.List):
+        item_expr = _value_expr(field.inner, "x", namespace)
+        if item_expr is None:
+            return None
+        return f"[None if x is None else {item_expr} for x in {ref}]"
+
+    return None
+
+
+def compile_schema(schema, mapping=False):
+    """Return a function ``dump(obj) -> dict`` equivalent to ``schema.dump(obj)``."""
+    key = (id(schema), mapping)
+    if key in _compiled:
+        return _compiled[key][1]
+
+    if schema.many or _has_dump_hooks(schema):
+        dump = schema.dump
+        _compiled[key] = (schema, dump)
+        return dump
+
+    namespace = {"_missing": missing, "_getattr": getattr}
+    lines = ["def dump(obj):", "    out = {}"]
+
+    for field_name, field in schema.dump_fields.items():
+        attr = field.attribute or field_name
+        data_key = field.data_key if field.data_key is not None else field_name
+        expr = _value_expr(field, "v", namespace)
+
+        if expr is None:
+            # Not inlinable: let the field serialize itself.
+            ref = f"_f{len(namespace)}"
+            namespace[ref] = field
+            namespace[ref + "_get"] = schema.get_attribute
+            lines += [
+                f"    v = {ref}.serialize({field_name!r}, obj, {ref}_get)",
+                "    if v is not _missing:",
+                f"        out[{data_key!r}] = v",
+            ]
+            continue
+
+        if mapping:
+            lines += [
+                f"    v = obj.get({attr!r}, _missing)",
+                "    if v is not _missing:",
+                f"        out[{data_key!r}] = None if v is None else {expr}",
+            ]
+            continue
+
+        if attr.isidentifier():
+            lines.append(f"    v = obj.{attr}")
+        else:
+            lines.append(f"    v = _getattr(obj, {attr!r})")
+        lines.append(f"    out[{data_key!r}] = None if v is None else {expr}")
+
+    lines.append("    return out")
+    exec("\n".join(lines), namespace)
+    dump = namespace["dump"]
+
+    # Keep the schema alive so its id() can't be reused by another instance.
+    _compiled[key] = (schema, dump)
+    return dump
+
+
+def compile_many(schema):
+    dump = compile_schema(schema)
+
+    def dump_many(objs):
+        return [dump(obj) for obj in objs]
+
+    return dump_many
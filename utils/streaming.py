@@ -0,0 +1,54 @@
+from flask import Response, current_app, request, stream_with_context
+
+from utils.json_output import compact_dumps
+from utils.pagination import apply_keyset
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_stream(args):
+    """Streaming is opt-in with ``?stream=1`` or ``Accept: application/x-ndjson``."""
+    if args.get("stream"):
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def stream_query(query, args, sort_columns, id_column, serialize):
+    """Stream every row matching ``query`` as NDJSON, one object per line.
+
+    ``serialize`` turns a batch of rows into a list of dicts, e.g.
+    ``StoreSchema(many=True).dump``.
+
+    Honours ``sort`` and ``cursor`` like the paginated path but is not capped
+    by PAGINATION_MAX_LIMIT. Rows are fetched ``STREAM_BATCH_SIZE`` at a time
+    through a server-side cursor and flushed as each batch is serialized, so
+    worker memory stays flat whatever the result size.
+    """
+    batch_size = current_app.config["STREAM_BATCH_SIZE"]
+    query = apply_keyset(query, args.get("sort", "id"), args.get("cursor"), None, sort_columns, id_column)
+    if args.get("limit"):
+        query = query.limit(args["limit"])
+    query = query.yield_per(batch_size)
+
+    dumps = compact_dumps()
+
+    def encode(rows):
+        return "".join(dumps(obj) + "\n" for obj in serialize(rows))
+
+    def generate():
+        batch = []
+        try:
+            for row in query:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield encode(batch)
+                    batch = []
+            if batch:
+                yield encode(batch)
+        finally:
+            # The request's teardown has already removed this session by the
+            # time the body is sent; close it so the connection goes back to the pool.
+            query.session.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,154 @@
+"""In-memory item-id bitmaps per tag, for tag AND/OR/NOT filters on item lists.
+
+A tag's bitmap is a Python int with bit ``item_id`` set for every item that
+carries the tag, so intersections and unions are single big-int operations.
+Entries are validated against ``tags.version`` (see models.versioning),
+which is bumped whenever a tag's items change, so every request costs one
+version lookup and the bitmaps of changed tags are reloaded from
+``items_tags``. ``LinkTagsToItem`` patches the bitmap of the tag it changed
+in place.
+
+Each process keeps its own bitmaps, and the version check keeps workers
+consistent with each other. Turned off by default (``TAG_BITMAP_ENABLED``).
+Without it the filters run as SQL over ``items_tags``.
+"""
+import os
+import threading
+from collections import OrderedDict
+from functools import reduce
+from operator import and_, or_
+
+from flask import current_app
+from sqlalchemy import select
+
+from db import commits_deferred, db
+from models import TagModel, ItemTags
+
+
+def bitmap_of(item_ids):
+    bits = bytearray()
+    for item_id in item_ids:
+        byte = item_id >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte - len(bits) + 1))
+        bits[byte] |= 1 << (item_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def ids_of(bitmap):
+    ids = []
+    for byte_index, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            ids.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+class TagBitmapIndex:
+    """LRU of ``tag_id -> (version, bitmap)``."""
+
+    def __init__(self, max_tags=256, max_ids=1000):
+        self.max_tags = max_tags
+        # Larger results are left to SQL rather than sent back as an IN list.
+        self.max_ids = max_ids
+        self.loads = 0
+        self._bitmaps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matching_ids(self, all_ids=(), any_ids=(), none_ids=()):
+        """Ids of the items with every tag in ``all_ids``, at least one of
+        ``any_ids`` and none of ``none_ids``.
+
+        Returns None when SQL should answer instead. That happens for
+        ``none_ids`` on its own, which would need the set of all items, and
+        for results larger than ``max_ids``.
+        """
+        if not (all_ids or any_ids):
+            return None
+        bitmaps = self.bitmaps({*all_ids, *any_ids, *none_ids})
+
+        result = reduce(and_, (bitmaps[tag_id] for tag_id in all_ids)) if all_ids else -1
+        if any_ids:
+            result &= reduce(or_, (bitmaps[tag_id] for tag_id in any_ids))
+        for tag_id in none_ids:
+            result &= ~bitmaps[tag_id]
+
+        if result.bit_count() > self.max_ids:
+            return None
+        return ids_of(result)
+
+    def bitmaps(self, tag_ids):
+        """Current bitmaps of ``tag_ids``; unknown tags get an empty one."""
+        versions = dict(db.session.query(TagModel.id, TagModel.version).where(TagModel.id.in_(tag_ids)))
+        bitmaps = {}
+        for tag_id in tag_ids:
+            version = versions.get(tag_id)
+            if version is None:
+                bitmaps[tag_id] = 0
+                continue
+            entry = self._get(tag_id)
+            if entry is None or entry[0] != version:
+                entry = (version, self._load(tag_id))
+                self._put(tag_id, entry)
+            bitmaps[tag_id] = entry[1]
+        return bitmaps
+
+    def record_link(self, tag, item_id, linked):
+        """Apply a committed link/unlink of ``item_id`` to ``tag``'s bitmap.
+
+        A single link bumps the tag's version by one. Any other gap means
+        another write came in between, so the entry is dropped instead.
+        """
+        with self._lock:
+            entry = self._bitmaps.get(tag.id)
+        if entry is None:
+            return
+        version = tag.version
+        with self._lock:
+            if self._bitmaps.get(tag.id) is not entry:
+                return
+            if entry[0] != version - 1:
+                del self._bitmaps[tag.id]
+                return
+            bit = 1 << item_id
+            self._bitmaps[tag.id] = (version, entry[1] | bit if linked else entry[1] & ~bit)
+
+    def _load(self, tag_id):
+        self.loads += 1
+        return bitmap_of(db.session.scalars(select(ItemTags.item_id).where(ItemTags.tag_id == tag_id)))
+
+    def _get(self, tag_id):
+        with self._lock:
+            entry = self._bitmaps.get(tag_id)
+            if entry is not None:
+                self._bitmaps.move_to_end(tag_id)
+            return entry
+
+    def _put(self, tag_id, entry):
+        with self._lock:
+            self._bitmaps[tag_id] = entry
+            self._bitmaps.move_to_end(tag_id)
+            while len(self._bitmaps) > self.max_tags:
+                self._bitmaps.popitem(last=False)
+
+
+def init_tag_bitmaps(app):
+    app.config.setdefault("TAG_BITMAP_ENABLED", os.getenv("TAG_BITMAP_ENABLED", "0").lower() in ("1", "true", "yes"))
+    app.config.setdefault("TAG_BITMAP_MAX_TAGS", int(os.getenv("TAG_BITMAP_MAX_TAGS", "256")))
+    app.config.setdefault("TAG_BITMAP_MAX_IDS", int(os.getenv("TAG_BITMAP_MAX_IDS", "1000")))
+
+    index = None
+    if app.config["TAG_BITMAP_ENABLED"]:
+        index = TagBitmapIndex(app.config["TAG_BITMAP_MAX_TAGS"], app.config["TAG_BITMAP_MAX_IDS"])
+    app.extensions["tag_bitmaps"] = index
+
+
+def get_tag_bitmaps():
+    """The process's TagBitmapIndex, or None when disabled.
+
+    Also None during a transactional batch, whose links may still be rolled back.
+    """
+    if commits_deferred():
+        return None
+    return current_app.extensions.get("tag_bitmaps")